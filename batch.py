@@ -0,0 +1,353 @@
+import asyncio
+import doctest
+import json
+import os
+import sys
+from importlib import import_module
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+from cache import cache_for, grid_key
+from canonical import canonical_form, duplicates
+from core import GridError, count_solutions, grid_files, read_grid, searcher
+from generator import generate_files
+from pack import pack_directory, unpack
+from server import ValidationServer, load
+from worker import SOLVE_BUDGET
+
+
+# INFORMATIONS SUR LA RÉSOLUTION EN LOT
+#
+# Ce module permet de résoudre sans fenêtre toutes les grilles
+# d'un dossier, réparties sur plusieurs processus :
+#
+#   python -m hitori solve DOSSIER --jobs 4 --timeout 10
+#
+# Chaque grille produit une ligne JSON sur la sortie standard,
+# dès que sa résolution est terminée. Les processus sont répartis
+# entre les grilles ; s'il y a moins de grilles à résoudre que de
+# processus, chaque grille est résolue à son tour par la recherche
+# répartie de parallel.py, sur tous les processus.
+#
+# De nouvelles grilles à solution unique peuvent aussi être
+# générées en parallèle :
+#
+#   python -m hitori generate DOSSIER --count 500 --size 10
+#
+# L'unicité des solutions se vérifie de la même manière :
+#
+#   python -m hitori unique DOSSIER
+#
+# Les grilles identiques à une rotation, un miroir ou un renommage
+# des valeurs près sont regroupées avec :
+#
+#   python -m hitori dedup DOSSIER
+#
+# Les grilles d'un dossier se regroupent dans un paquet binaire
+# (voir pack.py), et inversement :
+#
+#   python -m hitori pack DOSSIER niveaux.htp
+#   python -m hitori unpack niveaux.htp DOSSIER
+#
+# Les grilles d'un dossier peuvent enfin être servies à d'autres
+# programmes, qui demandent validations, indices et solutions en
+# JSON (voir server.py) :
+#
+#   python -m hitori serve DOSSIER --port 8765
+#   python -m hitori load --port 8765
+#
+# Les doctests des modules se lancent à la demande :
+#
+#   python -m hitori test
+#
+
+def solve_file(file_name: str, timeout: float = None, jobs: int = 1):
+    """
+    Lit et résout une grille, en mesurant le temps écoulé.
+    :param file_name: Nom du fichier contenant la grille.
+    :param timeout: Temps maximal de résolution en secondes, ou None.
+    :param jobs: Nombre de processus de la recherche.
+    :return: Dictionnaire décrivant le résultat.
+
+    >>> result = solve_file("grille.hti")
+    >>> result["status"], result["solution"]
+    ('solved', [[0, 0], [0, 2], [1, 4], [2, 0], [2, 2], [3, 1], [3, 3]])
+    >>> solve_file("vide.hti")["error"]
+    'Le fichier est vide !'
+    """
+    result = {"file": file_name, "status": None, "solution": None}
+    start = perf_counter()
+    try:
+        solver = searcher(read_grid(file_name, set()), jobs)
+        solution = solver.solve(timeout=timeout)
+        result["nodes"] = solver.nodes
+    except GridError as error:
+        result["status"] = "error"
+        result["error"] = str(error)
+    except TimeoutError:
+        result["status"] = "timeout"
+    else:
+        if solution is None:
+            result["status"] = "unsolvable"
+        else:
+            result["status"] = "solved"
+            result["solution"] = sorted([i, j] for i, j in solution)
+    result["time"] = perf_counter() - start
+    return result
+
+
+def check_file(file_name: str, timeout: float = None, jobs: int = 1):
+    """
+    Lit une grille et vérifie que sa solution est unique, en mesurant le temps écoulé.
+    :param file_name: Nom du fichier contenant la grille.
+    :param timeout: Temps maximal de recherche en secondes, ou None.
+    :param jobs: Nombre de processus de la recherche.
+    :return: Dictionnaire décrivant le résultat.
+
+    >>> result = check_file("grille.hti")
+    >>> result["status"], result["solutions"]
+    ('unique', 1)
+    >>> check_file("grille.hti", jobs=2)["status"]
+    'unique'
+    """
+    result = {"file": file_name, "status": None, "solutions": None}
+    start = perf_counter()
+    stats = dict()
+    try:
+        result["solutions"] = count_solutions(read_grid(file_name, set()), limit=2, stats=stats, timeout=timeout,
+                                              jobs=jobs)
+    except GridError as error:
+        result["status"] = "error"
+        result["error"] = str(error)
+    except TimeoutError:
+        result["status"] = "timeout"
+    else:
+        result["status"] = ("unsolvable", "unique", "multiple")[result["solutions"]]
+    if "nodes" in stats:
+        result["nodes"] = stats["nodes"]
+    result["time"] = perf_counter() - start
+    return result
+
+
+def cached_result(file_name: str, cache, grids: dict):
+    """
+    Cherche dans le cache le résultat de la résolution d'une grille.
+    :param file_name: Nom du fichier contenant la grille.
+    :param cache: Cache des solutions.
+    :param grids: Dictionnaire complété par la grille lue lorsqu'elle est absente du cache.
+    :return: Dictionnaire décrivant le résultat, ou None si la grille doit être résolue.
+    """
+    start = perf_counter()
+    try:
+        grid = read_grid(file_name, set())
+    except GridError:
+        return None
+    found, solution = cache.get(grid)
+    if not found:
+        grids[file_name] = grid
+        return None
+    return {"file": file_name, "status": "unsolvable" if solution is None else "solved",
+            "solution": None if solution is None else sorted([i, j] for i, j in solution),
+            "cached": True, "time": perf_counter() - start}
+
+
+def solve_directory(directory: str, jobs: int = None, timeout: float = None, output=sys.stdout,
+                    task: callable = solve_file, expected: str = "solved"):
+    """
+    Traite en parallèle toutes les grilles d'un dossier et écrit un résultat JSON par ligne.
+    Lors d'une résolution, les grilles déjà présentes dans le cache du dossier ne sont pas résolues à nouveau,
+    et les grilles équivalentes d'un même lot ne sont résolues qu'une fois. S'il reste moins de grilles à traiter
+    que de processus, chacune est traitée à son tour par une recherche répartie sur tous les processus.
+    :param directory: Dossier contenant les fichiers '.hti'.
+    :param jobs: Nombre de processus, ou None pour le nombre de cœurs.
+    :param timeout: Temps maximal de résolution d'une grille en secondes, ou None.
+    :param output: Flux de sortie des résultats.
+    :param task: Fonction appliquée à chaque fichier (solve_file ou check_file).
+    :param expected: Statut attendu d'une grille correcte.
+    :return: Nombre de grilles dont le statut n'est pas celui attendu.
+    """
+    cache = cache_for(directory) if task is solve_file else None
+    grids = dict()
+    waiting = dict()
+    failures = 0
+
+    def write(result):
+        nonlocal failures
+        if result["status"] != expected:
+            failures += 1
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+    def finish(result):
+        followers = list()
+        if result["file"] in grids:
+            followers = waiting.pop(grid_key(canonical_form(grids[result["file"]])[0]), list())
+            if result["status"] in ("solved", "unsolvable"):
+                solution = result["solution"]
+                cache.put(grids[result["file"]], None if solution is None else {(i, j) for i, j in solution})
+        write(result)
+        for file_name in followers:
+            write(cached_result(file_name, cache, grids) or dict(result, file=file_name))
+
+    files = list()
+    for file in grid_files(directory):
+        file_name = os.path.join(directory, file)
+        result = None if cache is None else cached_result(file_name, cache, grids)
+        if result is not None:
+            write(result)
+            continue
+        if file_name in grids:
+            # Une grille équivalente déjà soumise fournira la solution.
+            key = grid_key(canonical_form(grids[file_name])[0])
+            if key in waiting:
+                waiting[key].append(file_name)
+                continue
+            waiting[key] = list()
+        files.append(file_name)
+
+    jobs = jobs or os.cpu_count() or 1
+    if 1 < jobs and len(files) < jobs:
+        for file_name in files:
+            finish(task(file_name, timeout, jobs))
+    elif files:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for future in as_completed([executor.submit(task, file_name, timeout) for file_name in files]):
+                finish(future.result())
+
+    if cache is not None:
+        cache.flush()
+        print("Cache : {hits} succès, {misses} défauts, {size} entrées".format(**cache.stats()), file=sys.stderr)
+    return failures
+
+
+def run_doctests(modules: list = None):
+    """
+    Lance les doctests des modules du jeu.
+    Les modules dont une dépendance n'est pas installée sont signalés puis ignorés.
+    :param modules: Noms des modules, ou None pour tous les modules du dossier du jeu.
+    :return: Nombre de tests en échec.
+    """
+    if not modules:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        modules = sorted(name[:-3] for name in os.listdir(directory) if name.endswith(".py"))
+    failed = 0
+    for name in modules:
+        try:
+            module = import_module(name)
+        except ImportError as error:
+            print("{:<12} indisponible ({})".format(name, error), file=sys.stderr)
+            continue
+        result = doctest.testmod(module)
+        failed += result.failed
+        print("{:<12} {} tests, {} échecs".format(name, result.attempted, result.failed), file=sys.stderr)
+    return failed
+
+
+def main(arguments: list):
+    """
+    Point d'entrée de la ligne de commande.
+    :param arguments: Arguments de la ligne de commande.
+    :return: Code de retour du programme.
+    """
+    parser = ArgumentParser(prog="python -m hitori", description="Outils Hitori sans interface graphique.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    solve_parser = commands.add_parser("solve", help="Résout toutes les grilles '.hti' d'un dossier.")
+    solve_parser.add_argument("directory", help="Dossier contenant les grilles.")
+    solve_parser.add_argument("--jobs", type=int, default=None, help="Nombre de processus.")
+    solve_parser.add_argument("--timeout", type=float, default=None, help="Temps maximal par grille (secondes).")
+
+    unique_parser = commands.add_parser("unique", help="Vérifie l'unicité des solutions des grilles d'un dossier.")
+    unique_parser.add_argument("directory", help="Dossier contenant les grilles.")
+    unique_parser.add_argument("--jobs", type=int, default=None, help="Nombre de processus.")
+    unique_parser.add_argument("--timeout", type=float, default=None, help="Temps maximal par grille (secondes).")
+
+    generate_parser = commands.add_parser("generate", help="Génère des grilles à solution unique.")
+    generate_parser.add_argument("directory", help="Dossier de sortie.")
+    generate_parser.add_argument("--count", type=int, default=100, help="Nombre de grilles.")
+    generate_parser.add_argument("--size", type=int, default=10, help="Taille des grilles.")
+    generate_parser.add_argument("--jobs", type=int, default=None, help="Nombre de processus.")
+    generate_parser.add_argument("--seed", type=int, default=0, help="Graine de la première grille.")
+
+    dedup_parser = commands.add_parser("dedup", help="Regroupe les grilles équivalentes d'un dossier.")
+    dedup_parser.add_argument("directory", help="Dossier contenant les grilles.")
+
+    pack_parser = commands.add_parser("pack", help="Regroupe les grilles '.hti' d'un dossier dans un paquet.")
+    pack_parser.add_argument("directory", help="Dossier contenant les grilles.")
+    pack_parser.add_argument("pack", help="Paquet '.htp' à écrire.")
+
+    unpack_parser = commands.add_parser("unpack", help="Écrit les grilles d'un paquet dans des fichiers '.hti'.")
+    unpack_parser.add_argument("pack", help="Paquet '.htp' à lire.")
+    unpack_parser.add_argument("directory", help="Dossier de sortie.")
+
+    serve_parser = commands.add_parser("serve", help="Sert les grilles d'un dossier (validation, indices, solutions).")
+    serve_parser.add_argument("directory", help="Dossier contenant les grilles.")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Adresse d'écoute TCP.")
+    serve_parser.add_argument("--port", type=int, default=8765, help="Port d'écoute TCP.")
+    serve_parser.add_argument("--socket", default=None, help="Socket Unix à utiliser à la place de TCP.")
+    serve_parser.add_argument("--jobs", type=int, default=None, help="Nombre de processus de résolution.")
+    serve_parser.add_argument("--timeout", type=float, default=SOLVE_BUDGET,
+                              help="Temps maximal par grille (secondes).")
+
+    load_parser = commands.add_parser("load", help="Mesure les temps de réponse du service.")
+    load_parser.add_argument("--host", default="127.0.0.1", help="Adresse TCP du service.")
+    load_parser.add_argument("--port", type=int, default=8765, help="Port TCP du service.")
+    load_parser.add_argument("--socket", default=None, help="Socket Unix du service.")
+    load_parser.add_argument("--connections", type=int, default=8, help="Nombre de connexions simultanées.")
+    load_parser.add_argument("--requests", type=int, default=1000, help="Nombre de requêtes par connexion.")
+    load_parser.add_argument("--directory", default=None, help="Dossier des grilles, pour des requêtes réalistes.")
+    load_parser.add_argument("--seed", type=int, default=0, help="Graine des requêtes.")
+
+    test_parser = commands.add_parser("test", help="Lance les doctests des modules.")
+    test_parser.add_argument("modules", nargs="*", help="Modules à tester (tous par défaut).")
+
+    options = parser.parse_args(arguments)
+    if options.command == "solve":
+        return 1 if solve_directory(options.directory, options.jobs, options.timeout) else 0
+    if options.command == "unique":
+        return 1 if solve_directory(options.directory, options.jobs, options.timeout, task=check_file,
+                                    expected="unique") else 0
+    if options.command == "generate":
+        start = perf_counter()
+        for file_name in generate_files(options.directory, options.count, options.size, jobs=options.jobs,
+                                        seed=options.seed):
+            print(file_name)
+        print("{} grilles générées en {:.1f}s".format(options.count, perf_counter() - start), file=sys.stderr)
+        return 0
+    if options.command == "dedup":
+        groups = duplicates(options.directory)
+        for files in groups:
+            print(json.dumps(files))
+        print("{} groupes de grilles équivalentes".format(len(groups)), file=sys.stderr)
+        return 0
+    if options.command == "pack":
+        print("{} grilles écrites dans {}".format(pack_directory(options.directory, options.pack), options.pack),
+              file=sys.stderr)
+        return 0
+    if options.command == "unpack":
+        try:
+            count = unpack(options.pack, options.directory)
+        except GridError as error:
+            print(error, file=sys.stderr)
+            return 1
+        print("{} grilles écrites dans {}".format(count, options.directory), file=sys.stderr)
+        return 0
+    if options.command == "test":
+        return 1 if run_doctests(options.modules) else 0
+    if options.command == "serve":
+        try:
+            asyncio.run(ValidationServer(options.directory, options.jobs, options.timeout).serve(
+                options.host, options.port, options.socket))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if options.command == "load":
+        try:
+            result = asyncio.run(load(options.host, options.port, options.socket, options.connections,
+                                      options.requests, options.directory, options.seed))
+        except (OSError, GridError) as error:
+            print(error, file=sys.stderr)
+            return 1
+        print(json.dumps(result))
+        return 0
@@ -0,0 +1,568 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from timeit import Timer
+
+from bitboard import Bitboard
+from core import explore, read_grid, related, without_adjacent, without_conflict, write_grid
+from generator import generate, generate_unique
+from parallel import ParallelSolver
+from solver import Solver
+from validator import RuleState
+
+
+# INFORMATIONS SUR LES MESURES
+#
+# Ce script mesure les performances du jeu. Il se lance avec :
+#
+#   python benchmark.py [section...] [--output FICHIER] [--baseline FICHIER]
+#
+# Les sections disponibles sont 'suite', 'bitboard', 'vectorized'
+# (vérification par lots avec NumPy), 'parallel' (recherche
+# répartie sur plusieurs processus), 'moves' (mise à jour des
+# règles et du diagnostic après un coup), 'render' (durée
+# d'une image après un clic), 'idle' (processeur utilisé par une
+# fenêtre inactive), 'startup' (première image et changements
+# d'écran) et 'import'. 'render', 'idle' et 'startup' nécessitent
+# un affichage.
+#
+# La section 'suite' mesure la lecture, l'écriture, les règles,
+# l'exploration et la résolution sur les grilles fournies et sur
+# des grilles générées (graine fixe) de 5x5 à 50x50. Les résultats
+# peuvent être enregistrés en JSON puis comparés à une référence.
+#
+
+IMPORT_BUDGET = 0.02
+SIZES = (5, 10, 15, 20, 30, 40, 50)
+FIXED_CASES = ("grille.hti", "niveau1.hti", "niveau2.hti", "niveau3.hti", "niveau4.hti", "niveau5.hti")
+PARALLEL_CORE = 10
+MOVE_SIZES = (10, 100, 200)
+MOVE_BUDGET = 3
+TIMINGS = ("read_grid", "write_grid", "without_conflict", "without_adjacent", "related", "explore", "solve")
+
+
+def bench(function: callable, repeat: int = 5, target: float = 0.2):
+    """
+    Mesure le temps d'exécution d'une fonction.
+    :param function: Fonction sans paramètre à mesurer.
+    :param repeat: Nombre de séries de mesures.
+    :param target: Durée minimale d'une série, en secondes.
+    :return: Meilleur temps moyen d'un appel, en secondes.
+    """
+    timer = Timer(function)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= target:
+            break
+        number = max(2 * number, int(number * target / max(elapsed, 1e-9)))
+    return min([elapsed] + timer.repeat(repeat - 1, number)) / number
+
+
+def allocated(function: callable):
+    """
+    Mesure la mémoire allouée par une fonction pour construire son résultat.
+    :param function: Fonction sans paramètre à mesurer.
+    :return: Nombre d'octets encore alloués après l'appel.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def sample(size: int):
+    """
+    Construit une grille sans conflit et un motif de cellules noircies non adjacentes.
+    Les vérifications parcourent ainsi toute la grille sans s'arrêter en chemin.
+    :param size: Taille de la grille.
+    :return: Couple (grille, cellules noircies).
+
+    >>> grid, blackened = sample(3)
+    >>> grid, sorted(blackened)
+    ([[1, 2, 3], [2, 3, 1], [3, 1, 2]], [(0, 0), (1, 2)])
+    """
+    grid = [[(i + j) % size + 1 for j in range(size)] for i in range(size)]
+    blackened = {(i, j) for i in range(size) for j in range(size) if (i + 2 * j) % 5 == 0}
+    return grid, blackened
+
+
+def peak_memory(function: callable):
+    """
+    Mesure le pic de mémoire allouée pendant l'exécution d'une fonction.
+    :param function: Fonction sans paramètre à mesurer.
+    :return: Pic d'octets alloués.
+    """
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def cases(sizes: tuple = SIZES, seed: int = 0):
+    """
+    Énumère les grilles du banc d'essai : grilles fournies puis grilles générées.
+    :param sizes: Tailles des grilles générées.
+    :param seed: Graine de génération.
+    :return: Générateur de couples (nom, grille).
+
+    >>> [name for name, grid in cases((5, 10))]
+    ['grille.hti', 'niveau1.hti', 'niveau2.hti', 'niveau3.hti', 'niveau4.hti', 'niveau5.hti', '5x5', '10x10']
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for file in FIXED_CASES:
+        yield file, read_grid(os.path.join(directory, file), set())
+    for size in sizes:
+        yield "{0}x{0}".format(size), generate(size, seed=seed + size)[0]
+
+
+def measure(grid: list, directory: str):
+    """
+    Mesure toutes les opérations sur une grille.
+    :param grid: Liste de listes décrivant la grille.
+    :param directory: Dossier temporaire pour les fichiers.
+    :return: Dictionnaire des mesures (temps en secondes, mémoire en octets).
+    """
+    solver = Solver(grid)
+    blackened = solver.solve()
+    file_name = os.path.join(directory, "grille.hti")
+    write_grid(grid, blackened, file_name)
+    start = next((i, j) for i in range(len(grid)) for j in range(len(grid[0])) if (i, j) not in blackened)
+
+    results = {
+        "size": [len(grid), len(grid[0])],
+        "read_grid": bench(lambda: read_grid(file_name, set()), 3, 0.02),
+        "write_grid": bench(lambda: write_grid(grid, blackened, file_name), 3, 0.02),
+        "without_conflict": bench(lambda: without_conflict(grid, blackened), 3, 0.02),
+        "without_adjacent": bench(lambda: without_adjacent(grid, blackened), 3, 0.02),
+        "related": bench(lambda: related(grid, blackened), 3, 0.02),
+        "explore": bench(lambda: explore(grid, start[0], start[1], blackened, set()), 3, 0.02),
+        "solve": bench(solver.solve, 3, 0.02),
+        "nodes": solver.nodes,
+        "peak_memory": peak_memory(solver.solve),
+    }
+    results["nodes_per_second"] = results["nodes"] / results["solve"]
+    return results
+
+
+def bench_suite(sizes: tuple = SIZES, seed: int = 0):
+    """
+    Mesure les opérations du jeu sur l'ensemble des grilles du banc d'essai.
+    :param sizes: Tailles des grilles générées.
+    :param seed: Graine de génération.
+    :return: Dictionnaire des mesures par grille.
+    """
+    results = dict()
+    print("{:<12}".format("Grille") + "".join("{:>18}".format(name) for name in TIMINGS) +
+          "{:>12}{:>12}".format("Nœuds/s", "Mémoire"))
+    with TemporaryDirectory() as directory:
+        for name, grid in cases(sizes, seed):
+            results[name] = measure(grid, directory)
+            print("{:<12}".format(name) +
+                  "".join("{:>16.1f}µs".format(results[name][timing] * 1e6) for timing in TIMINGS) +
+                  "{:>12.0f}{:>11.0f}k".format(results[name]["nodes_per_second"], results[name]["peak_memory"] / 1e3))
+    return results
+
+
+def compare(results: dict, baseline: dict):
+    """
+    Affiche le rapport entre les temps mesurés et ceux d'une référence.
+    :param results: Mesures actuelles de la section 'suite'.
+    :param baseline: Mesures de référence de la section 'suite'.
+
+    Les temps absents de la référence, enregistrée avant leur ajout, sont affichés '-'.
+
+    >>> compare({"5x5": {"solve": 1.0}}, {"5x5": {"solve": 2.0}})
+    Grille                   solve
+    5x5                      0.50x
+    >>> compare({"5x5": {"explore": 1.0, "solve": 1.0}}, {"5x5": {"solve": 4.0}})
+    Grille                 explore             solve
+    5x5                          -             0.25x
+    """
+    timings = [timing for timing in TIMINGS if any(timing in case for case in results.values())]
+    print("{:<12}".format("Grille") + "".join("{:>18}".format(timing) for timing in timings))
+    for name, case in results.items():
+        if name not in baseline:
+            continue
+        reference = baseline[name]
+        print("{:<12}".format(name) + "".join("{:>17.2f}x".format(case[timing] / reference[timing])
+                                              if timing in case and reference.get(timing) else "{:>18}".format("-")
+                                              for timing in timings))
+
+
+def bench_bitboard(sizes: tuple = (10, 20, 30, 50)):
+    """
+    Compare les vérifications de core.py, qui construisent à chaque appel les lignes noircies de la
+    représentation en bits (les masques des valeurs étant conservés, voir bitboard.board_for),
+    et les mêmes vérifications sur une représentation déjà construite.
+    La connexité de core.py reste vérifiée par le moteur de connectivity.py.
+    :param sizes: Tailles des grilles mesurées.
+    :return: Dictionnaire des gains par taille et par règle.
+    """
+    results = dict()
+    print("{:>6} {:<18} {:>12} {:>12} {:>8}".format("Taille", "Règle", "core.py", "Bits", "Gain"))
+    for size in sizes:
+        grid, blackened = sample(size)
+        board = Bitboard.from_grid(grid, blackened)
+
+        for name, function in (("without_conflict", without_conflict), ("without_adjacent", without_adjacent),
+                               ("related", related)):
+            with_set = bench(lambda: function(grid, blackened))
+            with_bits = bench(getattr(board, name))
+            results.setdefault(size, dict())[name] = with_set / with_bits
+            print("{:>6} {:<18} {:>10.1f}µs {:>10.1f}µs {:>7.1f}x".format(
+                size, name, with_set * 1e6, with_bits * 1e6, with_set / with_bits))
+
+        # Coût mémoire d'une copie de l'état, telle que faite pour l'historique.
+        with_set = allocated(lambda: {(i, j) for i, j in blackened})
+        with_bits = allocated(board.copy)
+        print("{:>6} {:<18} {:>11}o {:>11}o {:>7.1f}x".format(
+            size, "copie (mémoire)", with_set, with_bits, with_set / with_bits))
+    return results
+
+
+def bench_vectorized(sizes: tuple = (10, 20, 50), count: int = 2000, seed: int = 0):
+    """
+    Compare la vérification de propositions une à une et par lots.
+    Les propositions sont la solution d'une grille générée, dont une sur trois a une cellule inversée.
+    :param sizes: Tailles des grilles mesurées.
+    :param count: Nombre de propositions par lot.
+    :param seed: Graine de génération.
+    :return: Dictionnaire des débits (propositions par seconde) par taille.
+    """
+    try:
+        import vectorized
+    except ImportError:
+        print("Vérification par lots indisponible : NumPy n'est pas installé")
+        return dict()
+
+    results = dict()
+    rng = Random(seed)
+    print("{:>6} {:>14} {:>14} {:>8}".format("Taille", "Une à une", "Par lots", "Gain"))
+    for size in sizes:
+        grid, solution = generate(size, seed=seed + size)
+        candidates = list()
+        for _ in range(count):
+            candidates.append(set(solution) if rng.random() < 2 / 3 else
+                              solution ^ {(rng.randrange(size), rng.randrange(size))})
+        masks = vectorized.to_masks(grid, candidates)
+
+        one_by_one = bench(lambda: [without_conflict(grid, blackened) and without_adjacent(grid, blackened) and
+                                    related(grid, blackened) for blackened in candidates], 3, 0.2) / count
+        batch = bench(lambda: vectorized.is_solution(grid, masks), 3, 0.2) / count
+        results[size] = {"one_by_one": 1 / one_by_one, "batch": 1 / batch}
+        print("{:>6} {:>12.0f}/s {:>12.0f}/s {:>7.1f}x".format(size, 1 / one_by_one, 1 / batch, one_by_one / batch))
+    return results
+
+
+def embed(core: list, size: int):
+    """
+    Place une grille dans le coin d'une grille plus grande dont les autres cellules ne se répètent jamais.
+    Ces cellules restent blanches dès la propagation initiale : toute la recherche porte sur la grille placée.
+    :param core: Liste de listes décrivant la grille placée.
+    :param size: Taille de la grande grille.
+    :return: Liste de listes décrivant la grande grille.
+
+    >>> embed([[1, 1], [1, 2]], 4)
+    [[1, 1, 5, 6], [1, 2, 6, 3], [5, 6, 3, 4], [6, 3, 4, 5]]
+    """
+    height, width = len(core), len(core[0])
+    return [[core[i][j] if i < height and j < width else max(height, width) + 1 + (i + j) % size
+             for j in range(size)] for i in range(size)]
+
+
+def bench_parallel(size: int = 20, core: int = PARALLEL_CORE, seed: int = 0):
+    """
+    Compare la recherche sur un seul cœur et la recherche répartie sur un nombre croissant de processus.
+    Les grilles générées à solution unique se résolvent sans branchement : solve() et count(limit=2) y sont
+    mesurés à titre indicatif. La comparaison compte donc toutes les solutions d'une grille bâtie autour
+    d'une grille générée qui en admet des milliers : l'arbre exploré est le même quel que soit le nombre
+    de processus, contrairement à une recherche limitée aux premières solutions trouvées.
+    :param size: Taille des grilles.
+    :param core: Taille de la grille générée au cœur de la grille comptée.
+    :param seed: Graine de génération.
+    :return: Dictionnaire des durées par nombre de processus, en secondes, 0 désignant la recherche sur un cœur.
+    """
+    unique = generate_unique(size, seed=seed + size)[0]
+    for name, search in (("solve", lambda solver: solver.solve()), ("count(2)", lambda solver: solver.count(limit=2))):
+        solver = Solver(unique)
+        start = perf_counter()
+        search(solver)
+        print("{}x{} unique, {:<8} : {:.4f}s, {} nœud(s)".format(size, size, name, perf_counter() - start,
+                                                                  solver.nodes))
+
+    grid = embed(generate(core, seed=seed + 2)[0], size)
+    solver = Solver(grid)
+    start = perf_counter()
+    count = solver.count()
+    results = {0: perf_counter() - start}
+    print("{}x{} autour d'une grille {}x{} : {} solutions, {} nœuds".format(size, size, core, core, count,
+                                                                           solver.nodes))
+    print("{:>10} {:>10} {:>8} {:>10}".format("Processus", "Durée", "Gain", "Efficacité"))
+    print("{:>10} {:>9.2f}s".format("série", results[0]))
+    for jobs in sorted({1, 2, 4, os.cpu_count() or 1}):
+        start = perf_counter()
+        ParallelSolver(grid, jobs).count()
+        results[jobs] = perf_counter() - start
+        print("{:>10} {:>9.2f}s {:>7.2f}x {:>9.0f}%".format(
+            jobs, results[jobs], results[0] / results[jobs], 100 * results[0] / results[jobs] / jobs))
+    return results
+
+
+def bench_moves(sizes: tuple = MOVE_SIZES):
+    """
+    Mesure la mise à jour des règles après un coup, telle que la fait chaque image du jeu : inversion d'une
+    cellule, diagnostic des cellules fautives, connexité et victoire. Cette durée ne doit pas dépendre
+    de la taille de la grille : le budget est dépassé si elle croît de plus de MOVE_BUDGET fois.
+    :param sizes: Tailles des grilles mesurées.
+    :return: Dictionnaire des durées d'un coup par taille, en secondes, avec la clé 'budget'.
+    """
+    results = dict()
+    print("{:>6} {:>12}".format("Taille", "Coup"))
+    for size in sizes:
+        grid, blackened = sample(size)
+        rules = RuleState(grid, set(blackened))
+        rules.diagnostics()
+        cells = [(size // 2, size // 2 + k) for k in range(5)] + [(0, 1), (size - 1, size - 2)]
+
+        def moves():
+            for cell in cells:
+                rules.toggle(cell)
+                rules.diagnostics()
+                rules.related()
+                rules.is_won()
+
+        results[size] = bench(moves, 3, 0.2) / len(cells)
+        print("{:>6} {:>10.4f}ms".format(size, results[size] * 1e3))
+    timings = [results[size] for size in sizes]
+    results["budget"] = max(timings) < MOVE_BUDGET * min(timings)
+    return results
+
+
+def bench_render(sizes: tuple = MOVE_SIZES, area: int = 800):
+    """
+    Compare la durée d'un clic suivi d'une image, mise à jour des règles et du diagnostic comprise :
+    redessin complet de la grille ou redessin des seules cellules visibles modifiées, puis mesure
+    un défilement de la partie visible.
+    Nécessite un affichage graphique.
+    :param sizes: Tailles des grilles mesurées.
+    :param area: Côté en pixels de la zone où la grille est affichée.
+    :return: Dictionnaire des durées d'une image par taille, en secondes.
+    """
+    try:
+        import upemtk
+        from hitori import MARGIN, GridView, Viewport, draw_grid, fit_cell_size
+    except ImportError:
+        print("Rendu indisponible : upemtk n'est pas installé")
+        return dict()
+
+    results = dict()
+    print("{:>6} {:>14} {:>14} {:>8} {:>14}".format("Taille", "Complet", "Modifiées", "Gain", "Défilement"))
+    for size in sizes:
+        grid, blackened = sample(size)
+        rules = RuleState(grid, set(blackened))
+        cell = fit_cell_size(size, size, area, area)
+        side = min(size, area // cell) * cell
+        try:
+            upemtk.cree_fenetre(2 * MARGIN + side, 2 * MARGIN + side)
+        except Exception as error:
+            print("Rendu indisponible :", error)
+            return results
+
+        def full():
+            rules.toggle((0, 1))
+            upemtk.efface_tout()
+            draw_grid(grid, rules.blackened, rules.diagnostics())
+            upemtk.mise_a_jour()
+
+        view = GridView(grid, Viewport(size, size, side, side, cell))
+        view.draw(rules.blackened, rules.diagnostics())
+
+        def retained():
+            rules.toggle((0, 1))
+            view.update(rules.blackened, rules.diagnostics())
+            upemtk.mise_a_jour()
+
+        moves = [1, -1]
+
+        def scrolled():
+            moves.reverse()
+            view.viewport.scroll(moves[0], moves[0])
+            view.draw(rules.blackened, rules.diagnostics())
+            upemtk.mise_a_jour()
+
+        with_full, with_retained, with_scroll = bench(full, 3, 0.1), bench(retained, 3, 0.1), bench(scrolled, 3, 0.1)
+        upemtk.ferme_fenetre()
+        results[size] = {"full": with_full, "retained": with_retained, "scroll": with_scroll}
+        print("{:>6} {:>12.2f}ms {:>12.2f}ms {:>7.1f}x {:>12.2f}ms".format(
+            size, with_full * 1e3, with_retained * 1e3, with_full / with_retained, with_scroll * 1e3))
+    return results
+
+
+def bench_idle(duration: float = 1.0):
+    """
+    Mesure l'utilisation du processeur d'une fenêtre inactive, avec et sans attente entre deux images.
+    Nécessite un affichage graphique.
+    :param duration: Durée de chaque mesure en secondes.
+    :return: Dictionnaire des proportions de temps processeur.
+    """
+    try:
+        import upemtk
+        from hitori import EventLoop
+    except ImportError:
+        print("Mesure indisponible : upemtk n'est pas installé")
+        return dict()
+    try:
+        upemtk.cree_fenetre(100, 100)
+    except Exception as error:
+        print("Mesure indisponible :", error)
+        return dict()
+
+    # Sans attente, la boucle consulte la file d'événements en continu.
+    polling = EventLoop()
+    polling.period = 0
+    results = {"sleeping": EventLoop().idle_usage(duration), "polling": polling.idle_usage(duration)}
+    upemtk.ferme_fenetre()
+    for name, usage in results.items():
+        print("{:<10} {:>6.1f}% CPU".format(name, usage * 100))
+    return results
+
+
+def bench_startup(repeat: int = 10):
+    """
+    Mesure la durée de la première image du menu, puis celle d'un changement d'écran (menu, liste des grilles,
+    partie), en réutilisant la fenêtre ou en la recréant comme auparavant. Nécessite un affichage graphique.
+    :param repeat: Nombre de tours des écrans.
+    :return: Dictionnaire des durées en secondes.
+    """
+    try:
+        import upemtk
+        import hitori
+    except ImportError:
+        print("Mesure indisponible : upemtk n'est pas installé")
+        return dict()
+
+    screens = (("liste", hitori.GameList), ("partie", lambda: hitori.Hitori("niveau1.hti")), ("menu", hitori.Menu))
+
+    def show(screen: callable):
+        start = perf_counter()
+        screen = screen()
+        screen.draw_elements()
+        upemtk.mise_a_jour()
+        return perf_counter() - start
+
+    try:
+        results = {"startup": show(hitori.Menu)}
+    except Exception as error:
+        print("Mesure indisponible :", error)
+        return dict()
+
+    def recreate(screen: callable):
+        def recreated():
+            upemtk.ferme_fenetre()
+            hitori.window_size = None
+            return screen()
+        return recreated
+
+    with TemporaryDirectory() as directory:
+        # La partie enregistre son journal à côté de la grille : elle est jouée dans une copie.
+        write_grid(read_grid("niveau1.hti", set()), set(), os.path.join(directory, "niveau1.hti"))
+        current = os.getcwd()
+        os.chdir(directory)
+        try:
+            for mode, wrap in (("reused", lambda screen: screen), ("recreated", recreate)):
+                for name, screen in screens:
+                    results["{}_{}".format(mode, name)] = min(show(wrap(screen)) for _ in range(repeat))
+        finally:
+            os.chdir(current)
+    upemtk.ferme_fenetre()
+    hitori.window_size = None
+
+    print("{:<10} {:>8.1f}ms".format("démarrage", results["startup"] * 1e3))
+    print("{:<10} {:>12} {:>12}".format("Écran", "Réutilisée", "Recréée"))
+    for name, _ in screens:
+        print("{:<10} {:>10.1f}ms {:>10.1f}ms".format(name, results["reused_" + name] * 1e3,
+                                                    results["recreated_" + name] * 1e3))
+    return results
+
+
+def import_time(module: str, repeat: int = 5):
+    """
+    Mesure le temps d'import d'un module dans un interpréteur neuf.
+    :param module: Nom du module.
+    :param repeat: Nombre de mesures.
+    :return: Couple (meilleur temps en secondes, booléen indiquant si tkinter a été importé).
+    """
+    code = "import sys, time; t = time.perf_counter(); import {}; " \
+           "print(time.perf_counter() - t, 'tkinter' in sys.modules)".format(module)
+    results = list()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+        results.append((float(output[0]), output[1] == "True"))
+    return min(results)
+
+
+def bench_import():
+    """
+    Vérifie que le cœur du jeu s'importe rapidement et sans tkinter.
+    :return: Dictionnaire des temps d'import, avec la clé 'budget' indiquant si le budget est respecté.
+    """
+    results = dict()
+    for module in ("core", "hitori"):
+        try:
+            seconds, graphical = import_time(module)
+        except subprocess.CalledProcessError:
+            print("{:<8} indisponible".format(module))
+            continue
+        results[module] = seconds
+        print("{:<8} {:>8.2f}ms {}".format(module, seconds * 1e3, "tkinter" if graphical else "sans tkinter"))
+        if module == "core":
+            results["budget"] = seconds < IMPORT_BUDGET and not graphical
+    return results
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Mesures de performances du jeu.")
+    parser.add_argument("sections", nargs="*", help="Sections à mesurer (toutes par défaut).")
+    parser.add_argument("--seed", type=int, default=0, help="Graine des grilles générées.")
+    parser.add_argument("--output", help="Fichier JSON où enregistrer les mesures.")
+    parser.add_argument("--baseline", help="Fichier JSON de référence à comparer.")
+    options = parser.parse_args()
+    sections = {"suite": lambda: bench_suite(seed=options.seed), "bitboard": bench_bitboard,
+                "vectorized": lambda: bench_vectorized(seed=options.seed),
+                "parallel": lambda: bench_parallel(seed=options.seed), "moves": bench_moves,
+                "render": bench_render, "idle": bench_idle, "startup": bench_startup, "import": bench_import}
+    unknown = [section for section in options.sections if section not in sections]
+    if unknown:
+        parser.error("section inconnue : {} (choisir parmi {})".format(", ".join(unknown), ", ".join(sections)))
+
+    results = {"python": platform.python_version(), "machine": platform.machine()}
+    for section in options.sections or sections:
+        print("==", section)
+        results[section] = sections[section]()
+
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if options.baseline and "suite" in results:
+        with open(options.baseline) as file:
+            print("== comparaison avec", options.baseline)
+            compare(results["suite"], json.load(file).get("suite", dict()))
+
+    failed = [section for section in sections if isinstance(results.get(section), dict) and
+              results[section].get("budget") is False]
+    if failed:
+        print("Budget dépassé :", ", ".join(failed))
+        sys.exit(1)
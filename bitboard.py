@@ -0,0 +1,230 @@
+# INFORMATIONS SUR LA REPRÉSENTATION EN BITS
+#
+# Chaque ligne (et chaque colonne) est décrite par un entier dont
+# le bit j (resp. i) vaut 1 lorsque la cellule est noircie. Pour
+# chaque valeur, un masque par ligne et par colonne indique les
+# positions où elle apparaît.
+#
+# Les règles se vérifient alors par des décalages, des ET et des
+# OU sur ces entiers plutôt que cellule par cellule.
+#
+# Les vérifications de core.py passent par cette représentation.
+# Les masques des valeurs ne dépendent que de la grille : ils sont
+# conservés pour les BOARD_CACHE dernières grilles (voir board_for),
+# et seules les lignes et colonnes noircies sont construites à
+# chaque appel, en temps proportionnel au nombre de cellules noircies.
+#
+
+BOARD_CACHE = 8
+
+
+class Bitboard:
+
+    def __init__(self, height: int, width: int):
+        """Crée une grille vide de la taille donnée."""
+        self.height = height
+        self.width = width
+        self.full_row = (1 << width) - 1
+        self.rows = [0] * height
+        self.columns = [0] * width
+        self.row_values = [dict() for _ in range(height)]
+        self.column_values = [dict() for _ in range(width)]
+        self.row_duplicates = [list() for _ in range(height)]
+        self.column_duplicates = [list() for _ in range(width)]
+
+    @classmethod
+    def from_grid(cls, grid: list, blackened: set):
+        """
+        Construit la représentation en bits d'une grille.
+        :param grid: Liste de listes décrivant la grille.
+        :param blackened: Ensemble des cellules noircies.
+        :return: Instance de Bitboard.
+
+        >>> board = Bitboard.from_grid([[1, 2], [2, 1]], {(0, 1)})
+        >>> board.rows, board.columns
+        ([2, 0], [0, 1])
+        """
+        board = cls(len(grid), len(grid[0]))
+        for i, line in enumerate(grid):
+            row_values = board.row_values[i]
+            for j, value in enumerate(line):
+                row_values[value] = row_values.get(value, 0) | 1 << j
+                column_values = board.column_values[j]
+                column_values[value] = column_values.get(value, 0) | 1 << i
+        for i, j in blackened:
+            board.rows[i] |= 1 << j
+            board.columns[j] |= 1 << i
+
+        # Seules les valeurs présentes plusieurs fois peuvent être en conflit.
+        for values, duplicates in zip(board.row_values + board.column_values,
+                                      board.row_duplicates + board.column_duplicates):
+            duplicates.extend(mask for mask in values.values() if mask & (mask - 1))
+        return board
+
+    def to_grid(self):
+        """
+        Reconstruit la liste de listes décrivant la grille.
+        :return: Liste de listes décrivant la grille.
+
+        >>> Bitboard.from_grid([[1, 2], [2, 1]], set()).to_grid()
+        [[1, 2], [2, 1]]
+        """
+        grid = [[0] * self.width for _ in range(self.height)]
+        for i, row_values in enumerate(self.row_values):
+            for value, mask in row_values.items():
+                for j in range(self.width):
+                    if mask >> j & 1:
+                        grid[i][j] = value
+        return grid
+
+    def to_blackened(self):
+        """
+        Reconstruit l'ensemble des cellules noircies.
+        :return: Ensemble des cellules noircies.
+
+        >>> sorted(Bitboard.from_grid([[1, 2], [2, 1]], {(0, 1), (1, 0)}).to_blackened())
+        [(0, 1), (1, 0)]
+        """
+        return {(i, j) for i, row in enumerate(self.rows) for j in range(self.width) if row >> j & 1}
+
+    def copy(self):
+        """
+        Copie l'état des cellules noircies en partageant les masques de valeurs, qui ne changent pas.
+        :return: Nouvelle instance de Bitboard.
+        """
+        board = Bitboard.__new__(Bitboard)
+        board.__dict__.update(self.__dict__)
+        board.rows = self.rows[:]
+        board.columns = self.columns[:]
+        return board
+
+    def with_blackened(self, blackened: set):
+        """
+        Copie la grille avec les cellules noircies données, en partageant les masques de valeurs.
+        :param blackened: Ensemble des cellules noircies.
+        :return: Nouvelle instance de Bitboard.
+
+        >>> Bitboard.from_grid([[1, 2], [2, 1]], set()).with_blackened({(0, 1)}).rows
+        [2, 0]
+        """
+        board = Bitboard.__new__(Bitboard)
+        board.__dict__.update(self.__dict__)
+        board.rows = [0] * self.height
+        board.columns = [0] * self.width
+        for i, j in blackened:
+            board.rows[i] |= 1 << j
+            board.columns[j] |= 1 << i
+        return board
+
+    def toggle(self, cell: tuple):
+        """
+        Inverse l'état d'une cellule.
+        :param cell: Coordonnées de la cellule.
+        """
+        i, j = cell
+        self.rows[i] ^= 1 << j
+        self.columns[j] ^= 1 << i
+
+    def without_conflict(self):
+        """
+        Vérifie que chaque numéro n'apparaisse qu'une fois par ligne et par colonne. (Règle n°1)
+        :return: Booléen déterminant s'il y a conflit.
+
+        >>> board = Bitboard.from_grid([[1, 1], [2, 3]], set())
+        >>> board.without_conflict()
+        False
+        >>> board.toggle((0, 1))
+        >>> board.without_conflict()
+        True
+        """
+        for masks, black in ((self.row_duplicates, self.rows), (self.column_duplicates, self.columns)):
+            for duplicates, blackened in zip(masks, black):
+                for mask in duplicates:
+                    # Au plus un bit de la valeur doit rester parmi les cellules blanches.
+                    mask &= ~blackened
+                    if mask & (mask - 1):
+                        return False
+        return True
+
+    def without_adjacent(self):
+        """
+        Vérifie qu'aucune cellule noircies ne soit adjacente à une autre. (Règle n°2)
+        :return: Booléen déterminant s'il y a des cellules noircies voisines.
+
+        >>> Bitboard.from_grid([[1, 2], [2, 1]], {(0, 0), (1, 1)}).without_adjacent()
+        True
+        >>> Bitboard.from_grid([[1, 2], [2, 1]], {(0, 0), (1, 0)}).without_adjacent()
+        False
+        """
+        previous = 0
+        for row in self.rows:
+            if row & (row >> 1) or row & previous:
+                return False
+            previous = row
+        return True
+
+    def related(self):
+        """
+        Vérifie que la zone formée par toutes les cellules non noircies soit connexe. (Règle n°3)
+        La zone est propagée ligne par ligne à coups de décalages jusqu'à stabilisation.
+        :return: Booléen déterminant si la zone non noircies est connexe.
+
+        >>> Bitboard.from_grid([[1, 2, 3], [4, 5, 6]], {(0, 1)}).related()
+        True
+        >>> Bitboard.from_grid([[1, 2, 3], [4, 5, 6]], {(0, 1), (1, 0)}).related()
+        False
+        """
+        whites = [self.full_row & ~row for row in self.rows]
+        start = next((i for i, white in enumerate(whites) if white), None)
+        if start is None:
+            return False
+
+        reached = [0] * self.height
+        reached[start] = whites[start] & -whites[start]
+        changed = True
+        while changed:
+            changed = False
+            for i in list(range(self.height)) + list(range(self.height - 2, -1, -1)):
+                row = reached[i]
+                if i > 0:
+                    row |= reached[i - 1]
+                if i < self.height - 1:
+                    row |= reached[i + 1]
+                row &= whites[i]
+
+                # Extension horizontale jusqu'à remplir le segment blanc.
+                while True:
+                    extended = (row | row << 1 | row >> 1) & whites[i]
+                    if extended == row:
+                        break
+                    row = extended
+
+                if row != reached[i]:
+                    reached[i] = row
+                    changed = True
+
+        return reached == whites
+
+
+_boards = dict()
+
+
+def board_for(grid: list, blackened: set):
+    """
+    Retourne la représentation en bits d'une grille, dont les masques de valeurs sont conservés entre les appels.
+    :param grid: Liste de listes décrivant la grille.
+    :param blackened: Ensemble des cellules noircies.
+    :return: Instance de Bitboard.
+
+    >>> board_for([[1, 2], [2, 1]], {(0, 1)}).rows, board_for([[1, 2], [2, 1]], set()).rows
+    ([2, 0], [0, 0])
+    """
+    # Le dictionnaire garde l'ordre d'insertion : la grille utilisée est replacée à la fin, la plus ancienne retirée.
+    key = tuple(map(tuple, grid))
+    board = _boards.pop(key, None)
+    if board is None:
+        board = Bitboard.from_grid(grid, set())
+        if len(_boards) >= BOARD_CACHE:
+            del _boards[next(iter(_boards))]
+    _boards[key] = board
+    return board.with_blackened(blackened)
@@ -0,0 +1,230 @@
+import json
+import os
+from collections import OrderedDict
+from hashlib import blake2b
+
+from canonical import canonical_form, canonical_solution, restore_solution
+from solver import Solver
+
+CACHE_FILE = ".hitori-cache.json"
+CAPACITY = 10000
+
+
+# INFORMATIONS SUR LE CACHE DES SOLUTIONS
+#
+# Les solutions sont indexées par une empreinte de la forme
+# canonique de la grille (voir canonical.py) : les grilles obtenues
+# par rotation, miroir ou renommage des valeurs partagent ainsi la
+# même entrée, exprimée dans les coordonnées de la forme canonique.
+# Le cache est d'abord consulté en mémoire puis, au premier
+# défaut, chargé depuis un fichier JSON placé à côté des grilles.
+#
+# La forme canonique coûte cher à calculer sur les grandes grilles
+# (plusieurs millisecondes au-delà de 30x30) : chaque grille déjà
+# rencontrée garde en mémoire, sous l'empreinte de son contenu
+# brut, son empreinte canonique, sa transformation et sa dernière
+# solution décodée. Une grille déjà vue ne coûte alors qu'une
+# empreinte ; la forme canonique n'est calculée que pour une
+# grille inconnue.
+#
+# Une solution est stockée sous forme d'entier hexadécimal dont le
+# bit i * largeur + j vaut 1 si la cellule (i, j) est noircie, ou
+# None si la grille n'a pas de solution. L'ordre des entrées suit
+# l'ordre d'utilisation : les moins récentes sont évincées lorsque
+# la capacité est dépassée.
+#
+
+def grid_key(grid: list):
+    """
+    Calcule l'empreinte du contenu d'une grille.
+    :param grid: Liste de listes décrivant la grille.
+    :return: Empreinte hexadécimale.
+
+    >>> grid_key([[1, 2], [3, 4]]) == grid_key([[1, 2], [3, 4]]), grid_key([[1, 2], [3, 4]]) == grid_key([[1, 2, 3, 4]])
+    (True, False)
+    """
+    text = "{} {}:{}".format(len(grid), len(grid[0]), ",".join(str(value) for line in grid for value in line))
+    return blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def encode(solution: set, width: int):
+    """
+    Encode un ensemble de cellules noircies sous forme de masque hexadécimal.
+    :param solution: Ensemble des cellules noircies, ou None.
+    :param width: Largeur de la grille.
+    :return: Masque hexadécimal, ou None.
+
+    >>> encode({(0, 1), (1, 0)}, 2)
+    '6'
+    """
+    if solution is None:
+        return None
+    return "{:x}".format(sum(1 << (i * width + j) for i, j in solution))
+
+
+def decode(mask: str, width: int):
+    """
+    Décode un masque hexadécimal en ensemble de cellules noircies.
+    :param mask: Masque hexadécimal, ou None.
+    :param width: Largeur de la grille.
+    :return: Ensemble des cellules noircies, ou None.
+
+    >>> sorted(decode('6', 2))
+    [(0, 1), (1, 0)]
+    """
+    if mask is None:
+        return None
+    # Les bits sont lus dans l'écriture binaire du masque, du plus faible au plus fort.
+    bits = bin(int(mask, 16))[:1:-1]
+    return {divmod(cell, width) for cell, bit in enumerate(bits) if bit == "1"}
+
+
+class SolutionCache:
+
+    def __init__(self, file_name: str = None, capacity: int = CAPACITY):
+        """Crée un cache, éventuellement adossé à un fichier."""
+        self.file_name = file_name
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.aliases = OrderedDict()
+        self.restored = dict()
+        self.loaded = file_name is None
+        self.changed = False
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """Charge les entrées du fichier, sans écraser celles déjà présentes en mémoire."""
+        self.loaded = True
+        try:
+            with open(self.file_name) as file:
+                stored = json.load(file)
+        except (OSError, ValueError):
+            return
+        # Les entrées du fichier sont moins récentes que celles déjà en mémoire.
+        for key, mask in reversed(list(stored.items())):
+            if key not in self.entries:
+                self.entries[key] = mask
+                self.entries.move_to_end(key, last=False)
+        self.evict()
+
+    def evict(self):
+        """Retire les entrées les moins récemment utilisées au-delà de la capacité."""
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.changed = True
+
+    def canonical(self, grid: list):
+        """
+        Retourne l'empreinte canonique d'une grille, en ne calculant sa forme canonique qu'à la première rencontre.
+        :param grid: Liste de listes décrivant la grille.
+        :return: Quadruplet (empreinte brute, empreinte canonique, grille canonique, transformation).
+
+        >>> cache = SolutionCache()
+        >>> cache.canonical([[1, 1], [2, 3]]) == cache.canonical([[1, 1], [2, 3]]), len(cache.aliases)
+        (True, 1)
+        """
+        raw = grid_key(grid)
+        if raw in self.aliases:
+            self.aliases.move_to_end(raw)
+            return self.aliases[raw]
+        canonical, transform = canonical_form(grid)
+        self.aliases[raw] = alias = raw, grid_key(canonical), canonical, transform
+        while len(self.aliases) > self.capacity:
+            self.restored.pop(self.aliases.popitem(last=False)[0], None)
+        return alias
+
+    def get(self, grid: list):
+        """
+        Cherche la solution d'une grille dans le cache.
+        :param grid: Liste de listes décrivant la grille.
+        :return: Couple (booléen indiquant si la grille est connue, solution ou None).
+
+        >>> cache = SolutionCache()
+        >>> cache.get([[1, 1], [2, 3]])
+        (False, None)
+        >>> cache.put([[1, 1], [2, 3]], {(0, 0)})
+        >>> cache.get([[1, 1], [2, 3]]), cache.stats()
+        ((True, {(0, 0)}), {'hits': 1, 'misses': 1, 'size': 1})
+        >>> cache.get([[3, 2], [1, 1]])
+        (True, {(1, 0)})
+        """
+        raw, key, canonical, transform = self.canonical(grid)
+        if key not in self.entries and not self.loaded:
+            self.load()
+        if key not in self.entries:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self.entries.move_to_end(key)
+
+        # La solution décodée est réutilisée tant que l'entrée n'a pas changé.
+        mask = self.entries[key]
+        restored = self.restored.get(raw)
+        if restored is None or restored[0] != mask:
+            solution = restore_solution(canonical, transform, decode(mask, len(canonical[0])))
+            restored = self.restored[raw] = mask, solution
+        return True, None if restored[1] is None else set(restored[1])
+
+    def put(self, grid: list, solution: set):
+        """
+        Enregistre la solution d'une grille.
+        :param grid: Liste de listes décrivant la grille.
+        :param solution: Ensemble des cellules noircies, ou None si la grille n'a pas de solution.
+        """
+        _, key, canonical, transform = self.canonical(grid)
+        self.entries[key] = encode(canonical_solution(canonical, transform, solution), len(canonical[0]))
+        self.entries.move_to_end(key)
+        self.changed = True
+        self.evict()
+
+    def solve(self, grid: list, timeout: float = None):
+        """
+        Retourne la solution d'une grille, en ne la calculant que si elle n'est pas déjà connue.
+        :param grid: Liste de listes décrivant la grille.
+        :param timeout: Temps maximal de résolution en secondes, ou None.
+        :return: Ensemble des cellules à noircir ou None si aucune solution n'existe.
+
+        >>> cache = SolutionCache()
+        >>> cache.solve([[1, 1], [2, 2]]) is None, cache.solve([[1, 1], [2, 2]]) is None, cache.stats()
+        (True, True, {'hits': 1, 'misses': 1, 'size': 1})
+        """
+        found, solution = self.get(grid)
+        if not found:
+            solution = Solver(grid).solve(timeout=timeout)
+            self.put(grid, solution)
+        return solution
+
+    def flush(self):
+        """Écrit le cache dans son fichier s'il a été modifié."""
+        if self.file_name is None or not self.changed:
+            return
+        if not self.loaded:
+            self.load()
+        temporary = self.file_name + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump(self.entries, file, separators=(",", ":"))
+        os.replace(temporary, self.file_name)
+        self.changed = False
+
+    def stats(self):
+        """
+        Retourne les compteurs du cache.
+        :return: Dictionnaire du nombre de succès, de défauts et d'entrées.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+
+_caches = dict()
+
+
+def cache_for(directory: str = os.curdir):
+    """
+    Retourne le cache partagé associé au dossier des grilles.
+    :param directory: Dossier contenant les grilles.
+    :return: Instance de SolutionCache.
+    """
+    file_name = os.path.join(os.path.abspath(directory), CACHE_FILE)
+    if file_name not in _caches:
+        _caches[file_name] = SolutionCache(file_name)
+    return _caches[file_name]
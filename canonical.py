@@ -0,0 +1,193 @@
+import os
+
+from core import GridError, grid_files, read_grid
+
+
+# INFORMATIONS SUR LA FORME CANONIQUE
+#
+# Deux grilles sont équivalentes si l'une s'obtient à partir de
+# l'autre par une des 8 symétries du carré (rotations, miroirs)
+# suivie d'un renommage des valeurs : elles ont alors les mêmes
+# solutions, à la symétrie près.
+#
+# Une symétrie est codée par un entier de 0 à 7 :
+# - bit 0 : transposition ;
+# - bit 1 : retournement vertical (ordre des lignes) ;
+# - bit 2 : retournement horizontal (ordre des colonnes).
+#
+# Pour chaque symétrie, les valeurs sont renumérotées dans leur
+# ordre d'apparition. La forme canonique est la plus petite des
+# huit grilles obtenues.
+#
+
+def transform_cell(symmetry: int, cell: tuple, height: int, width: int):
+    """
+    Applique une symétrie aux coordonnées d'une cellule.
+    :param symmetry: Symétrie, entre 0 et 7.
+    :param cell: Coordonnées de la cellule dans la grille d'origine.
+    :param height: Hauteur de la grille d'origine.
+    :param width: Largeur de la grille d'origine.
+    :return: Coordonnées de la cellule dans la grille transformée.
+
+    >>> transform_cell(1, (0, 2), 2, 3), transform_cell(6, (0, 2), 2, 3)
+    ((2, 0), (1, 0))
+    """
+    i, j = cell
+    if symmetry & 1:
+        i, j, height, width = j, i, width, height
+    if symmetry & 2:
+        i = height - 1 - i
+    if symmetry & 4:
+        j = width - 1 - j
+    return i, j
+
+
+def restore_cell(symmetry: int, cell: tuple, height: int, width: int):
+    """
+    Ramène les coordonnées d'une cellule transformée dans la grille d'origine.
+    :param symmetry: Symétrie, entre 0 et 7.
+    :param cell: Coordonnées de la cellule dans la grille transformée.
+    :param height: Hauteur de la grille d'origine.
+    :param width: Largeur de la grille d'origine.
+    :return: Coordonnées de la cellule dans la grille d'origine.
+
+    >>> all(restore_cell(s, transform_cell(s, (0, 2), 2, 3), 2, 3) == (0, 2) for s in range(8))
+    True
+    """
+    i, j = cell
+    if symmetry & 1:
+        height, width = width, height
+    if symmetry & 4:
+        j = width - 1 - j
+    if symmetry & 2:
+        i = height - 1 - i
+    if symmetry & 1:
+        i, j = j, i
+    return i, j
+
+
+def transform_grid(grid: list, symmetry: int):
+    """
+    Applique une symétrie à une grille.
+    :param grid: Liste de listes décrivant la grille.
+    :param symmetry: Symétrie, entre 0 et 7.
+    :return: Liste de listes décrivant la grille transformée.
+
+    >>> transform_grid([[1, 2, 3], [4, 5, 6]], 1)
+    [[1, 4], [2, 5], [3, 6]]
+    """
+    height, width = len(grid), len(grid[0])
+    result = [[0] * height for _ in range(width)] if symmetry & 1 else [[0] * width for _ in range(height)]
+    for i, line in enumerate(grid):
+        for j, value in enumerate(line):
+            x, y = transform_cell(symmetry, (i, j), height, width)
+            result[x][y] = value
+    return result
+
+
+def relabel(grid: list):
+    """
+    Renumérote les valeurs d'une grille dans leur ordre d'apparition.
+    :param grid: Liste de listes décrivant la grille.
+    :return: Couple (grille renumérotée, dictionnaire des nouvelles valeurs vers les anciennes).
+
+    >>> relabel([[7, 3], [3, 9]])
+    ([[1, 2], [2, 3]], {1: 7, 2: 3, 3: 9})
+    """
+    labels = dict()
+    result = [[labels.setdefault(value, len(labels) + 1) for value in line] for line in grid]
+    return result, {label: value for value, label in labels.items()}
+
+
+def canonical_form(grid: list):
+    """
+    Calcule la forme canonique d'une grille et la transformation qui y mène.
+    :param grid: Liste de listes décrivant la grille.
+    :return: Couple (grille canonique, transformation (symétrie, valeurs d'origine par valeur canonique)).
+
+    >>> canonical_form([[5, 5], [6, 7]])[0] == canonical_form([[9, 8], [2, 8]])[0]
+    True
+    >>> canonical, transform = canonical_form([[5, 5], [6, 7]])
+    >>> restore_grid(canonical, transform)
+    [[5, 5], [6, 7]]
+    """
+    best = None
+    for symmetry in range(8):
+        candidate, labels = relabel(transform_grid(grid, symmetry))
+        key = (len(candidate), len(candidate[0]), candidate)
+        if best is None or key < best[0]:
+            best = key, (symmetry, labels)
+    return best[0][2], best[1]
+
+
+def restore_grid(canonical: list, transform: tuple):
+    """
+    Reconstruit la grille d'origine à partir de sa forme canonique.
+    :param canonical: Liste de listes décrivant la grille canonique.
+    :param transform: Transformation renvoyée par canonical_form().
+    :return: Liste de listes décrivant la grille d'origine.
+    """
+    symmetry, labels = transform
+    height, width = (len(canonical[0]), len(canonical)) if symmetry & 1 else (len(canonical), len(canonical[0]))
+    grid = [[0] * width for _ in range(height)]
+    for x, line in enumerate(canonical):
+        for y, value in enumerate(line):
+            i, j = restore_cell(symmetry, (x, y), height, width)
+            grid[i][j] = labels[value]
+    return grid
+
+
+def restore_solution(canonical: list, transform: tuple, solution: set):
+    """
+    Ramène une solution de la grille canonique dans les coordonnées de la grille d'origine.
+    :param canonical: Liste de listes décrivant la grille canonique.
+    :param transform: Transformation renvoyée par canonical_form().
+    :param solution: Ensemble des cellules noircies de la grille canonique, ou None.
+    :return: Ensemble des cellules noircies de la grille d'origine, ou None.
+
+    >>> from core import read_grid, solve
+    >>> grid = read_grid("grille.hti", set())
+    >>> canonical, transform = canonical_form(grid)
+    >>> restore_solution(canonical, transform, solve(canonical, set())) == solve(grid, set())
+    True
+    """
+    if solution is None:
+        return None
+    symmetry = transform[0]
+    height, width = (len(canonical[0]), len(canonical)) if symmetry & 1 else (len(canonical), len(canonical[0]))
+    return {restore_cell(symmetry, cell, height, width) for cell in solution}
+
+
+def canonical_solution(canonical: list, transform: tuple, solution: set):
+    """
+    Exprime une solution de la grille d'origine dans les coordonnées de la grille canonique.
+    :param canonical: Liste de listes décrivant la grille canonique.
+    :param transform: Transformation renvoyée par canonical_form().
+    :param solution: Ensemble des cellules noircies de la grille d'origine, ou None.
+    :return: Ensemble des cellules noircies de la grille canonique, ou None.
+    """
+    if solution is None:
+        return None
+    symmetry = transform[0]
+    height, width = (len(canonical[0]), len(canonical)) if symmetry & 1 else (len(canonical), len(canonical[0]))
+    return {transform_cell(symmetry, cell, height, width) for cell in solution}
+
+
+def duplicates(directory: str = os.curdir):
+    """
+    Regroupe les grilles d'un dossier qui sont équivalentes à une symétrie et un renommage près.
+    :param directory: Dossier contenant les fichiers '.hti'.
+    :return: Liste des groupes (listes de noms de fichiers) comptant au moins deux grilles.
+
+    >>> duplicates()
+    []
+    """
+    groups = dict()
+    for file in grid_files(directory):
+        try:
+            grid = read_grid(os.path.join(directory, file), set())
+        except GridError:
+            continue
+        canonical = canonical_form(grid)[0]
+        groups.setdefault(str(canonical), list()).append(file)
+    return [files for files in groups.values() if len(files) > 1]
@@ -0,0 +1,247 @@
+# INFORMATIONS SUR LE MOTEUR DE CONNEXITÉ
+#
+# Les cellules sont indexées à plat : la cellule (i, j) a pour
+# indice i * largeur + j. Les états de cellules sont passés sous
+# forme de séquence d'entiers (bytearray le plus souvent), une
+# cellule étant bloquée lorsque sa valeur vaut `blocked`.
+#
+# Les tampons de parcours sont alloués une seule fois. Un numéro
+# de passage est incrémenté à chaque appel, ce qui évite de
+# remettre à zéro le tampon des cellules visitées.
+#
+
+class Connectivity:
+
+    def __init__(self, height: int, width: int):
+        """Prépare les tampons de parcours pour une grille de la taille donnée."""
+        self.height = height
+        self.width = width
+        self.size = height * width
+        self.neighbours = [tuple(neighbours(cell, height, width)) for cell in range(self.size)]
+
+        # Tampons réutilisés d'un appel à l'autre.
+        self.visited = [0] * self.size
+        self.low = [0] * self.size
+        self.cuts = bytearray(self.size)
+        self.stack = list()
+        self.stamp = 0
+
+    def _next_stamp(self):
+        """Démarre un nouveau passage sans effacer les tampons."""
+        self.stamp += 1
+        return self.stamp
+
+    def count(self, cells, start: int, blocked: int = 1):
+        """
+        Compte les cellules libres atteignables à partir d'une cellule, sans récursivité.
+        :param cells: Séquence des états des cellules.
+        :param start: Indice de la cellule de départ.
+        :param blocked: Valeur d'une cellule bloquée.
+        :return: Nombre de cellules atteignables.
+
+        >>> Connectivity(2, 3).count(bytearray([0, 0, 1, 0, 1, 0]), 0)
+        3
+        """
+        stamp = self._next_stamp()
+        visited, stack = self.visited, self.stack
+        visited[start] = stamp
+        stack.append(start)
+        count = 1
+        while stack:
+            for neighbour in self.neighbours[stack.pop()]:
+                if visited[neighbour] != stamp and cells[neighbour] != blocked:
+                    visited[neighbour] = stamp
+                    stack.append(neighbour)
+                    count += 1
+        return count
+
+    def related(self, cells, blocked: int = 1):
+        """
+        Vérifie que les cellules libres forment une zone connexe non vide.
+        :param cells: Séquence des états des cellules.
+        :param blocked: Valeur d'une cellule bloquée.
+        :return: Booléen déterminant si la zone libre est connexe.
+
+        >>> Connectivity(2, 2).related(bytearray([1, 0, 0, 1]))
+        False
+        >>> Connectivity(2, 2).related(bytearray([1, 0, 0, 0]))
+        True
+        """
+        free = self.size - cells.count(blocked)
+        if not free:
+            return False
+        start = next(cell for cell in range(self.size) if cells[cell] != blocked)
+        return self.count(cells, start, blocked) == free
+
+    def articulations(self, cells, blocked: int = 1):
+        """
+        Calcule de manière itérative les points d'articulation de la zone libre.
+        Le résultat est conservé dans `cuts` pour les appels à disconnects().
+        :param cells: Séquence des états des cellules.
+        :param blocked: Valeur d'une cellule bloquée.
+        :return: Liste triée des points d'articulation, ou None si la zone n'est pas connexe.
+
+        >>> Connectivity(1, 3).articulations(bytearray(3))
+        [1]
+        >>> Connectivity(1, 3).articulations(bytearray([0, 1, 0])) is None
+        True
+        """
+        order, low, cuts = self.visited, self.low, self.cuts
+        cuts[:] = bytes(self.size)
+        start = next((cell for cell in range(self.size) if cells[cell] != blocked), None)
+        if start is None:
+            return None
+
+        # Les numéros d'ordre prolongent les numéros de passage pour rester uniques.
+        base = self.stamp
+        counter = base + 1
+        order[start] = low[start] = counter
+        stack = [(start, -1, iter(self.neighbours[start]))]
+        root_children = 0
+
+        while stack:
+            cell, parent, adjacent = stack[-1]
+            for neighbour in adjacent:
+                if cells[neighbour] == blocked:
+                    continue
+                if order[neighbour] <= base:
+                    counter += 1
+                    order[neighbour] = low[neighbour] = counter
+                    stack.append((neighbour, cell, iter(self.neighbours[neighbour])))
+                    break
+                if neighbour != parent and order[neighbour] < low[cell]:
+                    low[cell] = order[neighbour]
+            else:
+                stack.pop()
+                if parent == start:
+                    root_children += 1
+                elif parent != -1:
+                    if low[cell] < low[parent]:
+                        low[parent] = low[cell]
+                    if low[cell] >= order[parent]:
+                        cuts[parent] = 1
+
+        self.stamp = counter
+        if counter - base != self.size - cells.count(blocked):
+            return None
+        if root_children > 1:
+            cuts[start] = 1
+        return [cell for cell in range(self.size) if cuts[cell]]
+
+    def pieces(self, cells, starts: list, blocked: int = 1):
+        """
+        Sépare les zones libres contenant les cellules de départ, par des parcours menés en alternance.
+        Deux parcours qui se rejoignent n'en forment plus qu'un ; un parcours terminé sans avoir rejoint
+        les autres donne une zone coupée. Le dernier parcours restant est interrompu : le coût ne dépend que
+        de la taille des zones coupées, jamais de celle de la zone restante.
+        :param cells: Séquence des états des cellules.
+        :param starts: Indices des cellules de départ, libres et distinctes.
+        :param blocked: Valeur d'une cellule bloquée.
+        :return: Liste des zones coupées, chacune sous forme de liste d'indices.
+
+        >>> engine = Connectivity(3, 3)
+        >>> engine.pieces(bytearray([0, 1, 0, 0, 1, 0, 0, 1, 0]), [0, 2])
+        [[0, 3, 6]]
+        >>> engine.pieces(bytearray([0, 0, 0, 0, 1, 0, 0, 0, 0]), [1, 3, 5, 7])
+        []
+        """
+        stamp = self._next_stamp()
+        visited, owner = self.visited, self.low
+        parent = list(range(len(starts)))
+        queues = [[start] for start in starts]
+        members = [[start] for start in starts]
+        heads = [0] * len(starts)
+        for index, start in enumerate(starts):
+            visited[start] = stamp
+            owner[start] = index
+
+        def find(index):
+            while parent[index] != index:
+                index = parent[index]
+            return index
+
+        active = list(range(len(starts)))
+        pieces = list()
+        while len(active) > 1:
+            for index in tuple(active):
+                if parent[index] != index or len(active) == 1:
+                    continue
+                queue = queues[index]
+                if heads[index] == len(queue):
+                    pieces.append(members[index])
+                    active.remove(index)
+                    continue
+                cell = queue[heads[index]]
+                heads[index] += 1
+                for neighbour in self.neighbours[cell]:
+                    if cells[neighbour] == blocked:
+                        continue
+                    if visited[neighbour] != stamp:
+                        visited[neighbour] = stamp
+                        owner[neighbour] = index
+                        queue.append(neighbour)
+                        members[index].append(neighbour)
+                        continue
+                    other = find(owner[neighbour])
+                    if other != index:
+                        # Les deux parcours se rejoignent : le second est repris par le premier.
+                        parent[other] = index
+                        queue.extend(queues[other][heads[other]:])
+                        members[index].extend(members[other])
+                        active.remove(other)
+        return pieces
+
+    def disconnects(self, cell: int):
+        """
+        Indique si bloquer la cellule couperait la zone libre analysée par le dernier appel à articulations().
+        :param cell: Indice de la cellule.
+        :return: Booléen du résultat.
+
+        >>> engine = Connectivity(1, 3)
+        >>> _ = engine.articulations(bytearray(3))
+        >>> engine.disconnects(1), engine.disconnects(0)
+        (True, False)
+        """
+        return bool(self.cuts[cell])
+
+
+def neighbours(cell: int, height: int, width: int):
+    """
+    Retourne les indices des voisines orthogonales d'une cellule.
+    :param cell: Indice de la cellule.
+    :param height: Hauteur de la grille.
+    :param width: Largeur de la grille.
+    :return: Liste des indices voisins.
+
+    >>> neighbours(4, 3, 3)
+    [1, 7, 3, 5]
+    """
+    i, j = divmod(cell, width)
+    result = list()
+    if i > 0:
+        result.append(cell - width)
+    if i < height - 1:
+        result.append(cell + width)
+    if j > 0:
+        result.append(cell - 1)
+    if j < width - 1:
+        result.append(cell + 1)
+    return result
+
+
+_engines = dict()
+
+
+def engine(height: int, width: int):
+    """
+    Retourne le moteur de connexité partagé pour une taille de grille.
+    :param height: Hauteur de la grille.
+    :param width: Largeur de la grille.
+    :return: Instance de Connectivity réutilisée entre les appels.
+
+    >>> engine(3, 4) is engine(3, 4)
+    True
+    """
+    if (height, width) not in _engines:
+        _engines[(height, width)] = Connectivity(height, width)
+    return _engines[(height, width)]
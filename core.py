@@ -0,0 +1,311 @@
+import os
+from time import perf_counter
+
+from bitboard import board_for
+from connectivity import engine
+from solver import Solver
+
+
+# INFORMATIONS SUR LE CŒUR DU JEU
+#
+# Ce module regroupe la lecture et l'écriture des grilles, les
+# règles et la résolution. Il n'importe aucun module graphique,
+# ce qui permet de l'utiliser depuis un script ou un serveur.
+#
+# Les erreurs de lecture sont levées sous forme d'exceptions
+# GridError ; l'interface se charge de les afficher.
+#
+
+class GridError(Exception):
+    """Erreur de lecture d'une grille."""
+
+
+class GridNotFoundError(GridError, FileNotFoundError):
+    """Le fichier de la grille est introuvable."""
+
+
+class InvalidGridError(GridError, ValueError):
+    """La grille est vide, mal formée ou contient des valeurs inconnues."""
+
+
+def read_grid(file_name: str, blackened: set):
+    """
+    Décrit les valeurs de la grille contenue dans le fichier texte sous forme de liste de listes.
+    La fonction lève une exception GridError si le fichier est introuvable ou si la grille est mal formée.
+    :param file_name: Nom du fichier contenant la grille.
+    :param blackened: Ensemble des cellules noircies.
+    :return: Liste de listes décrivant la grille.
+
+    >>> read_grid("grille.hti", set())
+    [[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]]
+    >>> read_grid("vide.hti", set())
+    Traceback (most recent call last):
+    ...
+    core.InvalidGridError: Le fichier est vide !
+    """
+    # Ouverture du fichier.
+    try:
+        file = open(file_name, "r")
+    except FileNotFoundError:
+        raise GridNotFoundError("Fichier introuvable !") from None
+    grid = list()
+
+    # Construction de la liste de listes.
+    with file:
+        try:
+            for i, line in enumerate(file):
+                grid_line = list()
+                for j, column in enumerate(line.strip().split()):
+                    if int(column) < 0:
+                        blackened.add((i, j))
+                    grid_line.append(abs(int(column)))
+                grid.append(grid_line)
+        except ValueError:
+            raise InvalidGridError("La grille contient des valeurs inconnues !") from None
+
+    if not grid:
+        raise InvalidGridError("Le fichier est vide !")
+
+    # Vérification du format rectangulaire.
+    if sum(len(line) for line in grid) != len(grid) * len(grid[0]):
+        raise InvalidGridError("La grille n'est pas rectangulaire !")
+
+    return grid
+
+
+def grid_files(directory: str = os.curdir):
+    """
+    Retourne la liste triée des fichiers de grilles ('.hti') d'un dossier.
+    :param directory: Dossier à parcourir.
+    :return: Liste des noms de fichiers.
+
+    >>> grid_files()[:2]
+    ['grille.hti', 'niveau1.hti']
+    """
+    return [file for file in sorted(os.listdir(directory)) if file.split(".")[-1] == "hti"]
+
+
+def display_grid(grid: list):
+    """
+    Affiche la grille dans la console.
+    :param grid: Liste de listes décrivant la grille.
+
+    >>> display_grid([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+    +---+---+---+
+    | 1 | 2 | 3 |
+    +---+---+---+
+    | 4 | 5 | 6 |
+    +---+---+---+
+    | 7 | 8 | 9 |
+    +---+---+---+
+    """
+    for line in grid:
+        print(len(line) * "+---" + "+")
+        for column in line:
+            print("| {} ".format(column), end='')
+        print("|")
+    print(len(grid[0]) * "+---" + "+")
+
+
+def write_grid(grid: list, blackened: set, file_name: str):
+    """
+    Écrit une grille sous forme de fichier texte.
+    :param grid: Liste de listes décrivant la grille.
+    :param blackened: Ensembles des cellules noircies.
+    :param file_name: Nom du fichier de sortie.
+    """
+    file = open(file_name, "w")
+
+    # Écriture de la grille.
+    for i, line in enumerate(grid):
+        for j, column in enumerate(line):
+            if (i, j) in blackened:
+                file.write(str(-column) + (" " if j + 1 < len(line) else "\n"))
+            else:
+                file.write(str(column) + (" " if j + 1 < len(line) else "\n"))
+
+    file.close()
+
+
+def without_conflict(grid: list, blackened: set):
+    """
+    Vérifie que chaque numéro n'apparaisse qu'une fois par ligne et par colonne. (Règle n°1)
+    :param grid: Liste de listes décrivant la grille.
+    :param blackened: Ensemble des cellules noircies.
+    :return: Booléen déterminant s'il y a conflit.
+
+    >>> without_conflict([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]], \
+                     {(2, 0), (0, 0), (3, 3), (2, 2), (3, 1), (0, 2), (1, 4)})
+    True
+    """
+    # Les masques des valeurs de la grille sont conservés entre les appels (voir bitboard.py).
+    return board_for(grid, blackened).without_conflict()
+
+
+def without_adjacent(grid: list, blackened: set):
+    """
+    Vérifie qu'aucune cellule noircies ne soit adjacente à une autre. (Règle n°2)
+    :param grid: Liste de listes décrivant la grille.
+    :param blackened: Ensemble des cellules noircies.
+    :return: Booléen déterminant s'il y a des cellules noircies voisines.
+
+    >>> without_adjacent([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]], \
+                               {(2, 0), (0, 0), (3, 3), (2, 2), (3, 1), (0, 2), (1, 4)})
+    True
+    """
+    return board_for(grid, blackened).without_adjacent()
+
+
+def related(grid: list, blackened: set):
+    """
+    Vérifie que la zone formée par toutes les cellules non noircies soit connexe. (Règle n°3)
+    :param grid: Liste de listes décrivant la grille.
+    :param blackened: Ensemble des cellules noircies.
+    :return: Booléen déterminant si la zone non noircies est connexe.
+
+
+    >>> related([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]], \
+                {(2, 0), (0, 0), (3, 3), (2, 2), (3, 1), (0, 2), (1, 4)})
+    True
+    """
+    height, width = len(grid), len(grid[0])
+    cells = bytearray(height * width)
+    for i, j in blackened:
+        cells[i * width + j] = 1
+
+    # Vérification de l'unicité de la zone par un parcours itératif.
+    return engine(height, width).related(cells)
+
+
+def explore(grid: list, line: int, column: int, blackened: set, vacants: set):
+    """
+    Explore la grille afin de recupérer toutes les cellules libres en partant d'une cellule.
+    :param grid: Liste de listes décrivant la grille.
+    :param line: Ligne de la cellule actuelle.
+    :param column: Colonne de la cellule actuelle.
+    :param blackened: Ensemble des cellules noircies
+    :param vacants: Ensemble des cellules libres.
+    :return: Ensemble des cellules libres.
+
+    >>> sorted(explore([[1, 2], [3, 4]], 0, 0, {(0, 1)}, set()))
+    [(0, 0), (1, 0), (1, 1)]
+    """
+    # Parcours itératif pour ne pas dépasser la limite de récursivité.
+    vacants.add((line, column))
+    stack = [(line, column)]
+    while stack:
+        line, column = stack.pop()
+        for neighbour in ((line - 1, column), (line + 1, column), (line, column - 1), (line, column + 1)):
+            if 0 <= neighbour[0] < len(grid) and 0 <= neighbour[1] < len(grid[0]) and \
+                    neighbour not in blackened and neighbour not in vacants:
+                vacants.add(neighbour)
+                stack.append(neighbour)
+
+    return vacants
+
+
+def contains_duplicates(lst: list, element: object):
+    """
+    Détecte si la liste contient des doublons
+    :param lst: Liste.
+    :param element: Élement dont il faut vérifier l'unicité.
+    :return: Booléen du résultat.
+
+    >>> contains_duplicates([1, 2, 3, 4], 1)
+    False
+
+    >>> contains_duplicates([1, 2, 3, 1], 1)
+    True
+    """
+    unique = set()
+    for e in lst:
+        if e != element:
+            continue
+        if e not in unique:
+            unique.add(e)
+        else:
+            return True
+    return False
+
+
+def searcher(grid: list, jobs: int = 1):
+    """
+    Choisit le moteur de résolution : un seul processus, ou la recherche répartie de parallel.py.
+    Le module parallel n'est importé qu'à la demande, pour ne pas alourdir l'import de core.
+    :param grid: Liste de listes décrivant la grille.
+    :param jobs: Nombre de processus, ou None pour le nombre de cœurs.
+    :return: Instance de Solver ou de ParallelSolver.
+
+    >>> type(searcher([[1, 1], [2, 3]])).__name__, type(searcher([[1, 1], [2, 3]], 2)).__name__
+    ('Solver', 'ParallelSolver')
+    """
+    if jobs == 1:
+        return Solver(grid)
+    from parallel import ParallelSolver
+    return ParallelSolver(grid, jobs)
+
+
+def solve(grid: list, blackened: set, jobs: int = 1):
+    """
+    Retourne l'ensemble des cellules noircies solution de la grille, ou None s'il n'y a aucune solution.
+    :param grid: Liste de listes décrivant la grille.
+    :param blackened: Ensemble des cellules noircies, complété par la solution.
+    :param jobs: Nombre de processus, ou None pour le nombre de cœurs.
+    :return: Ensemble des cellules à noircir ou None si aucune solution n'existe.
+
+    >>> sorted(solve([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]], set()))
+    [(0, 0), (0, 2), (1, 4), (2, 0), (2, 2), (3, 1), (3, 3)]
+    """
+    solution = searcher(grid, jobs).solve(blackened)
+    if solution is None:
+        return None
+    blackened |= solution
+    return blackened
+
+
+def count_solutions(grid: list, limit: int = None, stats: dict = None, timeout: float = None, jobs: int = 1):
+    """
+    Compte les solutions de la grille en s'arrêtant dès que la limite est atteinte.
+    La fonction lève TimeoutError si la recherche dépasse le temps imparti.
+    :param grid: Liste de listes décrivant la grille.
+    :param limit: Nombre de solutions au-delà duquel la recherche s'arrête, ou None pour tout explorer.
+    :param stats: Dictionnaire complété par le nombre de nœuds explorés ('nodes') et la durée ('time').
+    :param timeout: Temps maximal de recherche en secondes, ou None.
+    :param jobs: Nombre de processus, ou None pour le nombre de cœurs.
+    :return: Nombre de solutions trouvées, au plus égal à la limite.
+
+    >>> count_solutions([[1, 1], [2, 3]]), count_solutions([[1, 1], [2, 3]], jobs=2)
+    (2, 2)
+    >>> stats = dict()
+    >>> count_solutions([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]], \
+                        limit=2, stats=stats)
+    1
+    >>> sorted(stats)
+    ['nodes', 'time']
+    """
+    solver = searcher(grid, jobs)
+    start = perf_counter()
+    try:
+        return solver.count(limit=limit, timeout=timeout)
+    finally:
+        if stats is not None:
+            stats["nodes"] = solver.nodes
+            stats["time"] = perf_counter() - start
+
+
+def is_unique(grid: list, stats: dict = None, timeout: float = None, jobs: int = 1):
+    """
+    Vérifie que la grille possède exactement une solution.
+    La fonction lève TimeoutError si la recherche dépasse le temps imparti.
+    :param grid: Liste de listes décrivant la grille.
+    :param stats: Dictionnaire complété par le nombre de nœuds explorés ('nodes') et la durée ('time').
+    :param timeout: Temps maximal de recherche en secondes, ou None.
+    :param jobs: Nombre de processus, ou None pour le nombre de cœurs.
+    :return: Booléen du résultat.
+
+    >>> is_unique([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]])
+    True
+    >>> is_unique([[1, 1], [2, 3]])
+    False
+    """
+    return count_solutions(grid, limit=2, stats=stats, timeout=timeout, jobs=jobs) == 1
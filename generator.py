@@ -0,0 +1,229 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from random import Random
+
+from connectivity import engine
+from core import write_grid
+from solver import Solver
+
+
+# INFORMATIONS SUR LA GÉNÉRATION DE GRILLES
+#
+# Une grille est générée en deux temps :
+# - choix d'un motif de cellules noircies non adjacentes laissant
+#   la zone blanche connexe ;
+# - remplissage des cellules blanches par un carré latin mélangé,
+#   puis attribution à chaque cellule noircie d'une valeur déjà
+#   présente parmi les blanches de sa ligne ou de sa colonne.
+#
+# Le motif choisi est donc toujours une solution de la grille.
+# Pour obtenir une solution unique, chaque solution concurrente
+# est rendue invalide en modifiant la valeur d'une cellule noircie.
+#
+
+def random_layout(height: int, width: int, rng: Random, density: float = 0.3):
+    """
+    Choisit un ensemble de cellules noircies respectant les règles n°2 et n°3.
+    :param height: Hauteur de la grille.
+    :param width: Largeur de la grille.
+    :param rng: Générateur aléatoire.
+    :param density: Proportion de cellules dont le noircissement est tenté.
+    :return: Ensemble des cellules noircies.
+    """
+    connectivity = engine(height, width)
+    black = bytearray(height * width)
+    cells = list(range(height * width))
+    rng.shuffle(cells)
+
+    for cell in cells[:int(density * len(cells))]:
+        if any(black[neighbour] for neighbour in connectivity.neighbours[cell]):
+            continue
+        black[cell] = 1
+        if not locally_related(black, cell, height, width) and not connectivity.related(black):
+            black[cell] = 0
+
+    return {divmod(cell, width) for cell in range(len(black)) if black[cell]}
+
+
+def locally_related(black: bytearray, cell: int, height: int, width: int):
+    """
+    Vérifie que les cellules blanches entourant une cellule noircie restent reliées autour d'elle.
+    Les huit cellules voisines sont parcourues en cercle : si elles ne forment qu'un seul arc
+    blanc, la zone blanche reste connexe sans qu'un parcours complet soit nécessaire.
+    :param black: Cellules noircies, à plat.
+    :param cell: Indice de la cellule noircie.
+    :param height: Hauteur de la grille.
+    :param width: Largeur de la grille.
+    :return: Booléen indiquant si la connexité est garantie localement.
+
+    >>> locally_related(bytearray(9), 4, 3, 3)
+    True
+    >>> locally_related(bytearray([0, 0, 1, 0, 0, 0, 1, 0, 0]), 4, 3, 3)
+    False
+    """
+    i, j = divmod(cell, width)
+    ring = list()
+    for di, dj in ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)):
+        ni, nj = i + di, j + dj
+        ring.append(0 <= ni < height and 0 <= nj < width and not black[ni * width + nj])
+
+    # Nombre de passages d'une cellule blanche à une cellule bloquée autour de la cellule.
+    arcs = sum(ring[k] and not ring[(k + 1) % 8] for k in range(8))
+    return arcs <= 1
+
+
+def fill_grid(height: int, width: int, blackened: set, rng: Random):
+    """
+    Remplit une grille dont les cellules noircies données forment une solution.
+    :param height: Hauteur de la grille.
+    :param width: Largeur de la grille.
+    :param blackened: Ensemble des cellules noircies.
+    :param rng: Générateur aléatoire.
+    :return: Liste de listes décrivant la grille.
+    """
+    # Carré latin mélangé : aucune valeur n'est répétée sur une ligne ou une colonne.
+    size = max(height, width)
+    rows, columns, symbols = list(range(size)), list(range(size)), list(range(1, size + 1))
+    rng.shuffle(rows)
+    rng.shuffle(columns)
+    rng.shuffle(symbols)
+    grid = [[symbols[(rows[i] + columns[j]) % size] for j in range(width)] for i in range(height)]
+
+    # Chaque cellule noircie reprend la valeur d'une cellule blanche de sa ligne ou de sa colonne.
+    for i, j in sorted(blackened):
+        whites = [(i, other) for other in range(width) if (i, other) not in blackened]
+        whites += [(other, j) for other in range(height) if (other, j) not in blackened]
+        wi, wj = rng.choice(whites)
+        grid[i][j] = grid[wi][wj]
+
+    return grid
+
+
+def generate(height: int, width: int = None, seed: int = None):
+    """
+    Génère une grille ayant au moins une solution.
+    :param height: Hauteur de la grille.
+    :param width: Largeur de la grille, égale à la hauteur par défaut.
+    :param seed: Graine du générateur aléatoire.
+    :return: Couple (grille, cellules noircies d'une solution).
+
+    >>> from core import related, without_adjacent, without_conflict
+    >>> grid, blackened = generate(8, seed=1)
+    >>> without_conflict(grid, blackened), without_adjacent(grid, blackened), related(grid, blackened)
+    (True, True, True)
+    >>> generate(8, seed=1) == (grid, blackened)
+    True
+    """
+    width = height if width is None else width
+    rng = Random(seed)
+    blackened = random_layout(height, width, rng)
+    return fill_grid(height, width, blackened, rng), blackened
+
+
+def make_unique(grid: list, blackened: set, rng: Random, attempts: int = 100):
+    """
+    Modifie les valeurs des cellules noircies jusqu'à ce que leur motif soit l'unique solution.
+    Chaque solution concurrente trouvée est éliminée en changeant une valeur qui la rend invalide,
+    sans toucher aux cellules blanches de la solution voulue.
+    :param grid: Liste de listes décrivant la grille, modifiée en place.
+    :param blackened: Ensemble des cellules noircies de la solution voulue.
+    :param rng: Générateur aléatoire.
+    :param attempts: Nombre maximal de modifications.
+    :return: Booléen indiquant si la solution est devenue unique.
+    """
+    height, width = len(grid), len(grid[0])
+
+    def line_cells(i, j):
+        return [(i, other) for other in range(width) if other != j] + \
+               [(other, j) for other in range(height) if other != i]
+
+    for _ in range(attempts):
+        other = next((solution for solution in Solver(grid).solutions() if solution != blackened), None)
+        if other is None:
+            return True
+
+        # Une cellule noire devenue blanche dans l'autre solution reçoit la valeur d'une blanche commune.
+        candidates = list()
+        for i, j in sorted(blackened - other):
+            values = [grid[x][y] for x, y in line_cells(i, j) if (x, y) not in blackened and (x, y) not in other]
+            if values:
+                candidates.append((i, j, values))
+        if candidates:
+            i, j, values = rng.choice(candidates)
+            grid[i][j] = rng.choice(values)
+            continue
+
+        # Sinon, une cellule blanche noircie dans l'autre solution perd ses doublons.
+        changed = False
+        for i, j in sorted(other - blackened):
+            for x, y in line_cells(i, j):
+                if (x, y) in blackened and grid[x][y] == grid[i][j]:
+                    values = [grid[a][b] for a, b in line_cells(x, y)
+                              if (a, b) not in blackened and grid[a][b] != grid[i][j]]
+                    if values:
+                        grid[x][y] = rng.choice(values)
+                        changed = True
+            if changed:
+                break
+        if not changed:
+            return False
+
+    return False
+
+
+def generate_unique(height: int, width: int = None, seed: int = None):
+    """
+    Génère une grille dont la solution est unique.
+    :param height: Hauteur de la grille.
+    :param width: Largeur de la grille, égale à la hauteur par défaut.
+    :param seed: Graine du générateur aléatoire.
+    :return: Couple (grille, cellules noircies de l'unique solution).
+
+    >>> grid, blackened = generate_unique(6, seed=3)
+    >>> Solver(grid).count(limit=2), Solver(grid).solve() == blackened
+    (1, True)
+    """
+    width = height if width is None else width
+    rng = Random(seed)
+    while True:
+        blackened = random_layout(height, width, rng)
+        grid = fill_grid(height, width, blackened, rng)
+        if make_unique(grid, blackened, rng):
+            return grid, blackened
+
+
+def generate_file(file_name: str, height: int, width: int = None, seed: int = None):
+    """
+    Génère une grille à solution unique et l'écrit dans un fichier '.hti'.
+    :param file_name: Nom du fichier de sortie.
+    :param height: Hauteur de la grille.
+    :param width: Largeur de la grille, égale à la hauteur par défaut.
+    :param seed: Graine du générateur aléatoire.
+    :return: Nom du fichier écrit.
+    """
+    grid, _ = generate_unique(height, width, seed)
+    write_grid(grid, set(), file_name)
+    return file_name
+
+
+def generate_files(directory: str, count: int, height: int, width: int = None, jobs: int = None, seed: int = 0):
+    """
+    Génère en parallèle des grilles à solution unique dans un dossier.
+    La grille numéro k utilise la graine seed + k, ce qui rend la génération reproductible.
+    :param directory: Dossier de sortie.
+    :param count: Nombre de grilles.
+    :param height: Hauteur des grilles.
+    :param width: Largeur des grilles, égale à la hauteur par défaut.
+    :param jobs: Nombre de processus, ou None pour le nombre de cœurs.
+    :param seed: Graine de la première grille.
+    :return: Générateur des noms de fichiers écrits, dans l'ordre de fin de génération.
+    """
+    width = height if width is None else width
+    os.makedirs(directory, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(generate_file,
+                                   os.path.join(directory, "grille-{}x{}-{}.hti".format(height, width, seed + k)),
+                                   height, width, seed + k)
+                   for k in range(count)]
+        for future in as_completed(futures):
+            yield future.result()
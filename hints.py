@@ -0,0 +1,239 @@
+from collections import deque
+
+from solver import BLACK, UNKNOWN, WHITE, Solver
+
+SOLUTION_BUDGET = 2.0
+
+
+# INFORMATIONS SUR LES INDICES
+#
+# Un indice désigne la prochaine cellule dont la couleur découle
+# des règles, à partir des cellules déjà noircies par le joueur,
+# avec la règle qui l'impose. Les déductions sont celles du moteur
+# de résolution (voir solver.py), mais chacune garde sa raison.
+#
+# Les déductions qui ne dépendent pas du joueur (cellules sans
+# doublon, motifs « sandwich » et « paire ») sont calculées une
+# seule fois. L'état déduit est conservé entre deux indices : si le
+# joueur n'a fait que noircir de nouvelles cellules, la propagation
+# reprend là où elle s'était arrêtée au lieu de repartir de zéro.
+#
+# Une erreur du joueur (cellule noircie à tort) est signalée en
+# priorité. Lorsque les règles ne suffisent plus, l'indice est tiré
+# de la solution, calculée une seule fois. Une interface qui ne doit
+# pas attendre la résolution interroge d'abord deduction(), calcule
+# la solution à part si nécessaire, puis la transmet avec
+# set_solution() : hint() ne résout alors plus rien sur place.
+#
+
+def describe(cell: int, width: int):
+    """
+    Décrit la position d'une cellule pour le joueur.
+    :param cell: Indice de la cellule, à plat.
+    :param width: Largeur de la grille.
+    :return: Texte décrivant la cellule.
+
+    >>> describe(7, 5)
+    'ligne 2, colonne 3'
+    """
+    i, j = divmod(cell, width)
+    return "ligne {}, colonne {}".format(i + 1, j + 1)
+
+
+class HintEngine:
+
+    def __init__(self, grid: list):
+        """Prépare les déductions de la grille qui ne dépendent pas des cellules noircies par le joueur."""
+        self.solver = Solver(grid)
+        self.width = self.solver.width
+        self.solution = None
+        self.solved = False
+
+        self.static = bytearray(self.solver.height * self.width)
+        self.static_log = list()
+        self.static_queue = deque()
+        self.static_valid = self.initial(self.static, self.static_queue, self.static_log)
+
+        # État déduit pour les dernières cellules noircies reçues.
+        self.board = None
+        self.state = None
+        self.log = None
+        self.valid = False
+
+    def assign(self, state: bytearray, cell: int, color: int, queue: deque, log: list, reason: str):
+        """
+        Affecte une couleur à une cellule en conservant la raison de la déduction.
+        :return: Booléen indiquant l'absence de contradiction.
+        """
+        if state[cell] == color:
+            return True
+        if state[cell] != UNKNOWN:
+            return False
+        state[cell] = color
+        queue.append(cell)
+        log.append((cell, color, reason))
+        return True
+
+    def initial(self, state: bytearray, queue: deque, log: list):
+        """
+        Applique les déductions de départ : cellules sans doublon, motifs « sandwich » et « paire ».
+        :return: Booléen indiquant l'absence de contradiction.
+        """
+        solver = self.solver
+        for cell in range(len(state)):
+            if not solver.duplicates[cell]:
+                self.assign(state, cell, WHITE, queue, log, "aucun doublon sur sa ligne ni sur sa colonne")
+
+        valid = True
+        for line in solver.lines():
+            for a in range(len(line) - 1):
+                first, second = line[a], line[a + 1]
+                if a + 2 < len(line) and solver.values[first] == solver.values[line[a + 2]]:
+                    valid &= self.assign(state, second, WHITE, queue, log,
+                                         "entre deux {} : l'un des deux sera noirci".format(solver.values[first]))
+                if solver.values[first] == solver.values[second]:
+                    for other in line:
+                        if other not in (first, second) and solver.values[other] == solver.values[first]:
+                            valid &= self.assign(state, other, BLACK, queue, log,
+                                                 "la paire de {} voisins ({}) garde un {} blanc".format(
+                                                     solver.values[first], describe(first, self.width),
+                                                     solver.values[first]))
+        return valid
+
+    def propagate(self, state: bytearray, queue: deque, log: list):
+        """
+        Applique les déductions jusqu'à ce que l'état n'évolue plus.
+        :return: Booléen indiquant l'absence de contradiction.
+        """
+        solver = self.solver
+        while True:
+            while queue:
+                cell = queue.popleft()
+                if state[cell] == BLACK:
+                    for neighbour in solver.neighbours[cell]:
+                        if not self.assign(state, neighbour, WHITE, queue, log,
+                                           "voisine de la cellule noire ({})".format(describe(cell, self.width))):
+                            return False
+                else:
+                    for duplicate in solver.duplicates[cell]:
+                        if not self.assign(state, duplicate, BLACK, queue, log,
+                                           "doublon de la cellule blanche ({})".format(describe(cell, self.width))):
+                            return False
+
+            cuts = solver.connectivity.articulations(state, BLACK)
+            if cuts is None:
+                return False
+            cuts = [cell for cell in cuts if state[cell] == UNKNOWN]
+            if not cuts:
+                return True
+            for cell in cuts:
+                self.assign(state, cell, WHITE, queue, log, "la noircir couperait la zone blanche en deux")
+
+    def deduce(self, board: frozenset):
+        """Met à jour l'état déduit pour les cellules noircies données, en reprenant l'état précédent si possible."""
+        if self.board is not None and self.valid and self.board <= board:
+            added = board - self.board
+            state, log = self.state, self.log
+        else:
+            added = board
+            state, log = bytearray(self.static), list(self.static_log)
+            if not self.static_valid:
+                self.board, self.state, self.log, self.valid = board, state, log, False
+                return
+
+        queue = deque() if state is self.state else deque(self.static_queue)
+        valid = True
+        for cell in sorted(added):
+            valid = valid and self.assign(state, cell, BLACK, queue, log, "noircie par le joueur")
+        self.valid = valid and self.propagate(state, queue, log)
+        self.board, self.state, self.log = board, state, log
+
+    def mistake(self, board: frozenset):
+        """
+        Cherche une cellule noircie à tort par le joueur, sans recourir à la propagation.
+        :return: Indice (cellule, noire, règle), ou None.
+        """
+        for cell in sorted(board):
+            if self.static[cell] == WHITE:
+                reason = next(reason for logged, color, reason in self.static_log if logged == cell)
+                return divmod(cell, self.width), False, reason
+        for cell in sorted(board):
+            for neighbour in self.solver.neighbours[cell]:
+                if neighbour in board:
+                    return divmod(cell, self.width), False, "deux cellules noires ne peuvent pas se toucher"
+        return None
+
+    def from_solution(self, board: frozenset):
+        """
+        Tire un indice de la solution lorsque les règles ne suffisent plus.
+        :return: Indice (cellule, noire, règle), ou None.
+        """
+        if not self.solved:
+            self.solved = True
+            try:
+                self.solution = self.solver.solve(timeout=SOLUTION_BUDGET)
+            except TimeoutError:
+                self.solution = None
+        if self.solution is None:
+            return None
+        solution = {i * self.width + j for i, j in self.solution}
+        wrong = sorted(board - solution)
+        if wrong:
+            return divmod(wrong[0], self.width), False, "ne fait pas partie de la solution"
+        missing = sorted(solution - board)
+        if missing:
+            return divmod(missing[0], self.width), True, "aucune déduction simple : d'après la solution"
+        return None
+
+    def set_solution(self, solution: set):
+        """
+        Fournit la solution calculée à part, ou None si elle n'a pas pu l'être : hint() ne la calculera plus.
+        :param solution: Ensemble des cellules noircies de la solution, ou None.
+        """
+        self.solution = solution
+        self.solved = True
+
+    def deduction(self, blackened: set):
+        """
+        Cherche un indice à partir des seules règles, sans jamais calculer la solution.
+        :param blackened: Ensemble des cellules noircies par le joueur.
+        :return: Couple (indice ou None, booléen indiquant si l'indice doit être tiré de la solution).
+
+        >>> engine = HintEngine([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]])
+        >>> engine.deduction(set())
+        (((2, 2), True, 'la paire de 1 voisins (ligne 3, colonne 1) garde un 1 blanc'), False)
+        >>> engine.deduction({(0, 0), (0, 2), (1, 4), (2, 0), (2, 2), (3, 1), (3, 3)})
+        (None, False)
+        >>> engine.deduction({(0, 1)})
+        (None, True)
+        """
+        board = frozenset(i * self.width + j for i, j in blackened)
+        found = self.mistake(board)
+        if found is not None:
+            return found, False
+
+        self.deduce(board)
+        if not self.valid:
+            return None, True
+        for cell, color, reason in self.log:
+            if color == BLACK and cell not in board:
+                return (divmod(cell, self.width), True, reason), False
+        return None, UNKNOWN in self.state
+
+    def hint(self, blackened: set):
+        """
+        Retourne la prochaine cellule à noircir ou à libérer, avec la règle qui l'impose.
+        La solution est calculée sur place si elle est nécessaire et n'a pas été fournie par set_solution().
+        :param blackened: Ensemble des cellules noircies par le joueur.
+        :return: Triplet (cellule, booléen indiquant si elle doit être noire, règle), ou None si la grille est finie.
+
+        >>> engine = HintEngine([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]])
+        >>> engine.hint(set())
+        ((2, 2), True, 'la paire de 1 voisins (ligne 3, colonne 1) garde un 1 blanc')
+        >>> engine.hint({(0, 2), (0, 3)})
+        ((0, 3), False, 'aucun doublon sur sa ligne ni sur sa colonne')
+        """
+        found, needs_solution = self.deduction(blackened)
+        if not needs_solution:
+            return found
+        return self.from_solution(frozenset(i * self.width + j for i, j in blackened))
@@ -0,0 +1,99 @@
+# INFORMATIONS SUR L'HISTORIQUE DES COUPS
+#
+# L'historique ne conserve pas de copie de l'ensemble des cellules
+# noircies : chaque entrée est la liste des cellules dont l'état a
+# été inversé, une seule pour un clic, plusieurs pour une solution
+# appliquée d'un coup. Inverser à nouveau ces cellules annule
+# l'entrée ; annuler et rétablir coûtent donc la taille de l'entrée.
+#
+# Les entrées annulées restent disponibles pour être rétablies
+# jusqu'au prochain coup, qui les efface.
+#
+
+class History:
+
+    def __init__(self):
+        """Crée un historique vide."""
+        self.entries = list()
+        self.position = 0
+        self.version = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        """Oublie tous les coups."""
+        self.entries = list()
+        self.position = 0
+        self.version += 1
+
+    def can_undo(self):
+        """Indique si un coup peut être annulé."""
+        return self.position > 0
+
+    def can_redo(self):
+        """Indique si un coup annulé peut être rétabli."""
+        return self.position < len(self.entries)
+
+    def record(self, cells: tuple):
+        """
+        Enregistre un coup, en oubliant les coups annulés.
+        :param cells: Cellules dont l'état a été inversé.
+
+        >>> history = History()
+        >>> history.record(((0, 0),))
+        >>> history.record(((1, 1), (2, 2)))
+        >>> history.undo(), history.undo(), history.undo()
+        (((1, 1), (2, 2)), ((0, 0),), ())
+        >>> history.redo(), history.can_redo()
+        (((0, 0),), True)
+        >>> history.record(((3, 3),))
+        >>> history.can_redo(), len(history)
+        (False, 2)
+        """
+        del self.entries[self.position:]
+        self.entries.append(tuple(cells))
+        self.position += 1
+        self.version += 1
+
+    def undo(self):
+        """
+        Annule le dernier coup.
+        :return: Cellules dont l'état doit être inversé, vide s'il n'y a rien à annuler.
+        """
+        if not self.position:
+            return ()
+        self.position -= 1
+        self.version += 1
+        return self.entries[self.position]
+
+    def redo(self):
+        """
+        Rétablit le dernier coup annulé.
+        :return: Cellules dont l'état doit être inversé, vide s'il n'y a rien à rétablir.
+        """
+        if self.position == len(self.entries):
+            return ()
+        self.position += 1
+        self.version += 1
+        return self.entries[self.position - 1]
+
+    def goto(self, position: int):
+        """
+        Se place à un point quelconque de l'historique.
+        :param position: Nombre de coups joués après le déplacement, entre 0 et la taille de l'historique.
+        :return: Liste des cellules dont l'état doit être inversé.
+
+        >>> history = History()
+        >>> for cell in ((0, 0), (1, 1), (0, 0)):
+        ...     history.record((cell,))
+        >>> history.goto(0), history.goto(2)
+        ([(0, 0), (1, 1), (0, 0)], [(0, 0), (1, 1)])
+        """
+        position = max(0, min(position, len(self.entries)))
+        cells = list()
+        while self.position > position:
+            cells.extend(self.undo())
+        while self.position < position:
+            cells.extend(self.redo())
+        return cells
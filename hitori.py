@@ -1,442 +1,723 @@
 import os
 import sys
+
+# La ligne de commande (python -m hitori solve ...) fonctionne sans affichage : elle est lancée avant
+# d'importer tkinter et upemtk, qui peuvent ne pas être installés sur un serveur.
+if __name__ == "__main__" and sys.argv[1:]:
+    from batch import main
+    sys.exit(main(sys.argv[1:]))
+
 from datetime import datetime
-from doctest import testmod
+from functools import lru_cache
+from time import perf_counter, process_time, sleep
+import tkinter
 from tkinter import messagebox
 
+from cache import cache_for
+from core import GridError, write_grid
+from hints import HintEngine
+from history import History
+from index import index_for
+from journal import Journal
+from pack import read_level
+import upemtk
 from upemtk import *
+from validator import RuleState
+from worker import SOLVE_BUDGET, SolveTask
 
 CELL_SIZE = 50
+MIN_CELL_SIZE = 20
+MAX_CELL_SIZE = 100
+ZOOM_STEP = 1.25
+SCROLL_KEYS = {'Up': (-1, 0), 'Down': (1, 0), 'Left': (0, -1), 'Right': (0, 1)}
+SCREEN_RATIO = 0.9
 PAGE_SIZE = 5
 MARGIN = 20
+FRAME_RATE = 30
 
 
 # INFORMATIONS SUR LE PROGRAMME
 #
 # Le menu principal permet de charger un niveau par son nom,
 # ou via une liste récupérée automatiquement à partir des
-# fichiers dont l'extension est '.hti' (hitori file).
+# fichiers dont l'extension est '.hti' (hitori file) et des
+# grilles des paquets '.htp' (hitori pack) du dossier courant.
 #
 # Lors d'une partie, il est possible d'appuyer sur 'Echap' pour
 # faire apparaitre le menu. De la il est alors possible de
-# sauvegarder sa partie et de la continuer plus tard.
+# sauvegarder sa partie et de la continuer plus tard. Les coups
+# sont aussi enregistrés automatiquement dans un journal (voir
+# journal.py) : une partie interrompue reprend là où elle s'était
+# arrêtée.
+#
+# Les écrans (menu, liste des grilles, partie) partagent une même
+# boucle d'événements : elle ne redessine l'écran qu'après un
+# événement et s'endort entre deux consultations de la file
+# d'événements, au plus FRAME_RATE fois par seconde.
+#
+# Une seule fenêtre est créée au lancement : chaque écran la
+# redimensionne au lieu de la fermer et d'en ouvrir une nouvelle.
+# upemtk ne proposant ni redimensionnement ni mesure de l'écran,
+# sa fenêtre interne est lue par upemtk_window(), seule fonction
+# à dépendre des détails de upemtk (version distribuée avec le
+# cours). Avec une autre version, qui n'expose pas cette fenêtre,
+# le jeu revient au fonctionnement précédent : la fenêtre est
+# fermée et recréée à chaque changement de dimensions, et l'écran
+# est mesuré avec une fenêtre tkinter cachée.
+# Les dimensions des textes sont mesurées une seule fois. Les
+# doctests ne sont plus lancés au démarrage du jeu, mais avec :
+#
+#   python -m hitori test
+#
+# Une grille trop grande pour l'écran n'est affichée qu'en partie :
+# la taille des cellules est choisie d'après celle de l'écran, et
+# seules les cellules visibles sont dessinées. Les flèches font
+# défiler la grille, '+' et '-' changent la taille des cellules
+# (entre MIN_CELL_SIZE et MAX_CELL_SIZE pixels).
 #
 
-def pixel_to_cell(pixel: tuple):
+def pixel_to_cell(pixel: tuple, size: int = CELL_SIZE, offset: tuple = (0, 0)):
     """
     Convertit les coordonées d'un pixel en coordonées d'une cellule du plateau.
     :param pixel: Coordonées du pixel.
+    :param size: Taille des cellules en pixels.
+    :param offset: Coordonées de la première cellule affichée, dans le même ordre que celles du pixel.
     :return: Coordonées de la cellule.
 
     >>> pixel_to_cell((100, 200))
     (2, 4)
+    >>> pixel_to_cell((100, 200), 20, (30, 10))
+    (35, 20)
     """
     i, j = pixel
-    return i // CELL_SIZE, j // CELL_SIZE
+    return i // size + offset[0], j // size + offset[1]
 
 
-def read_grid(file_name: str, blackened: set):
+def fit_cell_size(rows: int, columns: int, width: int, height: int):
     """
-    Décrit les valeurs de la grille contenue dans le fichier texte sous forme de liste de listes.
-    La fonction renvoie une erreur si la grille est mal formée.
-    :param file_name: Nom du fichier contenant la grille.
-    :param blackened: Ensemble des cellules noircies.
-    :return: Liste de listes décrivant la grille.
-
-    >>> read_grid("grille.hti", set())
-    [[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]]
+    Choisit la taille des cellules pour qu'une grille tienne dans une zone, sans descendre sous MIN_CELL_SIZE.
+    :param rows: Nombre de lignes de la grille.
+    :param columns: Nombre de colonnes de la grille.
+    :param width: Largeur de la zone en pixels.
+    :param height: Hauteur de la zone en pixels.
+    :return: Taille des cellules en pixels.
+
+    >>> fit_cell_size(5, 5, 1200, 800), fit_cell_size(30, 30, 1200, 800), fit_cell_size(100, 100, 1200, 800)
+    (50, 26, 20)
     """
-    # Ouverture du fichier.
-    try:
-        file = open(file_name, "r")
-    except FileNotFoundError:
-        messagebox.showerror("Erreur", "Fichier introuvable !")
-        return
-    grid = list()
+    return max(MIN_CELL_SIZE, min(CELL_SIZE, width // columns, height // rows))
 
-    # Construction de la liste de listes.
-    try:
-        for i, line in enumerate(file):
-            grid_line = list()
-            for j, column in enumerate(line.strip().split()):
-                if int(column) < 0:
-                    blackened.add((i, j))
-                grid_line.append(abs(int(column)))
-            grid.append(grid_line)
-    except ValueError:
-        messagebox.showerror("Erreur", "La grille contient des valeurs inconnues !")
-        return
-
-    if not grid:
-        messagebox.showerror("Erreur", "Le fichier est vide !")
-        return
-
-    # Vérification du format rectangulaire.
-    if sum(len(line) for line in grid) != len(grid) * len(grid[0]):
-        messagebox.showerror("Erreur", "La grille n'est pas rectangulaire !")
-        return
-
-    file.close()
-    return grid
-
-
-def display_grid(grid: list):
-    """
-    Affiche la grille dans la console.
-    :param grid: Liste de listes décrivant la grille.
 
-    >>> display_grid([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
-    +---+---+---+
-    | 1 | 2 | 3 |
-    +---+---+---+
-    | 4 | 5 | 6 |
-    +---+---+---+
-    | 7 | 8 | 9 |
-    +---+---+---+
-    """
-    for line in grid:
-        print(len(line) * "+---" + "+")
-        for column in line:
-            print("| {} ".format(column), end='')
-        print("|")
-    print(len(grid[0]) * "+---" + "+")
+window_size = None
+UPEMTK_WINDOW = ("width", "height", "canvas", "root")
 
 
-def write_grid(grid: list, blackened: set, file_name: str):
+def upemtk_window():
     """
-    Écrit une grille sous forme de fichier texte.
-    :param grid: Liste de listes décrivant la grille.
-    :param blackened: Ensembles des cellules noircies.
-    :param file_name: Nom du fichier de sortie.
+    Renvoie la fenêtre interne de upemtk, que son interface ne permet pas de redimensionner.
+    :return: Fenêtre de upemtk, ou None si elle n'est pas encore créée ou si upemtk ne l'expose pas comme la
+             version du cours (variable '__canevas' ayant les attributs width, height, canvas et root).
     """
-    file = open(file_name, "w")
-
-    # Écriture de la grille.
-    for i, line in enumerate(grid):
-        for j, column in enumerate(line):
-            if (i, j) in blackened:
-                file.write(str(-column) + (" " if j + 1 < len(line) else "\n"))
-            else:
-                file.write(str(column) + (" " if j + 1 < len(line) else "\n"))
-
-    file.close()
+    window = vars(upemtk).get("__canevas")
+    if window is not None and all(hasattr(window, name) for name in UPEMTK_WINDOW):
+        return window
+    return None
 
 
-def without_conflict(grid: list, blackened: set):
+def show_window(width: int, height: int):
     """
-    Vérifie que chaque numéro n'apparaisse qu'une fois par ligne et par colonne. (Règle n°1)
-    :param grid: Liste de listes décrivant la grille.
-    :param blackened: Ensemble des cellules noircies.
-    :return: Booléen déterminant s'il y a conflit.
-
-    >>> without_conflict([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]], \
-                     {(2, 0), (0, 0), (3, 3), (2, 2), (3, 1), (0, 2), (1, 4)})
-    True
+    Prépare la fenêtre du jeu pour un écran : elle est créée au premier appel, puis vidée et redimensionnée.
+    Si la fenêtre de upemtk n'est pas accessible, elle est fermée puis recréée aux nouvelles dimensions.
+    :param width: Largeur de l'écran.
+    :param height: Hauteur de l'écran.
     """
-    # Vérification de l'unicité des nombres dans les lignes.
-    for i, line in enumerate(grid):
-        unique = list()
-        for j, column in enumerate(line):
-            if (i, j) in blackened:
-                continue
-            if column not in unique:
-                unique.append(column)
-            else:
-                return False
-
-    # Vérification de l'unicité des nombres dans les colonnes.
-    for j, column in enumerate([[line[column] for line in grid] for column in range(len(grid[0]))]):
-        unique = list()
-        for i, line in enumerate(column):
-            if (i, j) in blackened:
-                continue
-            if line not in unique:
-                unique.append(line)
-            else:
-                return False
-
-    return True
+    global window_size
+    if window_size is None:
+        cree_fenetre(width, height)
+    elif window_size == (width, height):
+        efface_tout()
+    else:
+        window = upemtk_window()
+        if window is None:
+            ferme_fenetre()
+            cree_fenetre(width, height)
+        else:
+            # upemtk ne permet pas de redimensionner sa fenêtre : le canevas est modifié directement.
+            efface_tout()
+            window.width, window.height = width, height
+            window.canvas.config(width=width, height=height)
+    window_size = width, height
 
 
-def without_adjacent(grid: list, blackened: set):
+@lru_cache(maxsize=None)
+def screen_size():
     """
-    Vérifie qu'aucune cellule noircies ne soit adjacente à une autre. (Règle n°2)
-    :param grid: Liste de listes décrivant la grille.
-    :param blackened: Ensemble des cellules noircies.
-    :return: Booléen déterminant s'il y a des cellules noircies voisines.
-
-    >>> without_adjacent([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]], \
-                               {(2, 0), (0, 0), (3, 3), (2, 2), (3, 1), (0, 2), (1, 4)})
-    True
+    Mesure les dimensions de l'écran, une seule fois, à partir de la fenêtre du jeu (voir upemtk_window), ou
+    d'une fenêtre tkinter cachée si celle-ci n'est pas accessible.
+    :return: Couple (largeur, hauteur) en pixels.
     """
-    # Parcours des cellules de la grille.
-    for i, line in enumerate(grid):
-        for j, column in enumerate(line):
-            if (i, j) not in blackened:
-                continue
+    if window_size is None:
+        show_window(0, 0)
+    window = upemtk_window()
+    if window is not None:
+        return window.root.winfo_screenwidth(), window.root.winfo_screenheight()
+    root = tkinter.Tk()
+    root.withdraw()
+    try:
+        return root.winfo_screenwidth(), root.winfo_screenheight()
+    finally:
+        root.destroy()
 
-            # Détermination de la présence d'une voisine.
-            if i > 0 and (i - 1, j) in blackened:
-                return False
-            if i < len(grid) - 1 and (i + 1, j) in blackened:
-                return False
-            if j > 0 and (i, j - 1) in blackened:
-                return False
-            if j < len(grid[0]) - 1 and (i, j + 1) in blackened:
-                return False
 
-    return True
+@lru_cache(maxsize=None)
+def text_size(content: str, size: int = 24):
+    """
+    Mesure les dimensions d'un texte, une seule fois pour un même texte et une même taille.
+    :param content: Texte à mesurer.
+    :param size: Taille de la police.
+    :return: Couple (largeur, hauteur) en pixels.
+    """
+    return taille_texte(content, taille=size)
 
 
-def related(grid: list, blackened: set):
+def read_grid(file_name: str, blackened: set):
     """
-    Vérifie que la zone formée par toutes les cellules non noircies soit connexe. (Règle n°3)
-    :param grid: Liste de listes décrivant la grille.
+    Décrit les valeurs de la grille contenue dans le fichier texte ou le paquet sous forme de liste de listes.
+    La fonction affiche une erreur si la grille est mal formée.
+    :param file_name: Nom du fichier contenant la grille, ou 'paquet.htp#N' pour une grille d'un paquet.
     :param blackened: Ensemble des cellules noircies.
-    :return: Booléen déterminant si la zone non noircies est connexe.
-
+    :return: Liste de listes décrivant la grille.
 
-    >>> related([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]], \
-                {(2, 0), (0, 0), (3, 3), (2, 2), (3, 1), (0, 2), (1, 4)})
-    True
+    >>> read_grid("grille.hti", set())
+    [[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]]
     """
-    # Parcours des cellules de la grille.
-    for i, line in enumerate(grid):
-        for j in range(len(line)):
-            if (i, j) in blackened:
-                continue
-
-            # Vérification de l'unicité de la zone formée en partant d'une cellule.
-            return sum([len(line) for line in grid]) == len(blackened) + len(explore(grid, i, j, blackened, set()))
-
-    return False
+    try:
+        return read_level(file_name, blackened)
+    except GridError as error:
+        messagebox.showerror("Erreur", str(error))
 
 
-def explore(grid: list, line: int, column: int, blackened: set, vacants: set):
-    """
-    Explore la grille afin de recupérer toutes les cellules libres en partant d'une cellule.
-    :param grid: Liste de listes décrivant la grille.
-    :param line: Ligne de la cellule actuelle.
-    :param column: Colonne de la cellule actuelle.
-    :param blackened: Ensemble des cellules noircies
-    :param vacants: Ensemble des cellules libres.
-    :return: Ensemble des cellules libres.
+def cell_styles(blackened: set, diagnostics: tuple = ((), (), ())):
     """
-    # Ajout de la cellule libre à l'ensemble.
-    if (line, column) not in vacants:
-        vacants.add((line, column))
-
-    # Récursivité sur les cellules libres voisines.
-    if line > 0 and (line - 1, column) not in blackened and (line - 1, column) not in vacants:
-        explore(grid, line - 1, column, blackened, vacants)
-    if line < len(grid) - 1 and (line + 1, column) not in blackened and (line + 1, column) not in vacants:
-        explore(grid, line + 1, column, blackened, vacants)
-    if column > 0 and (line, column - 1) not in blackened and (line, column - 1) not in vacants:
-        explore(grid, line, column - 1, blackened, vacants)
-    if column < len(grid[0]) - 1 and (line, column + 1) not in blackened and (line, column + 1) not in vacants:
-        explore(grid, line, column + 1, blackened, vacants)
-
-    return vacants
-
+    Associe aux cellules noircies ou fautives leurs couleurs, les autres cellules restant blanches.
+    :param blackened: Ensemble des cellules noircies.
+    :param diagnostics: Triplet retourné par RuleState.diagnostics().
+    :return: Dictionnaire associant à une cellule le couple (remplissage, couleur du texte).
 
-def draw_grid(grid: list, blackened: set):
+    >>> styles = cell_styles({(0, 0), (0, 1)}, ({(1, 1)}, {((0, 0), (0, 1))}, {(1, 1)}))
+    >>> styles[(0, 0)], styles[(1, 1)]
+    (('dark red', 'white'), ('misty rose', 'red'))
+    """
+    duplicates, pairs, isolated = diagnostics
+    styles = {cell: ("black", "white") for cell in blackened}
+    for pair in pairs:
+        for cell in pair:
+            styles[cell] = ("dark red", "white")
+    for cell in isolated:
+        styles[cell] = ("misty rose", "black")
+    for cell in duplicates:
+        styles[cell] = (styles.get(cell, ("white",))[0], "red")
+    return styles
+
+
+def draw_grid(grid: list, blackened: set, diagnostics: tuple = ((), (), ())):
     """
-    Dessine la grille.
+    Dessine la grille, en mettant en évidence les cellules fautives.
     :param grid: Liste de listes décrivant la grille.
     :param blackened: Ensemble des cellules noircies.
+    :param diagnostics: Triplet retourné par RuleState.diagnostics().
     """
+    styles = cell_styles(blackened, diagnostics)
     for i, line in enumerate(grid):
         for j, column in enumerate(line):
+            fill, color = styles.get((i, j), ("white", "black"))
             # Dessin de la cellule.
             rectangle(MARGIN + j * CELL_SIZE,
                       MARGIN + i * CELL_SIZE,
                       MARGIN + j * CELL_SIZE + CELL_SIZE,
                       MARGIN + i * CELL_SIZE + CELL_SIZE,
-                      remplissage="black" if (i, j) in blackened else "white")
+                      remplissage=fill)
             texte(MARGIN + j * CELL_SIZE + CELL_SIZE / 2,
                   MARGIN + i * CELL_SIZE + CELL_SIZE / 2,
-                  column, ancrage="center", couleur="black" if (i, j) not in blackened else "white")
+                  column, ancrage="center", couleur=color)
 
 
-def contains_duplicates(lst: list, element: object):
+def press(buttons: dict, x: int, y: int):
     """
-    Détecte si la liste contient des doublons
-    :param lst: Liste.
-    :param element: Élement dont il faut vérifier l'unicité.
-    :return: Booléen du résultat.
-
-    >>> contains_duplicates([1, 2, 3, 4], 1)
-    False
-
-    >>> contains_duplicates([1, 2, 3, 1], 1)
-    True
+    Déclenche les boutons affichés contenant un point.
+    :param buttons: Dictionnaire des boutons.
+    :param x: Abscisse du point.
+    :param y: Ordonnée du point.
     """
-    unique = set()
-    for e in lst:
-        if e != element:
+    for button in buttons:
+        btn = buttons[button].get_coordinates()
+        if btn is None:
             continue
-        if e not in unique:
-            unique.add(e)
-        else:
-            return True
-    return False
+        if btn[0] <= x <= btn[2] and btn[1] <= y <= btn[3]:
+            buttons[button].execute()
 
 
-def solve(grid: list, blackened: set, i: int = 0, j: int = 0):
+def open_level(file_name: str):
     """
-    Retourne l'ensemble des cellules noircies solution de la grille, ou None s'il n'y a aucune solution.
-    :param grid: Liste de listes décrivant la grille.
-    :param blackened: Ensemble des cellules noircies.
-    :param i: Indice de la ligne actuelle.
-    :param j: Indice de la colonne actuelle.
-    :return: Ensemble des cellules à noircir ou None si aucune solution n'existe.
+    Ouvre une partie, ou revient au menu principal si la grille ne peut pas être lue.
+    :param file_name: Nom du fichier contenant la grille.
     """
+    game = Hitori(file_name)
+    events.show(game if game.grid is not None else Menu())
 
-    # Définition d'une fonction permettant de passer en revue la cellule suivante.
-    def next_cell():
-        if j < len(grid[0]) - 1:
-            return solve(grid, blackened, i, j + 1)
-        elif i < len(grid) - 1:
-            return solve(grid, blackened, i + 1, 0)
-        else:
+
+class Viewport:
+
+    def __init__(self, rows: int, columns: int, width: int, height: int, size: int = CELL_SIZE):
+        """
+        Crée la partie visible d'une grille, affichée dans une zone de la fenêtre.
+        :param rows: Nombre de lignes de la grille.
+        :param columns: Nombre de colonnes de la grille.
+        :param width: Largeur de la zone en pixels.
+        :param height: Hauteur de la zone en pixels.
+        :param size: Taille des cellules en pixels.
+        """
+        self.rows, self.columns = rows, columns
+        self.width, self.height = width, height
+        self.size = size
+        self.top, self.left = 0, 0
+        self.visible_rows, self.visible_columns = 0, 0
+        self.resize()
+
+    def resize(self):
+        """Calcule le nombre de cellules visibles pour la taille actuelle des cellules."""
+        self.visible_rows = min(self.rows, self.height // self.size)
+        self.visible_columns = min(self.columns, self.width // self.size)
+        self.scroll(0, 0)
+
+    def scroll(self, rows: int, columns: int):
+        """
+        Fait défiler la partie visible, sans dépasser les bords de la grille.
+        :param rows: Nombre de lignes à faire défiler.
+        :param columns: Nombre de colonnes à faire défiler.
+        :return: Booléen indiquant si la partie visible a changé.
+
+        >>> view = Viewport(100, 100, 400, 200, 20)
+        >>> view.visible_rows, view.visible_columns
+        (10, 20)
+        >>> view.scroll(95, 3), view.top, view.left
+        (True, 90, 3)
+        >>> view.scroll(1, 0)
+        False
+        """
+        top = max(0, min(self.rows - self.visible_rows, self.top + rows))
+        left = max(0, min(self.columns - self.visible_columns, self.left + columns))
+        changed = (top, left) != (self.top, self.left)
+        self.top, self.left = top, left
+        return changed
+
+    def zoom(self, steps: int):
+        """
+        Change la taille des cellules en gardant la même cellule au centre de la partie visible.
+        :param steps: Nombre de crans d'agrandissement, négatif pour réduire.
+        :return: Booléen indiquant si la taille des cellules a changé.
+
+        >>> view = Viewport(100, 100, 400, 200, 20)
+        >>> view.scroll(40, 40), view.zoom(2), view.size, view.visible_rows, view.top
+        (True, True, 31, 6, 42)
+        """
+        size = max(MIN_CELL_SIZE, min(MAX_CELL_SIZE, round(self.size * ZOOM_STEP ** steps)))
+        if size == self.size:
+            return False
+        center = self.top + self.visible_rows // 2, self.left + self.visible_columns // 2
+        self.size = size
+        self.top, self.left = 0, 0
+        self.resize()
+        self.scroll(center[0] - self.visible_rows // 2, center[1] - self.visible_columns // 2)
+        return True
+
+    def show(self, cell: tuple):
+        """
+        Fait défiler la partie visible pour qu'elle contienne une cellule.
+        :param cell: Coordonées de la cellule.
+        :return: Booléen indiquant si la partie visible a changé.
+        """
+        i, j = cell
+        rows = min(0, i - self.top) + max(0, i - self.top - self.visible_rows + 1)
+        columns = min(0, j - self.left) + max(0, j - self.left - self.visible_columns + 1)
+        return self.scroll(rows, columns)
+
+    def contains(self, cell: tuple):
+        """Indique si une cellule fait partie de la partie visible."""
+        i, j = cell
+        return self.top <= i < self.top + self.visible_rows and self.left <= j < self.left + self.visible_columns
+
+    def cells(self):
+        """Énumère les cellules visibles."""
+        for i in range(self.top, self.top + self.visible_rows):
+            for j in range(self.left, self.left + self.visible_columns):
+                yield i, j
+
+    def position(self, cell: tuple):
+        """
+        Retourne les coordonées du coin supérieur gauche d'une cellule dans la fenêtre.
+        :param cell: Coordonées de la cellule.
+        :return: Couple (abscisse, ordonnée).
+
+        >>> Viewport(100, 100, 400, 200, 20).position((2, 3))
+        (80, 60)
+        """
+        i, j = cell
+        return MARGIN + (j - self.left) * self.size, MARGIN + (i - self.top) * self.size
+
+    def pixel_to_cell(self, x: int, y: int):
+        """
+        Retourne la cellule affichée sous un pixel de la fenêtre.
+        :param x: Abscisse du pixel.
+        :param y: Ordonnée du pixel.
+        :return: Coordonées de la cellule, ou None si le pixel est hors de la grille.
+
+        >>> view = Viewport(100, 100, 400, 200, 20)
+        >>> view.scroll(95, 3), view.pixel_to_cell(MARGIN + 45, MARGIN + 10)
+        (True, (90, 5))
+        >>> view.pixel_to_cell(MARGIN + 45, MARGIN + 210) is None
+        True
+        """
+        if x < MARGIN or y < MARGIN:
             return None
+        j, i = pixel_to_cell((x - MARGIN, y - MARGIN), self.size, (self.left, self.top))
+        return (i, j) if self.contains((i, j)) else None
+
+    def font_size(self):
+        """Retourne la taille des numéros, proportionnelle à celle des cellules."""
+        return max(8, self.size * 24 // CELL_SIZE)
+
+
+class GridView:
+
+    def __init__(self, grid: list, viewport: Viewport = None):
+        """Crée la vue d'une grille, qui conserve les objets dessinés pour chaque cellule visible."""
+        self.grid = grid
+        if viewport is None:
+            viewport = Viewport(len(grid), len(grid[0]), len(grid[0]) * CELL_SIZE, len(grid) * CELL_SIZE)
+        self.viewport = viewport
+        self.items = dict()
+        self.shown = dict()
+
+    def draw_cell(self, i: int, j: int, style: tuple):
+        """Remplace les objets dessinés pour une cellule, avec le couple (remplissage, couleur du texte)."""
+        for item in self.items.get((i, j), ()):
+            efface(item)
+        fill, color = style
+        size = self.viewport.size
+        x, y = self.viewport.position((i, j))
+        self.items[(i, j)] = (
+            rectangle(x, y, x + size, y + size, remplissage=fill, tag="grid"),
+            texte(x + size / 2, y + size / 2, self.grid[i][j], ancrage="center", couleur=color,
+                  taille=self.viewport.font_size(), tag="grid"))
+
+    def visible_styles(self, blackened: set, diagnostics: tuple):
+        """Retourne les couleurs des cellules noircies ou fautives de la partie visible."""
+        viewport = self.viewport
+        if viewport.visible_rows * viewport.visible_columns == viewport.rows * viewport.columns:
+            return cell_styles(blackened, diagnostics)
+
+        # Seules les cellules visibles sont examinées : le diagnostic étant tenu à jour coup par coup
+        # (voir RuleState.diagnostics), le coût d'une image ne dépend pas de la taille de la grille.
+        cells = list(viewport.cells())
+        duplicates, pairs, isolated = diagnostics
+        black = {cell for cell in cells if cell in blackened}
+        neighbours = {pair for i, j in black for pair in (((i, j), (i, j + 1)), ((i, j), (i + 1, j)),
+                                                          ((i, j - 1), (i, j)), ((i - 1, j), (i, j))) if pair in pairs}
+        styles = cell_styles(black, ({cell for cell in cells if cell in duplicates}, neighbours,
+                                     {cell for cell in cells if cell in isolated}))
+        return {cell: style for cell, style in styles.items() if viewport.contains(cell)}
+
+    def draw(self, blackened: set, diagnostics: tuple = ((), (), ())):
+        """
+        Dessine toutes les cellules visibles, par exemple à l'ouverture de la fenêtre ou après un défilement.
+        :param blackened: Ensemble des cellules noircies.
+        :param diagnostics: Triplet retourné par RuleState.diagnostics().
+        """
+        efface("grid")
+        self.items = dict()
+        self.shown = self.visible_styles(blackened, diagnostics)
+        for i, j in self.viewport.cells():
+            self.draw_cell(i, j, self.shown.get((i, j), ("white", "black")))
 
-    if not without_adjacent(grid, blackened) or not related(grid, blackened):
-        return None
-    elif without_adjacent(grid, blackened) and related(grid, blackened) and without_conflict(grid, blackened):
-        return blackened
-    else:
-        line = grid[i]
-        column = [[line[column] for line in grid] for column in range(len(grid[0]))][j]
+    def update(self, blackened: set, diagnostics: tuple = ((), (), ())):
+        """
+        Redessine uniquement les cellules visibles dont l'état ou la mise en évidence a changé depuis le dernier dessin.
+        Seules les cellules noircies ou fautives visibles sont examinées, jamais la grille entière.
+        :param blackened: Ensemble des cellules noircies.
+        :param diagnostics: Triplet retourné par RuleState.diagnostics().
+        :return: Nombre de cellules redessinées.
+        """
+        styles = self.visible_styles(blackened, diagnostics)
+        changed = [cell for cell in self.shown.keys() | styles.keys() if self.shown.get(cell) != styles.get(cell)]
+        for i, j in changed:
+            self.draw_cell(i, j, styles.get((i, j), ("white", "black")))
+        self.shown = styles
+        return len(changed)
 
-        if not contains_duplicates(line, grid[i][j]) and not contains_duplicates(column, grid[i][j]):
-            return next_cell()
-        else:
-            blackened.add((i, j))
-            if next_cell() is None:
-                blackened.remove((i, j))
-            return next_cell()
+
+class EventLoop:
+
+    def __init__(self, frame_rate: int = FRAME_RATE):
+        """Crée la boucle d'événements partagée par les écrans."""
+        self.period = 1 / frame_rate
+        self.screen = None
+
+    def show(self, screen):
+        """Remplace l'écran affiché."""
+        self.screen = screen
+
+    def wait(self, timeout: float = None):
+        """
+        Attend le prochain événement en s'endormant entre deux consultations de la file d'événements.
+        :param timeout: Temps d'attente maximal en secondes, ou None.
+        :return: Événement, ou None si le temps d'attente est écoulé.
+        """
+        deadline = None if timeout is None else perf_counter() + timeout
+        while True:
+            ev = donne_ev()
+            if ev is not None:
+                return ev
+            mise_a_jour()
+            if self.screen is not None and hasattr(self.screen, "tick"):
+                self.screen.tick()
+            if deadline is not None and perf_counter() >= deadline:
+                return None
+            if self.period:
+                sleep(self.period)
+
+    def run(self, screen):
+        """Affiche un écran puis traite les événements jusqu'à la fin du programme."""
+        self.screen = screen
+        while True:
+            screen = self.screen
+            screen.draw_elements()
+            screen.handle(self.wait())
+            # Un écran remplacé pendant le traitement a déjà vidé la fenêtre pour le suivant.
+            if self.screen is screen:
+                screen.clear()
+
+    def idle_usage(self, duration: float = 1.0):
+        """
+        Mesure l'utilisation du processeur pendant une attente sans événement.
+        :param duration: Durée de la mesure en secondes.
+        :return: Temps processeur consommé rapporté au temps écoulé.
+        """
+        start, cpu = perf_counter(), process_time()
+        while perf_counter() - start < duration:
+            self.wait(duration - (perf_counter() - start))
+        return (process_time() - cpu) / (perf_counter() - start)
+
+
+events = EventLoop()
 
 
 class Hitori:
 
     def __init__(self, file_name: str):
         # Initialisation du jeu
-        cree_fenetre(0, 0)
+        self.file_name = file_name
         self.blackened = set()
-        self.blackened_history = list()
-        self.blackened_history_size = 0
+        self.history = History()
+        self.checked_version = 0
         self.buttons = dict()
         self.victory = False
         self.pause = False
+        self.task = None
+        self.task_version = None
+        self.message = ""
+        self.hint = None
+        self.hint_version = None
+        self.hint_pending = False
 
         # Initialisation de la grille.
         self.grid = read_grid(file_name, self.blackened)
         if self.grid is None:
-            ferme_fenetre()
             return
 
-        # Initialisation de la taille de la grille.
-        self.GRID_HEIGHT = CELL_SIZE * len(self.grid)
-        self.GRID_WIDTH = CELL_SIZE * len(self.grid[0])
+        # Reprise de la dernière partie à partir de la sauvegarde automatique et du journal des coups.
+        self.journal = Journal(file_name)
+        self.journal.restore(self.grid, self.blackened, self.history)
+        self.rules = RuleState(self.grid, self.blackened)
+        self.hints = HintEngine(self.grid)
 
         # Calcul des proportions relatives au texte.
-        self.RIGHT_OFFSET = taille_texte('Noircies voisines')[0] - taille_texte('Noircies voisines')[0] % 5 + 20
-        self.BAR_SIZE = taille_texte('X')[1] - taille_texte('X')[1] % 5 + 20
+        self.RIGHT_OFFSET = text_size('Noircies voisines')[0] - text_size('Noircies voisines')[0] % 5 + 20
+        self.BAR_SIZE = text_size('X')[1] - text_size('X')[1] % 5 + 20
+
+        # Initialisation de la partie visible de la grille, d'après la taille de l'écran.
+        rows, columns = len(self.grid), len(self.grid[0])
+        screen_width, screen_height = screen_size()
+        width = int(screen_width * SCREEN_RATIO) - 2 * MARGIN - self.RIGHT_OFFSET
+        height = int(screen_height * SCREEN_RATIO) - 2 * MARGIN - self.BAR_SIZE
+        size = fit_cell_size(rows, columns, width, height)
+        self.viewport = Viewport(rows, columns, min(columns, width // size) * size, min(rows, height // size) * size,
+                                 size)
+        self.GRID_HEIGHT = self.viewport.height
+        self.GRID_WIDTH = self.viewport.width
 
         # Calcul de la taille de la fenêtre.
         self.HEIGHT = self.GRID_HEIGHT + 2 * MARGIN + self.BAR_SIZE
         self.WIDTH = self.GRID_WIDTH + 2 * MARGIN + self.RIGHT_OFFSET
-        ferme_fenetre()
 
         # Création des boutons.
-        self.buttons["quit"] = Button("Quitter", lambda: sys.exit(0))
+        self.buttons["quit"] = Button("Quitter", lambda h=self: h.quit())
         self.buttons["cancel"] = Button("Annuler", lambda h=self: h.cancel())
+        self.buttons["redo"] = Button("Rétablir", lambda h=self: h.redo())
+        self.buttons["hint"] = Button("Indice", lambda h=self: h.show_hint())
         self.buttons["solve"] = Button("Résoudre", lambda h=self: h.solve())
+        self.buttons["stop"] = Button("Arrêter", lambda h=self: h.stop())
 
         button_width = "Sauvegarder la partie"
         self.buttons["menu_pause"] = Button("Menu principal", lambda h=self: h.menu(), width=button_width)
         self.buttons["save_pause"] = Button("Sauvegarder la partie", lambda h=self: h.save(), width=button_width)
-        self.buttons["quit_pause"] = Button("Quitter", lambda h=self: sys.exit(0), width=button_width)
+        self.buttons["quit_pause"] = Button("Quitter", lambda h=self: h.quit(), width=button_width)
 
         # Initialisation de la fenêtre principale.
-        cree_fenetre(self.WIDTH, self.HEIGHT)
-
-        # Boucle principale.
-        while True:
-            self.loop()
+        show_window(self.WIDTH, self.HEIGHT)
+        self.view = GridView(self.grid, self.viewport)
+        self.view.draw(self.blackened, self.rules.diagnostics())
+
+    def handle(self, ev):
+        """Traite un événement de la partie."""
+        if type_ev(ev) == 'ClicGauche':
+            x, y = abscisse(ev), ordonnee(ev)
+            self.message = ""
+            self.hint = None
+            cell = self.viewport.pixel_to_cell(x, y)
+            if not self.victory and not self.pause and cell is not None:
+                self.history.record((cell,))
+                self.journal.record((cell,))
+                self.rules.toggle(cell)
+            else:
+                press(self.buttons, x, y)
+        elif type_ev(ev) == 'Touche':
+            if touche(ev) == 'Escape':
+                self.pause = not self.pause
+            elif self.pause:
+                pass
+            elif touche(ev) in ('z', 'BackSpace'):
+                self.cancel()
+            elif touche(ev) == 'y':
+                self.redo()
+            elif touche(ev) == 'Home':
+                self.goto(0)
+            elif touche(ev) == 'End':
+                self.goto(len(self.history))
+            elif touche(ev) in SCROLL_KEYS:
+                rows, columns = SCROLL_KEYS[touche(ev)]
+                self.scroll(rows * max(1, self.viewport.visible_rows // 4),
+                            columns * max(1, self.viewport.visible_columns // 4))
+            elif touche(ev) in ('plus', 'KP_Add', 'equal'):
+                self.zoom(1)
+            elif touche(ev) in ('minus', 'KP_Subtract'):
+                self.zoom(-1)
+        elif type_ev(ev) == 'Quitte':
+            self.quit()
+
+    def tick(self):
+        """
+        Écrit le journal des coups en attente, et le compacte s'il est trop long.
+        Affiche l'avancement de la résolution en cours, et son résultat lorsqu'elle se termine.
+        """
+        self.journal.tick()
+        if self.journal.needs_compaction():
+            self.journal.compact(self.grid, self.blackened)
 
-    def loop(self):
-        """Boucle principale du jeu."""
-        # Dessin des éléments.
-        self.draw_elements()
+        if self.task is None:
+            return
+        if self.task.done():
+            self.finish()
+            self.clear()
+            self.draw_elements()
+        else:
+            efface("progress")
+            self.draw_progress()
 
-        # Gestion des événements.
-        while True:
-            # Manipulation des événements.
-            ev = donne_ev()
-            if ev is not None:
-                if type_ev(ev) == 'ClicGauche':
-                    x, y = abscisse(ev), ordonnee(ev)
-                    if not self.victory and not self.pause and \
-                            MARGIN < x < MARGIN + self.GRID_WIDTH and MARGIN < y < MARGIN + self.GRID_HEIGHT:
-                        y, x = pixel_to_cell((x - MARGIN, y - MARGIN))
-                        self.blackened_history.append(self.blackened.copy())
-                        if (x, y) in self.blackened:
-                            self.blackened.discard((x, y))
-                        else:
-                            self.blackened.add((x, y))
-                    else:
-                        for button in self.buttons:
-                            btn = self.buttons[button].get_coordinates()
-                            if btn is None:
-                                continue
-                            if btn[0] <= x <= btn[2] and btn[1] <= y <= btn[3]:
-                                self.buttons[button].execute()
-                elif type_ev(ev) == 'Touche':
-                    if touche(ev) == 'Escape':
-                        self.pause = not self.pause
-                elif type_ev(ev) == 'Quitte':
-                    sys.exit(0)
-                break
-            mise_a_jour()
+    def quit(self):
+        """Écrit le journal des coups et quitte le programme."""
+        self.stop()
+        self.journal.flush()
+        sys.exit(0)
 
-        # Nettoyage de la fenêtre.
+    def clear(self):
+        """Nettoie l'interface : les cellules de la grille restent en place."""
         for btn in self.buttons.values():
             btn.reset()
-        efface_tout()
+        efface("interface")
+        efface("progress")
 
-    def draw_elements(self):
-        """Dessine les éléments de l'interface."""
-        draw_grid(self.grid, self.blackened)
-        rectangle(0, self.HEIGHT - self.BAR_SIZE, self.WIDTH, self.HEIGHT, remplissage="black")
+    def draw_progress(self):
+        """Affiche l'avancement de la résolution en cours."""
+        nodes, decided = self.task.progress()
+        texte(10, self.BAR_SIZE / 2 + 2 * MARGIN + self.GRID_HEIGHT,
+              "{} nœuds, {}/{} cellules".format(nodes, decided, self.task.cells), ancrage="w", couleur="white",
+              taille=12, tag="progress")
 
-        # Affichage du message de victoire le cas échéant.
-        if self.blackened_history_size < len(self.blackened_history):
-            self.blackened_history_size = len(self.blackened_history)
-            if without_conflict(self.grid, self.blackened) and without_adjacent(self.grid, self.blackened) and \
-                    related(self.grid, self.blackened):
-                texte(10, self.BAR_SIZE / 2 + 2 * MARGIN + self.GRID_HEIGHT, "Gagné !", ancrage="w", couleur="green")
-                self.victory = True
+    def draw_elements(self):
+        """
+        Dessine les éléments de l'interface, en ne redessinant que les cellules modifiées.
+        Les cellules fautives sont mises en évidence ; le diagnostic est mis à jour localement à chaque coup.
+        """
+        if not self.pause:
+            self.view.update(self.blackened, self.rules.diagnostics())
+        rectangle(0, self.HEIGHT - self.BAR_SIZE, self.WIDTH, self.HEIGHT, remplissage="black", tag="interface")
+
+        # Affichage du message de victoire le cas échéant, vérifié seulement si l'historique a changé.
+        if self.checked_version != self.history.version:
+            self.checked_version = self.history.version
+            self.victory = self.rules.is_won()
+            if self.victory:
+                index = index_for(os.path.dirname(self.file_name) or os.curdir)
+                index.mark_solved(os.path.basename(self.file_name))
+                index.flush()
+        if self.victory:
+            texte(10, self.BAR_SIZE / 2 + 2 * MARGIN + self.GRID_HEIGHT, "Gagné !", ancrage="w", couleur="green",
+                  tag="interface")
+        elif self.task is not None:
+            self.draw_progress()
+        elif self.message:
+            texte(10, self.BAR_SIZE / 2 + 2 * MARGIN + self.GRID_HEIGHT, self.message, ancrage="w", couleur="red",
+                  taille=12, tag="interface")
+
+        # Affichage de l'indice, tant que la grille n'a pas changé.
+        if self.hint is not None and self.hint_version == self.history.version:
+            cell, black, reason = self.hint
+            if self.viewport.contains(cell):
+                x, y = self.viewport.position(cell)
+                rectangle(x, y, x + self.viewport.size, y + self.viewport.size, couleur="orange", epaisseur=3,
+                          tag="interface")
+            texte(MARGIN, MARGIN / 2, ("Noircir : " if black else "Libérer : ") + reason, ancrage="w",
+                  couleur="orange", taille=10, tag="interface")
 
         # Dessin des indications d'aide à la résolution.
         i = 0
         texte(2 * MARGIN + self.GRID_WIDTH, MARGIN + CELL_SIZE / 2 + i * CELL_SIZE, "Conflits", ancrage="w",
-              couleur="green" if without_conflict(self.grid, self.blackened) else "red")
+              couleur="green" if self.rules.without_conflict() else "red", tag="interface")
         i += 1
         texte(2 * MARGIN + self.GRID_WIDTH, MARGIN + CELL_SIZE / 2 + i * CELL_SIZE, "Noires voisines", ancrage="w",
-              couleur="green" if without_adjacent(self.grid, self.blackened) else "red")
+              couleur="green" if self.rules.without_adjacent() else "red", tag="interface")
         i += 1
         texte(2 * MARGIN + self.GRID_WIDTH, MARGIN + CELL_SIZE / 2 + i * CELL_SIZE, "Connexe", ancrage="w",
-              couleur="green" if related(self.grid, self.blackened) else "red")
+              couleur="green" if self.rules.related() else "red", tag="interface")
+
+        # Position de la partie visible, lorsque la grille ne tient pas entièrement dans la fenêtre.
+        viewport = self.viewport
+        if (viewport.visible_rows, viewport.visible_columns) != (viewport.rows, viewport.columns):
+            i += 1
+            texte(2 * MARGIN + self.GRID_WIDTH, MARGIN + CELL_SIZE / 2 + i * CELL_SIZE,
+                  "Lignes {}-{}/{}".format(viewport.top + 1, viewport.top + viewport.visible_rows, viewport.rows),
+                  ancrage="w", taille=12, tag="interface")
+            texte(2 * MARGIN + self.GRID_WIDTH, MARGIN + i * CELL_SIZE + CELL_SIZE,
+                  "Colonnes {}-{}/{}".format(viewport.left + 1, viewport.left + viewport.visible_columns,
+                                             viewport.columns), ancrage="w", taille=12, tag="interface")
 
         if self.pause:
-            rectangle(0, 0, self.WIDTH, self.HEIGHT, remplissage="black", couleur="black")
-            texte(self.WIDTH / 2, CELL_SIZE, "Menu", ancrage='n', taille=32, couleur="white")
-            for i, (value, button) in enumerate(self.buttons.items()):
-                if "pause" not in value:
-                    continue
-                button.draw(self.WIDTH / 2, i * CELL_SIZE, "center")
+            rectangle(0, 0, self.WIDTH, self.HEIGHT, remplissage="black", couleur="black", tag="interface")
+            texte(self.WIDTH / 2, CELL_SIZE, "Menu", ancrage='n', taille=32, couleur="white", tag="interface")
+            pause_buttons = [button for value, button in self.buttons.items() if "pause" in value]
+            for i, button in enumerate(pause_buttons, 3):
+                button.draw(self.WIDTH / 2, i * CELL_SIZE, "center", tag="interface")
         else:
             # Dessin des boutons de jeu
             last_button = None
@@ -444,33 +725,135 @@ class Hitori:
                 # Conditions
                 if "pause" in value:
                     continue
-                if value == "cancel" and not self.blackened_history:
+                if value == "cancel" and not self.history.can_undo():
+                    continue
+                if value == "redo" and not self.history.can_redo():
+                    continue
+                if value == "solve" and (self.victory or self.task is not None):
+                    continue
+                if value == "hint" and self.victory:
                     continue
-                if value == "solve" and self.victory:
+                if value == "stop" and self.task is None:
                     continue
 
                 if last_button is None:
-                    button.draw(self.WIDTH - 5, self.HEIGHT - 5, "se")
+                    button.draw(self.WIDTH - 5, self.HEIGHT - 5, "se", tag="interface")
                 else:
-                    button.draw(last_button.get_coordinates()[0] - 5, self.HEIGHT - 5, "se")
+                    button.draw(last_button.get_coordinates()[0] - 5, self.HEIGHT - 5, "se", tag="interface")
                 last_button = button
 
+    def apply(self, cells):
+        """Inverse l'état de plusieurs cellules."""
+        for cell in cells:
+            self.rules.toggle(cell)
+
     def cancel(self):
         """Annule le dernier coup."""
-        self.blackened = self.blackened_history[-1]
-        self.blackened_history.pop()
-        if self.victory:
-            self.victory = False
-        self.blackened_history_size -= 1
+        if self.history.can_undo():
+            cells = self.history.undo()
+            self.journal.undo(cells)
+            self.apply(cells)
+
+    def redo(self):
+        """Rétablit le dernier coup annulé."""
+        if self.history.can_redo():
+            cells = self.history.redo()
+            self.journal.redo(cells)
+            self.apply(cells)
+
+    def goto(self, position: int):
+        """Revient à la position donnée de l'historique."""
+        cells = self.history.goto(position)
+        self.journal.goto(self.history.position, cells)
+        self.apply(cells)
+
+    def show_hint(self):
+        """
+        Désigne la prochaine cellule à noircir ou à libérer, avec la règle qui l'impose.
+        Lorsque les règles ne suffisent plus, la solution est lue dans le cache ou calculée en arrière-plan,
+        et l'indice n'est affiché qu'à la fin de la résolution.
+        """
+        self.hint, needs_solution = self.hints.deduction(self.blackened)
+        self.hint_version = self.history.version
+        if needs_solution and not self.hints.solved:
+            found, solution = cache_for(os.path.dirname(self.file_name) or os.curdir).get(self.grid)
+            if not found:
+                if self.task is None:
+                    self.task = SolveTask(self.grid, SOLVE_BUDGET).start()
+                    self.task_version = self.history.version
+                    self.hint_pending = True
+                self.message = "Recherche de la solution..."
+                return
+            self.hints.set_solution(solution)
+        if needs_solution:
+            self.hint = self.hints.hint(self.blackened)
+
+        if self.hint is None:
+            self.message = "Aucun indice"
+        elif self.viewport.show(self.hint[0]):
+            self.view.draw(self.blackened, self.rules.diagnostics())
+
+    def scroll(self, rows: int, columns: int):
+        """Fait défiler la grille et redessine les cellules visibles."""
+        if self.viewport.scroll(rows, columns):
+            self.view.draw(self.blackened, self.rules.diagnostics())
+
+    def zoom(self, steps: int):
+        """Change la taille des cellules et redessine les cellules visibles."""
+        if self.viewport.zoom(steps):
+            self.view.draw(self.blackened, self.rules.diagnostics())
 
     def solve(self):
-        """Résout la grille actuelle."""
-        self.blackened_history.append(self.blackened.copy())
+        """Résout la grille actuelle, en arrière-plan si sa solution n'est pas déjà connue."""
+        found, solution = cache_for(os.path.dirname(self.file_name) or os.curdir).get(self.grid)
+        if found:
+            self.show_solution(solution)
+            return
+        self.task = SolveTask(self.grid, SOLVE_BUDGET).start()
+        self.task_version = self.history.version
 
-        solution = solve(self.grid, set())
+    def stop(self):
+        """Annule la résolution en cours."""
+        if self.task is not None:
+            self.task.cancel()
 
-        if solution is not None:
-            self.blackened = solution
+    def finish(self):
+        """
+        Applique le résultat de la résolution terminée, si la grille n'a pas été modifiée entre-temps.
+        Une résolution lancée pour un indice affiche l'indice au lieu de la solution.
+        """
+        task, self.task = self.task, None
+        pending, self.hint_pending = self.hint_pending, False
+        if task.status in ("solved", "unsolvable"):
+            cache = cache_for(os.path.dirname(self.file_name) or os.curdir)
+            cache.put(self.grid, task.solution)
+            cache.flush()
+            self.hints.set_solution(task.solution)
+        elif task.status == "timeout":
+            # Les indices suivants ne relanceront pas une résolution vouée à échouer.
+            self.hints.set_solution(None)
+
+        if task.status == "cancelled":
+            self.message = "Résolution annulée"
+        elif task.status == "timeout":
+            self.message = "Temps de résolution dépassé"
+        elif pending:
+            self.message = ""
+            self.show_hint()
+        elif self.history.version != self.task_version:
+            self.message = "Grille modifiée pendant la résolution"
+        else:
+            self.show_solution(task.solution)
+
+    def show_solution(self, solution: set):
+        """Applique une solution, enregistrée comme un seul coup inversant les cellules qui diffèrent."""
+        if solution is None:
+            self.message = "Aucune solution"
+            return
+        cells = sorted(solution ^ self.blackened)
+        self.history.record(cells)
+        self.journal.record(cells)
+        self.apply(cells)
 
     def save(self):
         """Sauvegarde la partie."""
@@ -479,11 +862,11 @@ class Hitori:
         messagebox.showinfo("Succès", "La partie a été sauvegardée dans le fichier " + file_name + ".")
         self.pause = False
 
-    @staticmethod
-    def menu():
+    def menu(self):
         """Ferme la partie et lance le menu principal."""
-        ferme_fenetre()
-        Menu()
+        self.stop()
+        self.journal.flush()
+        events.show(Menu())
 
 
 class Menu:
@@ -498,45 +881,27 @@ class Menu:
         self.buttons["load_game"] = Button("Charger une grille", lambda m=self: m.load(), width=button_width)
         self.buttons["quit"] = Button("Quitter", lambda: sys.exit(0), width=button_width)
 
-        cree_fenetre(self.WIDTH, self.HEIGHT)
-
-        while True:
-            self.loop()
+        show_window(self.WIDTH, self.HEIGHT)
 
-    def loop(self):
-        """Boucle du menu."""
-        # Dessin des éléments.
+    def draw_elements(self):
+        """Dessine les éléments du menu."""
         texte(self.WIDTH / 2, CELL_SIZE, "HITORI", taille=48, ancrage='n')
 
         for i, (value, button) in enumerate(self.buttons.items()):
             button.draw(self.WIDTH / 2, ((i + 4) if value == "quit" else (i + 3)) * CELL_SIZE, anchor='n', fill="black",
                         color="white")
 
-        # Manipulation des événements.
-        while True:
-            ev = donne_ev()
-            if ev is not None:
-                if type_ev(ev) == 'ClicGauche':
-                    x, y = abscisse(ev), ordonnee(ev)
-                    for button in self.buttons:
-                        btn = self.buttons[button].get_coordinates()
-                        if btn is None:
-                            continue
-                        if btn[0] <= x <= btn[2] and btn[1] <= y <= btn[3]:
-                            self.buttons[button].execute()
-                elif type_ev(ev) == 'Touche':
-                    pass
-                elif type_ev(ev) == 'Quitte':
-                    sys.exit(0)
-                break
-
-            mise_a_jour()
+    def handle(self, ev):
+        """Traite un événement du menu."""
+        if type_ev(ev) == 'ClicGauche':
+            press(self.buttons, abscisse(ev), ordonnee(ev))
+        elif type_ev(ev) == 'Quitte':
+            sys.exit(0)
 
-        # Réinitialisation des boutons.
+    def clear(self):
+        """Réinitialise les boutons et nettoie la fenêtre."""
         for btn in self.buttons.values():
             btn.reset()
-
-        # Nettoyage de la fenêtre.
         efface_tout()
 
     @staticmethod
@@ -544,71 +909,47 @@ class Menu:
         """Ferme le menu et charge une grille."""
         messagebox.showinfo("Information", "Veuillez entrer le nom du fichier dans la console.")
         file_name = input("Nom du fichier : ")
-        ferme_fenetre()
-        Hitori(file_name)
+        open_level(file_name)
 
     @staticmethod
     def grid_list():
         """Ferme le menu et ouvre le sélecteur de grilles."""
-        ferme_fenetre()
-        GameList()
+        events.show(GameList())
 
 
 class GameList:
 
     def __init__(self):
-        self.WIDTH = 9 * CELL_SIZE
+        self.WIDTH = 12 * CELL_SIZE
         self.HEIGHT = int(7.5 * CELL_SIZE)
         self.buttons = dict()
-        self.grid_files = list()
+        self.level_buttons = list()
+        self.previews = dict()
 
         self.buttons["next"] = Button(">", lambda gl=self: gl.next(), height="X" * 10)
         self.buttons["prev"] = Button("<", lambda gl=self: gl.prev(), height="X" * 10)
         self.buttons["back"] = Button("←", lambda gl=self: gl.back(), height="_°")
 
-        # Récupération des fichiers en '.hti'.
-        for file in sorted(os.listdir(os.curdir)):
-            if file.split(".")[-1] != "hti":
-                continue
-            self.grid_files.append(file)
-            self.buttons[file] = Button(file, lambda gl=self, f=file: gl.load(f), width="X" * 16)
-
+        # Récupération de l'index des fichiers en '.hti' et des grilles des paquets.
+        # Les boutons ne sont créés que pour la page affichée.
+        self.index = index_for()
         self.page = 0
-        self.max_page = len(self.grid_files) // PAGE_SIZE
-
-        cree_fenetre(self.WIDTH, self.HEIGHT)
-        while True:
-            self.loop()
+        self.shown_page = None
+        self.max_page = len(self.index) // PAGE_SIZE
 
-    def loop(self):
-        # Dessin des éléments.
-        self.draw_elements()
-
-        # Manipulation des événements.
-        while True:
-            ev = donne_ev()
-            if ev is not None:
-                if type_ev(ev) == 'ClicGauche':
-                    x, y = abscisse(ev), ordonnee(ev)
-                    for button in self.buttons:
-                        btn = self.buttons[button].get_coordinates()
-                        if btn is None:
-                            continue
-                        if btn[0] <= x <= btn[2] and btn[1] <= y <= btn[3]:
-                            self.buttons[button].execute()
-                elif type_ev(ev) == 'Touche':
-                    pass
-                elif type_ev(ev) == 'Quitte':
-                    sys.exit(0)
-                break
+        show_window(self.WIDTH, self.HEIGHT)
 
-            mise_a_jour()
+    def handle(self, ev):
+        """Traite un événement de la liste des grilles."""
+        if type_ev(ev) == 'ClicGauche':
+            press(self.buttons, abscisse(ev), ordonnee(ev))
+        elif type_ev(ev) == 'Quitte':
+            sys.exit(0)
 
-        # Réinitialisation des boutons.
+    def clear(self):
+        """Réinitialise les boutons et nettoie la fenêtre."""
         for btn in self.buttons.values():
             btn.reset()
-
-        # Nettoyage de la fenêtre.
         efface_tout()
 
     def draw_elements(self):
@@ -627,15 +968,36 @@ class GameList:
                                           color="white")
         self.buttons["back"].draw(10, 10)
 
-        for i, file in enumerate(self.grid_files):
-            if self.page * PAGE_SIZE <= i < (self.page + 1) * PAGE_SIZE:
-                self.buttons[file].draw(self.WIDTH // 2, (i % PAGE_SIZE + 2) * CELL_SIZE, anchor='center')
+        if self.shown_page != self.page:
+            self.show_page()
+        # L'aperçu de la première ligne est affiché à droite du bouton de chaque grille.
+        for i, name in enumerate(self.level_buttons):
+            self.buttons[name].draw(self.WIDTH // 2 - CELL_SIZE, (i + 2) * CELL_SIZE, anchor='center')
+            _, top, right, bottom = self.buttons[name].get_coordinates()
+            texte(right + 10, (top + bottom) / 2, self.previews[name], couleur="grey", taille=12, ancrage='w')
+
+    def show_page(self):
+        """Crée les boutons des grilles de la page courante."""
+        for name in self.level_buttons:
+            del self.buttons[name]
+        self.level_buttons = list()
+        self.previews = dict()
+
+        for name, entry in self.index.page(self.page, PAGE_SIZE):
+            label = name if entry["size"] is None else "{} {}x{}".format(name, *entry["size"])
+            if entry["solved"]:
+                label = "✓ " + label
+            self.buttons[name] = Button(label, lambda gl=self, f=name: gl.load(f), width="X" * 16)
+            self.level_buttons.append(name)
+            self.previews[name] = entry["preview"]
+
+        self.shown_page = self.page
+        self.index.flush()
 
     @staticmethod
     def back():
         """Ferme la liste des grilles et ouvre le menu principal."""
-        ferme_fenetre()
-        Menu()
+        events.show(Menu())
 
     def prev(self):
         """Passe à la page précédente."""
@@ -650,8 +1012,7 @@ class GameList:
     @staticmethod
     def load(file_name):
         """Ferme le selecteur de grille et ouvre le niveau."""
-        ferme_fenetre()
-        Hitori(file_name)
+        open_level(file_name)
 
 
 class Button:
@@ -664,62 +1025,66 @@ class Button:
         self.width = width
         self.height = height
 
-    def draw(self, x: int, y: int, anchor: str = 'nw', fill: str = 'white', color: str = 'black', size: int = 24):
+    def draw(self, x: int, y: int, anchor: str = 'nw', fill: str = 'white', color: str = 'black', size: int = 24,
+             tag: str = ''):
         """Dessine le bouton et stocke ses coordonées."""
         # Calcul et arrondissement des dimensions.
         if self.width is None:
-            width = taille_texte(self.content, taille=size)[0]
+            width = text_size(self.content, size)[0]
         else:
-            width = taille_texte(self.width, taille=size)[0]
+            width = text_size(self.width, size)[0]
 
         if self.height is None:
-            height = taille_texte(self.content, taille=size)[1]
+            height = text_size(self.content, size)[1]
         else:
-            height = taille_texte(self.height, taille=size)[0]
+            height = text_size(self.height, size)[0]
         height -= height % 5
 
         # Dessin du bouton en fonction de son ancrage.
         if anchor == 'nw':
-            rectangle(x, y, x + width + 2 * 5, y + height + 2 * 5, remplissage=fill)
+            rectangle(x, y, x + width + 2 * 5, y + height + 2 * 5, remplissage=fill, tag=tag)
             texte(x + (width + 2 * 5) // 2, y + (height + 2 * 5) // 2, self.content, ancrage='center', taille=size,
-                  couleur=color)
+                  couleur=color, tag=tag)
             self.coordinates = x, y, x + width + 2 * 5, y + height + 2 * 5
         elif anchor == 'n':
             rectangle(x - (width + 2 * 5) // 2, y, x + (width + 2 * 5) // 2, y + height + 2 * 5,
-                      remplissage=fill)
-            texte(x, y + (height + 2 * 5) // 2, self.content, ancrage='center', taille=size, couleur=color)
+                      remplissage=fill, tag=tag)
+            texte(x, y + (height + 2 * 5) // 2, self.content, ancrage='center', taille=size, couleur=color, tag=tag)
             self.coordinates = x - (width + 2 * 5) // 2, y, x + (width + 2 * 5) // 2, y + height + 2 * 5
         elif anchor == 'ne':
-            rectangle(x - width - 2 * 5, y, x, y + height + 2 * 5, remplissage=fill)
+            rectangle(x - width - 2 * 5, y, x, y + height + 2 * 5, remplissage=fill, tag=tag)
             texte(x + (width + 2 * 5) // 2, y - (height + 2 * 5) // 2, self.content, ancrage='center', taille=size,
-                  couleur=color)
+                  couleur=color, tag=tag)
             self.coordinates = x - width - 2 * 5, y, x, y + height + 2 * 5
         elif anchor == 'e':
-            rectangle(x - width - 2 * 5, y - (height + 2 * 5) // 2, x, y + (height + 2 * 5) // 2, remplissage=fill)
-            texte(x - (width + 2 * 5) // 2, y, self.content, ancrage='center', taille=size, couleur=color)
+            rectangle(x - width - 2 * 5, y - (height + 2 * 5) // 2, x, y + (height + 2 * 5) // 2,
+                      remplissage=fill, tag=tag)
+            texte(x - (width + 2 * 5) // 2, y, self.content, ancrage='center', taille=size, couleur=color, tag=tag)
             self.coordinates = x - height - 2 * 5, y - (height + 2 * 5) // 2, x, y + (height + 2 * 5) // 2
         elif anchor == 'se':
-            rectangle(x - width - 2 * 5, y - height - 2 * 5, x, y, remplissage=fill)
+            rectangle(x - width - 2 * 5, y - height - 2 * 5, x, y, remplissage=fill, tag=tag)
             texte(x - (width + 2 * 5) // 2, y - (height + 2 * 5) // 2, self.content, ancrage='center', taille=size,
-                  couleur=color)
+                  couleur=color, tag=tag)
             self.coordinates = x - width - 2 * 5, y - height - 2 * 5, x, y
         elif anchor == 's':
-            rectangle(x - (width + 2 * 5) // 2, y - height - 2 * 5, x + (width + 2 * 5) // 2, y, remplissage=fill)
-            texte(x, y - (height + 2 * 5) // 2, self.content, ancrage='center', taille=size, couleur=color)
+            rectangle(x - (width + 2 * 5) // 2, y - height - 2 * 5, x + (width + 2 * 5) // 2, y,
+                      remplissage=fill, tag=tag)
+            texte(x, y - (height + 2 * 5) // 2, self.content, ancrage='center', taille=size, couleur=color, tag=tag)
             self.coordinates = x - (width + 2 * 5) // 2, y - height - 2 * 5, x + (width + 2 * 5) // 2, y
         elif anchor == 'sw':
-            rectangle(x, y - height - 2 * 5, x + width + 2 * 5, y, remplissage=fill)
+            rectangle(x, y - height - 2 * 5, x + width + 2 * 5, y, remplissage=fill, tag=tag)
             texte(x + (width + 2 * 5) // 2, y - (height + 2 * 5) // 2, self.content, ancrage='center', taille=size,
-                  couleur=color)
+                  couleur=color, tag=tag)
             self.coordinates = x, y - height - 2 * 5, x + width + 2 * 5, y
         elif anchor == 'w':
-            rectangle(x, y - (height + 2 * 5) // 2, x + width + 2 * 5, y + (height + 2 * 5) // 2, remplissage=fill)
-            texte(x + (width + 2 * 5) // 2, y, self.content, ancrage='center', taille=size, couleur=color)
+            rectangle(x, y - (height + 2 * 5) // 2, x + width + 2 * 5, y + (height + 2 * 5) // 2,
+                      remplissage=fill, tag=tag)
+            texte(x + (width + 2 * 5) // 2, y, self.content, ancrage='center', taille=size, couleur=color, tag=tag)
             self.coordinates = x, y - (height + 2 * 5) // 2, x + height + 2 * 5, y + (height + 2 * 5) // 2
         elif anchor == 'center':
             rectangle(x - (width + 2 * 5) // 2, y - (height + 2 * 5) // 2, x + (width + 2 * 5) // 2,
-                      y + (height + 2 * 5) // 2, remplissage=fill)
-            texte(x, y, self.content, ancrage='center', taille=size, couleur=color)
+                      y + (height + 2 * 5) // 2, remplissage=fill, tag=tag)
+            texte(x, y, self.content, ancrage='center', taille=size, couleur=color, tag=tag)
             self.coordinates = x - (width + 2 * 5) // 2, y - (height + 2 * 5) // 2, x + (
                     width + 2 * 5) // 2, y + (height + 2 * 5) // 2
 
@@ -743,5 +1108,4 @@ class Button:
 
 
 if __name__ == "__main__":
-    testmod()
-    Menu()
+    events.run(Menu())
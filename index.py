@@ -0,0 +1,248 @@
+import json
+import os
+import time
+
+from core import GridError, grid_files
+from pack import SEPARATOR, level_name, open_pack, pack_files, read_level
+
+INDEX_FILE = ".hitori-index.json"
+PREVIEW_SIZE = 16
+RACY_DELAY = 2 * 10 ** 9
+
+
+# INFORMATIONS SUR L'INDEX DES GRILLES
+#
+# La liste des grilles d'un dossier ('.hti' et grilles des paquets
+# '.htp') est enregistrée dans un fichier JSON avec la date de
+# modification du dossier et la signature de ses fichiers de grilles
+# (noms des '.hti', noms, dates de modification et tailles des
+# paquets).
+#
+# Tant que la date de modification du dossier n'a pas changé, aucun
+# fichier n'a été ajouté, supprimé ou remplacé : l'index est utilisé
+# sans parcourir le dossier. Une date trop récente (moins de
+# RACY_DELAY) n'est pas conservée, car un fichier ajouté dans la même
+# unité de temps ne la modifierait pas. Un paquet réécrit sur place
+# sans passer par write_pack (qui le remplace) n'est donc pas vu.
+#
+# Quand la date a changé, le dossier est parcouru pour recalculer la
+# signature, ce qui coûte un stat par paquet et un listdir. La liste
+# n'est reconstruite, en relisant les paquets, que si la signature a
+# changé. Les fichiers écrits à côté des grilles (cache des solutions,
+# journaux, sauvegardes automatiques, index) modifient la date du
+# dossier et provoquent donc ce parcours, mais jamais de
+# reconstruction.
+#
+# Les informations d'une grille (dimensions, aperçu de la première
+# ligne, grille résolue ou non) ne sont lues qu'au moment où elle est
+# affichée, puis conservées avec la date de modification de son
+# fichier. Quand le dossier n'a pas changé, afficher une page ne coûte
+# donc que les grilles de cette page, quel que soit le nombre de
+# grilles du dossier.
+#
+
+def preview(grid: list):
+    """
+    Construit un aperçu textuel d'une grille à partir de sa première ligne.
+    :param grid: Liste de listes décrivant la grille.
+    :return: Aperçu de la grille.
+
+    >>> preview([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5]])
+    '2 2 1 5 3'
+    >>> preview([[10, 11, 12, 13, 14, 15]])
+    '10 11 12 13 14…'
+    """
+    text = " ".join(str(value) for value in grid[0])
+    return text if len(text) <= PREVIEW_SIZE else text[:PREVIEW_SIZE - 2].rstrip() + "…"
+
+
+def signature(directory: str = os.curdir):
+    """
+    Résume les fichiers de grilles d'un dossier, sans les lire.
+    :param directory: Dossier à parcourir.
+    :return: Liste [noms des '.hti', liste des [nom, date de modification, taille] des paquets].
+
+    >>> signature()[0][:2], signature()[1]
+    (['grille.hti', 'niveau1.hti'], [])
+    >>> from tempfile import TemporaryDirectory
+    >>> with TemporaryDirectory() as directory:
+    ...     with open(os.path.join(directory, "a.hti"), "w") as file:
+    ...         _ = file.write("1 2")
+    ...     before = signature(directory)
+    ...     with open(os.path.join(directory, "a.hti.journal"), "w") as file:
+    ...         _ = file.write("")
+    ...     signature(directory) == before
+    True
+    """
+    packs = list()
+    for pack_file in pack_files(directory):
+        try:
+            status = os.stat(os.path.join(directory, pack_file))
+        except OSError:
+            continue
+        packs.append([pack_file, status.st_mtime_ns, status.st_size])
+    return [grid_files(directory), packs]
+
+
+class LevelIndex:
+
+    def __init__(self, directory: str = os.curdir):
+        """Crée l'index des grilles d'un dossier, à partir du fichier enregistré s'il existe."""
+        self.directory = directory
+        self.file_name = os.path.join(directory, INDEX_FILE)
+        self.stamp = None
+        self.files = None
+        self.names = list()
+        self.entries = dict()
+        self.changed = False
+        self.load()
+        self.refresh()
+
+    def load(self):
+        """Charge l'index enregistré."""
+        try:
+            with open(self.file_name) as file:
+                stored = json.load(file)
+            self.stamp, self.files = stored["stamp"], stored["files"]
+            self.names, self.entries = stored["names"], stored["entries"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+
+    def refresh(self):
+        """
+        Reconstruit la liste des grilles si des grilles ou des paquets du dossier ont changé.
+
+        >>> from tempfile import TemporaryDirectory
+        >>> def write(directory, name, stamp):
+        ...     with open(os.path.join(directory, name), "w") as file:
+        ...         _ = file.write("1 2")
+        ...     os.utime(directory, ns=(stamp, stamp))
+        >>> with TemporaryDirectory() as directory:
+        ...     write(directory, "a.hti", 10 ** 18)
+        ...     index = LevelIndex(directory)
+        ...     write(directory, "b.hti", 10 ** 18)
+        ...     index.refresh()
+        ...     before = len(index)
+        ...     os.utime(directory, ns=(2 * 10 ** 18, 2 * 10 ** 18))
+        ...     index.refresh()
+        ...     before, len(index)
+        (1, 2)
+        """
+        try:
+            stamp = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            stamp = None
+        if stamp is not None and stamp == self.stamp:
+            return
+        files = signature(self.directory)
+        if stamp is not None and time.time_ns() - stamp < RACY_DELAY:
+            stamp = None
+        if stamp != self.stamp:
+            self.stamp = stamp
+            self.changed = True
+        if files == self.files:
+            return
+        grids, packs = files
+        names = list(grids)
+        for pack_file, _, _ in packs:
+            try:
+                count = len(open_pack(os.path.join(self.directory, pack_file)))
+            except GridError:
+                continue
+            names.extend(level_name(pack_file, index) for index in range(count))
+
+        self.files, self.names = files, names
+        known = set(names)
+        self.entries = {name: entry for name, entry in self.entries.items() if name in known}
+        self.changed = True
+
+    def __len__(self):
+        return len(self.names)
+
+    def path(self, name: str):
+        """
+        Retourne le chemin du fichier contenant une grille de l'index.
+        :param name: Nom de la grille.
+        :return: Chemin du fichier '.hti' ou du paquet.
+        """
+        return os.path.join(self.directory, name.rpartition(SEPARATOR)[0] or name)
+
+    def entry(self, name: str):
+        """
+        Retourne les informations d'une grille, en la relisant si son fichier a été modifié.
+        :param name: Nom de la grille.
+        :return: Dictionnaire (date de modification, dimensions, aperçu, grille résolue).
+
+        >>> entry = LevelIndex().entry("grille.hti")
+        >>> entry["size"], entry["preview"]
+        ([5, 5], '2 2 1 5 3')
+        """
+        try:
+            mtime = os.stat(self.path(name)).st_mtime_ns
+        except OSError:
+            mtime = None
+        entry = self.entries.get(name)
+        if entry is not None and entry["mtime"] == mtime:
+            return entry
+
+        entry = {"mtime": mtime, "size": None, "preview": "", "solved": False}
+        try:
+            grid = read_level(os.path.join(self.directory, name), set())
+            entry["size"], entry["preview"] = [len(grid), len(grid[0])], preview(grid)
+        except GridError:
+            pass
+        self.entries[name] = entry
+        self.changed = True
+        return entry
+
+    def page(self, number: int, size: int):
+        """
+        Retourne les grilles d'une page de l'index.
+        :param number: Numéro de la page, à partir de 0.
+        :param size: Nombre de grilles par page.
+        :return: Liste de couples (nom, informations).
+
+        >>> [name for name, entry in LevelIndex().page(0, 2)]
+        ['grille.hti', 'niveau1.hti']
+        """
+        return [(name, self.entry(name)) for name in self.names[number * size:(number + 1) * size]]
+
+    def mark_solved(self, name: str):
+        """
+        Indique qu'une grille a été résolue.
+        :param name: Nom de la grille.
+        """
+        entry = self.entry(name)
+        if not entry["solved"]:
+            entry["solved"] = True
+            self.changed = True
+
+    def flush(self):
+        """Écrit l'index dans son fichier s'il a été modifié."""
+        if not self.changed:
+            return
+        try:
+            with open(self.file_name, "w") as file:
+                json.dump({"stamp": self.stamp, "files": self.files, "names": self.names,
+                           "entries": self.entries}, file, separators=(",", ":"))
+        except OSError:
+            return
+        self.changed = False
+
+
+_indexes = dict()
+
+
+def index_for(directory: str = os.curdir):
+    """
+    Retourne l'index partagé des grilles d'un dossier, mis à jour si ses grilles ou ses paquets ont changé.
+    Le dossier n'est parcouru que si sa date de modification a changé.
+    :param directory: Dossier contenant les grilles.
+    :return: Instance de LevelIndex.
+    """
+    key = os.path.abspath(directory)
+    if key not in _indexes:
+        _indexes[key] = LevelIndex(directory)
+    else:
+        _indexes[key].refresh()
+    return _indexes[key]
@@ -0,0 +1,296 @@
+import os
+from time import perf_counter
+
+from cache import encode, grid_key
+from core import GridError, read_grid, write_grid
+
+BATCH_SIZE = 32
+FLUSH_INTERVAL = 1.0
+COMPACT_SIZE = 500
+
+
+# INFORMATIONS SUR LA SAUVEGARDE AUTOMATIQUE
+#
+# Chaque coup d'une partie est ajouté à un journal placé à côté de
+# la grille ('niveau.hti.journal'), une ligne par opération :
+#
+#   m 0,1 2,3    coup inversant les cellules (0, 1) et (2, 3)
+#   u 0,1        annulation du dernier coup
+#   r 0,1        rétablissement du dernier coup annulé
+#   g 5 0,1      déplacement à la position 5 de l'historique
+#
+# Chaque ligne contient les cellules inversées : l'état rétabli est
+# toujours exact, même lorsque l'historique rejoué ne remonte pas
+# au-delà de la dernière sauvegarde automatique.
+#
+# Les lignes sont regroupées en mémoire puis écrites par lots,
+# lorsque le lot est plein ou qu'il attend depuis FLUSH_INTERVAL
+# secondes. La première ligne ('b EMPREINTE MASQUE') identifie
+# l'état de départ du journal : l'empreinte du contenu de la grille
+# (voir cache.py), puis les cellules noircies de la grille ou celles
+# de la dernière sauvegarde automatique ('niveau.hti.autosave', au
+# format '.hti'). Le journal d'une grille remplacée par une autre,
+# même de mêmes dimensions, est donc ignoré ; une ligne désignant
+# une cellule hors de la grille est traitée comme une ligne tronquée.
+#
+# Au-delà de COMPACT_SIZE opérations, l'état courant est écrit dans
+# la sauvegarde automatique et le journal repart de zéro. Si le
+# programme s'arrête entre ces deux écritures, l'en-tête du journal
+# ne correspond plus à la sauvegarde et le journal est ignoré.
+#
+
+def format_cells(cells):
+    """
+    Encode une suite de cellules pour le journal.
+    :param cells: Suite de cellules.
+    :return: Texte des cellules.
+
+    >>> format_cells([(0, 1), (2, 3)])
+    '0,1 2,3'
+    """
+    return " ".join("{},{}".format(i, j) for i, j in cells)
+
+
+def parse(line: str):
+    """
+    Décode une ligne du journal.
+    :param line: Ligne du journal.
+    :return: Triplet (opération, position pour un déplacement ou None, cellules inversées).
+
+    >>> parse("m 0,1 2,3"), parse("u 0,1"), parse("g 5")
+    (('m', None, ((0, 1), (2, 3))), ('u', None, ((0, 1),)), ('g', 5, ()))
+    """
+    words = line.split()
+    if not words or words[0] not in ("m", "u", "r", "g"):
+        raise ValueError(line)
+    position = int(words.pop(1)) if words[0] == "g" else None
+    cells = list()
+    for word in words[1:]:
+        i, j = word.split(",")
+        cells.append((int(i), int(j)))
+    return words[0], position, tuple(cells)
+
+
+def header(grid: list, blackened: set):
+    """
+    Construit la première ligne du journal, qui identifie la grille et son état de départ.
+    :param grid: Liste de listes décrivant la grille.
+    :param blackened: Ensemble des cellules noircies au départ.
+    :return: En-tête du journal.
+
+    >>> header([[1, 1]], {(0, 1)}) == "b {} 2".format(grid_key([[1, 1]]))
+    True
+    """
+    return "b {} {}".format(grid_key(grid), encode(blackened, len(grid[0])))
+
+
+class Journal:
+
+    def __init__(self, file_name: str, batch_size: int = BATCH_SIZE, interval: float = FLUSH_INTERVAL):
+        """Crée le journal des coups de la grille contenue dans un fichier."""
+        self.file_name = file_name + ".journal"
+        self.save_name = file_name + ".autosave"
+        self.batch_size = batch_size
+        self.interval = interval
+        self.buffer = list()
+        self.since = None
+        self.count = 0
+        self.header = None
+
+    def restore(self, grid: list, blackened: set, history):
+        """
+        Rétablit l'état de la dernière partie à partir de la sauvegarde automatique et du journal.
+        :param grid: Liste de listes décrivant la grille.
+        :param blackened: Ensemble des cellules noircies de la grille, modifié en place.
+        :param history: Historique des coups, complété par les coups du journal.
+        :return: Nombre d'opérations rejouées.
+
+        >>> from tempfile import TemporaryDirectory
+        >>> from history import History
+        >>> with TemporaryDirectory() as directory:
+        ...     file_name = os.path.join(directory, "grille.hti")
+        ...     journal = Journal(file_name)
+        ...     journal.restore([[1, 1]], set(), History())
+        ...     journal.record(((0, 0),))
+        ...     journal.record(((0, 1),))
+        ...     journal.undo(((0, 1),))
+        ...     journal.flush()
+        ...     blackened, history = set(), History()
+        ...     Journal(file_name).restore([[1, 1]], blackened, history), blackened, history.can_redo()
+        0
+        (3, {(0, 0)}, True)
+
+        Une dernière ligne tronquée est retirée du journal, pour que les coups suivants soient écrits à la ligne :
+
+        >>> with TemporaryDirectory() as directory:
+        ...     file_name = os.path.join(directory, "grille.hti")
+        ...     journal = Journal(file_name)
+        ...     journal.restore([[1, 2, 3]], set(), History())
+        ...     journal.record(((0, 0),))
+        ...     journal.record(((0, 2),))
+        ...     journal.flush()
+        ...     with open(file_name + ".journal", "r+") as file:
+        ...         _ = file.truncate(len(file.read()) - 2)
+        ...     journal = Journal(file_name)
+        ...     journal.restore([[1, 2, 3]], set(), History())
+        ...     journal.record(((0, 1),))
+        ...     journal.flush()
+        ...     blackened = set()
+        ...     Journal(file_name).restore([[1, 2, 3]], blackened, History()), sorted(blackened)
+        0
+        1
+        (2, [(0, 0), (0, 1)])
+
+        Le journal d'une grille remplacée n'est pas rejoué, et une cellule hors de la grille arrête la reprise :
+
+        >>> with TemporaryDirectory() as directory:
+        ...     file_name = os.path.join(directory, "grille.hti")
+        ...     journal = Journal(file_name)
+        ...     journal.restore([[1, 1, 2], [2, 1, 1], [1, 2, 1]], set(), History())
+        ...     journal.record(((2, 2),))
+        ...     journal.flush()
+        ...     blackened = set()
+        ...     Journal(file_name).restore([[1, 2, 1], [2, 1, 1], [1, 1, 2]], blackened, History()), blackened
+        ...     Journal(file_name).restore([[1, 1], [2, 1]], blackened, History()), blackened
+        ...     with open(file_name + ".journal", "w") as file:
+        ...         _ = file.write(header([[1, 1]], set()) + "\\nm 0,1\\nm 5,5\\nm 0,0\\n")
+        ...     Journal(file_name).restore([[1, 1]], blackened, History()), blackened
+        0
+        (0, set())
+        (0, set())
+        (1, {(0, 1)})
+        """
+        # La sauvegarde automatique n'est utilisée que si la grille n'a pas changé depuis.
+        saved = set()
+        try:
+            if read_grid(self.save_name, saved) == grid:
+                blackened.clear()
+                blackened.update(saved)
+        except GridError:
+            pass
+
+        height, width = len(grid), len(grid[0])
+        start = header(grid, blackened)
+        try:
+            with open(self.file_name) as file:
+                lines = file.read().split("\n")
+        except OSError:
+            lines = [""]
+        if lines[0] != start:
+            self.reset(start)
+            return 0
+
+        # Une dernière ligne incomplète, écrite pendant un arrêt brutal, n'est pas terminée par un
+        # retour à la ligne : elle est ignorée, et retirée du journal avant d'y ajouter de nouveaux coups.
+        # L'historique est oublié s'il ne permet plus de rejouer une opération.
+        torn = lines.pop() != ""
+        for number, line in enumerate(lines[1:], 1):
+            try:
+                operation, position, cells = parse(line)
+                if any(not (0 <= i < height and 0 <= j < width) for i, j in cells):
+                    raise ValueError(line)
+            except (ValueError, IndexError):
+                torn, lines = True, lines[:number]
+                break
+            if operation == "m":
+                history.record(cells)
+            elif operation == "u" and tuple(history.undo()) != cells:
+                history.clear()
+            elif operation == "r" and tuple(history.redo()) != cells:
+                history.clear()
+            elif operation == "g" and tuple(history.goto(position)) != cells:
+                history.clear()
+            for cell in cells:
+                blackened.symmetric_difference_update((cell,))
+            self.count += 1
+        if torn:
+            self.rewrite(lines)
+        return self.count
+
+    def rewrite(self, lines: list):
+        """Remplace le journal par les lignes valides, lues lors de la reprise."""
+        temporary = self.file_name + ".tmp"
+        try:
+            with open(temporary, "w") as file:
+                file.write("".join(line + "\n" for line in lines))
+            os.replace(temporary, self.file_name)
+        except OSError:
+            # Le journal sera réécrit entièrement à la prochaine écriture.
+            self.header = lines[0]
+            self.buffer = [line + "\n" for line in lines[1:]]
+            self.since = perf_counter()
+
+    def reset(self, header: str):
+        """
+        Repart d'un journal vide commençant par l'en-tête donné. L'ancien journal n'est remplacé
+        qu'à la prochaine écriture : d'ici là, son en-tête ne correspond plus à l'état de départ.
+        """
+        self.buffer = list()
+        self.since = None
+        self.count = 0
+        self.header = header
+
+    def append(self, line: str):
+        """Ajoute une ligne au lot en attente, et écrit le lot s'il est plein."""
+        if not self.buffer:
+            self.since = perf_counter()
+        self.buffer.append(line + "\n")
+        self.count += 1
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def record(self, cells):
+        """Ajoute un coup au journal."""
+        self.append("m " + format_cells(cells))
+
+    def undo(self, cells):
+        """Ajoute une annulation au journal."""
+        self.append("u " + format_cells(cells))
+
+    def redo(self, cells):
+        """Ajoute un rétablissement au journal."""
+        self.append("r " + format_cells(cells))
+
+    def goto(self, position: int, cells):
+        """Ajoute un déplacement dans l'historique au journal."""
+        self.append("g {} {}".format(position, format_cells(cells)))
+
+    def tick(self):
+        """Écrit le lot en attente s'il attend depuis trop longtemps."""
+        if self.buffer and perf_counter() - self.since >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Écrit le lot en attente à la fin du journal."""
+        if not self.buffer:
+            return
+        try:
+            if self.header is None:
+                with open(self.file_name, "a") as file:
+                    file.write("".join(self.buffer))
+            else:
+                with open(self.file_name, "w") as file:
+                    file.write(self.header + "\n" + "".join(self.buffer))
+        except OSError:
+            return
+        self.buffer = list()
+        self.since = None
+        self.header = None
+
+    def needs_compaction(self):
+        """Indique si le journal est assez long pour être remplacé par une sauvegarde."""
+        return self.count >= COMPACT_SIZE
+
+    def compact(self, grid: list, blackened: set):
+        """
+        Écrit l'état courant dans la sauvegarde automatique et vide le journal.
+        :param grid: Liste de listes décrivant la grille.
+        :param blackened: Ensemble des cellules noircies.
+        """
+        temporary = self.save_name + ".tmp"
+        try:
+            write_grid(grid, blackened, temporary)
+            os.replace(temporary, self.save_name)
+        except OSError:
+            return
+        self.reset(header(grid, blackened))
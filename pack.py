@@ -0,0 +1,301 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from core import GridError, GridNotFoundError, InvalidGridError, grid_files, read_grid, write_grid
+
+PACK_EXTENSION = "htp"
+MAGIC = b"HTPK"
+VERSION = 1
+HEADER = struct.Struct("<4sHI")
+ENTRY = struct.Struct("<QHHBBB")
+SEPARATOR = "#"
+
+
+# INFORMATIONS SUR LES PAQUETS DE GRILLES
+#
+# Un paquet ('.htp') regroupe de nombreuses grilles dans un seul
+# fichier binaire (entiers petit-boutistes) :
+# - un en-tête : signature 'HTPK', version, nombre de grilles ;
+# - un index : pour chaque grille, position de son enregistrement,
+#   hauteur, largeur, longueur du nom, taille d'une cellule en
+#   octets (1, 2 ou 4) et drapeaux (bit 0 : cellules noircies) ;
+# - les enregistrements : nom en UTF-8, valeurs des cellules ligne
+#   par ligne puis, si le drapeau est levé, un bit par cellule
+#   indiquant les cellules noircies.
+#
+# Le fichier est projeté en mémoire : lire la grille n°N ne coûte
+# que la taille de cette grille. Une grille d'un paquet est
+# désignée par 'paquet.htp#N'.
+#
+
+def cell_size(grid: list):
+    """
+    Retourne le nombre d'octets nécessaires pour stocker une valeur de la grille.
+    :param grid: Liste de listes décrivant la grille.
+    :return: 1, 2 ou 4.
+
+    >>> cell_size([[1, 2], [3, 255]]), cell_size([[1, 300]])
+    (1, 2)
+    """
+    largest = max(max(line) for line in grid)
+    return 1 if largest < 1 << 8 else 2 if largest < 1 << 16 else 4
+
+
+def write_pack(file_name: str, levels: list):
+    """
+    Écrit un paquet de grilles dans un fichier temporaire, qui remplace ensuite le paquet d'un seul coup :
+    un paquet déjà projeté en mémoire reste lisible, et un arrêt en cours d'écriture laisse l'ancien paquet intact.
+    :param file_name: Nom du fichier de sortie.
+    :param levels: Liste de triplets (nom, grille, cellules noircies).
+    :return: Nombre de grilles écrites.
+
+    >>> from tempfile import TemporaryDirectory
+    >>> with TemporaryDirectory() as directory:
+    ...     file_name = os.path.join(directory, "paquet.htp")
+    ...     write_pack(file_name, [("a", [[1, 2], [2, 1]], {(0, 0)}), ("b", [[3, 300, 3]], set())])
+    ...     with LevelPack(file_name) as levels:
+    ...         blackened = set()
+    ...         len(levels), levels.name(1), levels.read(1, set()), levels.read(0, blackened), blackened
+    2
+    (2, 'b', [[3, 300, 3]], [[1, 2], [2, 1]], {(0, 0)})
+    >>> with TemporaryDirectory() as directory:
+    ...     file_name = os.path.join(directory, "paquet.htp")
+    ...     write_pack(file_name, [("a", [[1, 2], [2, 1]], set())])
+    ...     with LevelPack(file_name) as levels:
+    ...         write_pack(file_name, [("b", [[3]], set()), ("c", [[4]], set())])
+    ...         levels.name(0), levels.read(0, set()), sorted(os.listdir(directory))
+    1
+    2
+    ('a', [[1, 2], [2, 1]], ['paquet.htp'])
+    """
+    records = list()
+    offset = HEADER.size + ENTRY.size * len(levels)
+    index = list()
+    for name, grid, blackened in levels:
+        height, width = len(grid), len(grid[0])
+        size = cell_size(grid)
+        encoded = name.encode()[:255]
+        record = encoded + b"".join(value.to_bytes(size, "little") for line in grid for value in line)
+        if blackened:
+            mask = sum(1 << (i * width + j) for i, j in blackened)
+            record += mask.to_bytes((height * width + 7) // 8, "little")
+        index.append(ENTRY.pack(offset, height, width, len(encoded), size, 1 if blackened else 0))
+        records.append(record)
+        offset += len(record)
+
+    temporary = file_name + ".tmp"
+    try:
+        with open(temporary, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, len(levels)))
+            file.write(b"".join(index))
+            file.write(b"".join(records))
+        os.replace(temporary, file_name)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return len(levels)
+
+
+class LevelPack:
+
+    def __init__(self, file_name: str):
+        """Ouvre un paquet de grilles et le projette en mémoire."""
+        self.file_name = file_name
+        try:
+            self.file = open(file_name, "rb")
+        except FileNotFoundError:
+            raise GridNotFoundError("Fichier introuvable !") from None
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise InvalidGridError("Le fichier est vide !") from None
+
+        magic, version, self.count = HEADER.unpack_from(self.data) if len(self.data) >= HEADER.size else (b"", 0, 0)
+        if magic != MAGIC or version != VERSION or len(self.data) < HEADER.size + ENTRY.size * self.count:
+            self.close()
+            raise InvalidGridError("Le paquet de grilles est invalide !")
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Ferme le paquet."""
+        self.data.close()
+        self.file.close()
+
+    def entry(self, index: int):
+        """
+        Lit l'entrée de l'index d'une grille.
+        :param index: Numéro de la grille.
+        :return: Tuple (position, hauteur, largeur, longueur du nom, taille d'une cellule, drapeaux).
+        """
+        if not 0 <= index < self.count:
+            raise GridNotFoundError("Grille introuvable !")
+        return ENTRY.unpack_from(self.data, HEADER.size + ENTRY.size * index)
+
+    def name(self, index: int):
+        """
+        Retourne le nom d'une grille.
+        :param index: Numéro de la grille.
+        :return: Nom de la grille.
+        """
+        offset, _, _, length, _, _ = self.entry(index)
+        return self.data[offset:offset + length].decode(errors="replace")
+
+    def size(self, index: int):
+        """
+        Retourne les dimensions d'une grille sans la lire.
+        :param index: Numéro de la grille.
+        :return: Couple (hauteur, largeur).
+        """
+        return self.entry(index)[1:3]
+
+    def read(self, index: int, blackened: set):
+        """
+        Lit une grille du paquet.
+        :param index: Numéro de la grille.
+        :param blackened: Ensemble complété par les cellules noircies.
+        :return: Liste de listes décrivant la grille.
+        """
+        offset, height, width, length, size, flags = self.entry(index)
+        start = offset + length
+        end = start + height * width * size
+        if not height or not width or size not in (1, 2, 4) or end > len(self.data):
+            raise InvalidGridError("Le paquet de grilles est invalide !")
+
+        if size == 1:
+            values = list(self.data[start:end])
+        else:
+            values = array("H" if size == 2 else "I", self.data[start:end])
+            if sys.byteorder == "big":
+                values.byteswap()
+            values = values.tolist()
+        grid = [values[i * width:(i + 1) * width] for i in range(height)]
+
+        if flags & 1:
+            mask = int.from_bytes(self.data[end:end + (height * width + 7) // 8], "little")
+            blackened.update(divmod(cell, width) for cell in range(mask.bit_length()) if mask >> cell & 1)
+        return grid
+
+
+_packs = dict()
+
+
+def open_pack(file_name: str):
+    """
+    Retourne le paquet partagé correspondant à un fichier, ouvert au premier appel et rouvert si le fichier
+    a changé depuis (date de modification ou taille).
+    :param file_name: Nom du fichier du paquet.
+    :return: Instance de LevelPack.
+
+    >>> from tempfile import TemporaryDirectory
+    >>> with TemporaryDirectory() as directory:
+    ...     file_name = os.path.join(directory, "paquet.htp")
+    ...     write_pack(file_name, [("a", [[1, 2], [2, 1]], set())])
+    ...     before = len(open_pack(file_name))
+    ...     write_pack(file_name, [("a", [[1, 2], [2, 1]], set()), ("b", [[1]], set())])
+    ...     after = len(open_pack(file_name))
+    ...     _packs.pop(os.path.abspath(file_name))[1].close()
+    ...     before, after
+    1
+    2
+    (1, 2)
+    """
+    key = os.path.abspath(file_name)
+    try:
+        status = os.stat(key)
+        stamp = status.st_mtime_ns, status.st_size
+    except OSError:
+        stamp = None
+    if key in _packs and _packs[key][0] != stamp:
+        _packs.pop(key)[1].close()
+    if key not in _packs:
+        _packs[key] = stamp, LevelPack(file_name)
+    return _packs[key][1]
+
+
+def pack_files(directory: str = os.curdir):
+    """
+    Retourne la liste triée des paquets de grilles ('.htp') d'un dossier.
+    :param directory: Dossier à parcourir.
+    :return: Liste des noms de fichiers.
+    """
+    return [file for file in sorted(os.listdir(directory)) if file.split(".")[-1] == PACK_EXTENSION]
+
+
+def level_name(file_name: str, index: int):
+    """
+    Construit le nom désignant une grille d'un paquet.
+    :param file_name: Nom du fichier du paquet.
+    :param index: Numéro de la grille.
+    :return: Nom de la grille.
+
+    >>> level_name("paquet.htp", 3)
+    'paquet.htp#3'
+    """
+    return "{}{}{}".format(file_name, SEPARATOR, index)
+
+
+def read_level(name: str, blackened: set):
+    """
+    Lit une grille depuis un fichier '.hti' ou depuis un paquet ('paquet.htp#N').
+    La fonction lève une exception GridError si la grille est introuvable ou mal formée.
+    :param name: Nom du fichier ou de la grille du paquet.
+    :param blackened: Ensemble des cellules noircies.
+    :return: Liste de listes décrivant la grille.
+
+    >>> read_level("grille.hti", set())
+    [[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]]
+    """
+    file_name, separator, index = name.rpartition(SEPARATOR)
+    if not separator or file_name.split(".")[-1] != PACK_EXTENSION:
+        return read_grid(name, blackened)
+    if not index.isdigit():
+        raise GridNotFoundError("Grille introuvable !")
+    return open_pack(file_name).read(int(index), blackened)
+
+
+def pack_directory(directory: str, file_name: str):
+    """
+    Regroupe les grilles '.hti' d'un dossier dans un paquet. Les fichiers invalides sont ignorés.
+    :param directory: Dossier contenant les fichiers '.hti'.
+    :param file_name: Nom du paquet à écrire.
+    :return: Nombre de grilles écrites.
+    """
+    levels = list()
+    for file in grid_files(directory):
+        blackened = set()
+        try:
+            grid = read_grid(os.path.join(directory, file), blackened)
+        except GridError:
+            continue
+        levels.append((file, grid, blackened))
+    return write_pack(file_name, levels)
+
+
+def unpack(file_name: str, directory: str):
+    """
+    Écrit chaque grille d'un paquet dans un fichier '.hti'.
+    :param file_name: Nom du paquet.
+    :param directory: Dossier de sortie.
+    :return: Nombre de grilles écrites.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with LevelPack(file_name) as levels:
+        for index in range(len(levels)):
+            blackened = set()
+            grid = levels.read(index, blackened)
+            name = os.path.basename(levels.name(index)) or "grille-{}.hti".format(index)
+            write_grid(grid, blackened, os.path.join(directory, name))
+        return len(levels)
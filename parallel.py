@@ -0,0 +1,238 @@
+import multiprocessing
+from collections import deque
+from os import cpu_count
+from queue import Empty
+from time import monotonic
+
+from solver import Solver
+
+SPLIT_FACTOR = 4
+POLL_NODES = 64
+POLL_INTERVAL = 0.05
+
+
+# INFORMATIONS SUR LA RÉSOLUTION PARALLÈLE
+#
+# L'arbre de recherche du moteur de résolution (voir solver.py) est
+# découpé en sous-problèmes indépendants : les premiers niveaux sont
+# explorés en largeur, avec les mêmes choix de cellules que solve(),
+# jusqu'à obtenir SPLIT_FACTOR sous-problèmes par processus. Chaque
+# sous-problème est un état partiel de la grille, exploré ensuite en
+# profondeur par l'un des processus.
+#
+# Les sous-problèmes attendent dans une file commune. Un processus
+# dont la file est vide se déclare inactif ; tous les POLL_NODES
+# nœuds, un processus occupé qui voit un processus inactif lui cède
+# la branche la plus proche de la racine de sa pile, qui est aussi
+# la plus grosse (vol de travail).
+#
+# La recherche s'arrête dans tous les processus dès que le nombre
+# de solutions demandé est atteint : une seule pour solve(), la
+# limite pour count() (2 suffisent pour vérifier l'unicité). Seule
+# solve() a besoin des cellules des solutions : pour count(), chaque
+# processus compte les solutions de chaque sous-problème et n'envoie
+# que ce nombre, un compteur partagé servant à respecter la limite.
+#
+
+def search(grid: list, tasks, results, stop, pending, idle, found, limit: int = None, keep: bool = True):
+    """
+    Explore les sous-problèmes de la file commune ; exécutée dans chaque processus.
+    Chaque solution est envoyée dès qu'elle est trouvée, ou seulement comptée, puis le nombre de nœuds explorés
+    est envoyé à la fin.
+    :param grid: Liste de listes décrivant la grille.
+    :param tasks: File des sous-problèmes (état, file des cellules à propager).
+    :param results: File des messages ('solution', cellules), ('count', nombre) et ('nodes', nombre).
+    :param stop: Événement demandant l'arrêt de la recherche.
+    :param pending: Nombre de sous-problèmes en attente ou en cours d'exploration.
+    :param idle: Nombre de processus qui attendent un sous-problème.
+    :param found: Nombre de solutions trouvées par l'ensemble des processus, tenu à jour si une limite est donnée.
+    :param limit: Nombre de solutions au-delà duquel la recherche s'arrête, ou None.
+    :param keep: Booléen indiquant si les cellules des solutions doivent être envoyées.
+    """
+    # Les branches cédées ne sont plus attendues une fois la recherche terminée.
+    tasks.cancel_join_thread()
+    solver = Solver(grid)
+    while not stop.is_set():
+        with idle.get_lock():
+            idle.value += 1
+        task = None
+        while task is None and pending.value and not stop.is_set():
+            try:
+                task = tasks.get(timeout=POLL_INTERVAL)
+            except Empty:
+                pass
+        with idle.get_lock():
+            idle.value -= 1
+        if task is None:
+            break
+
+        stack = [task]
+        count = 0
+        while stack:
+            state = solver.step(stack)
+            if state is not None:
+                count += 1
+                if keep:
+                    results.put(("solution", sorted(solver.to_blackened(state))))
+                elif limit is not None:
+                    with found.get_lock():
+                        found.value += 1
+                        if found.value >= limit:
+                            stop.set()
+            if solver.nodes % POLL_NODES == 0:
+                if stop.is_set():
+                    break
+                if idle.value and len(stack) > 1:
+                    with pending.get_lock():
+                        pending.value += 1
+                    tasks.put(stack.pop(0))
+        if not keep:
+            results.put(("count", count))
+        with pending.get_lock():
+            pending.value -= 1
+    results.put(("nodes", solver.nodes))
+
+
+class ParallelSolver:
+
+    def __init__(self, grid: list, jobs: int = None):
+        """Prépare la résolution d'une grille répartie sur plusieurs processus."""
+        self.grid = grid
+        self.jobs = jobs or cpu_count() or 1
+        self.nodes = 0
+
+    def split(self, solver: Solver, initial: tuple, found: list, limit: int = None):
+        """
+        Explore en largeur les premiers niveaux de l'arbre de recherche.
+        :param solver: Moteur de résolution de la grille.
+        :param initial: Couple (état initial, file des cellules à propager).
+        :param found: Liste complétée par les solutions rencontrées.
+        :param limit: Nombre de solutions au-delà duquel la recherche s'arrête, ou None.
+        :return: Liste des sous-problèmes restant à explorer.
+
+        >>> from generator import generate
+        >>> grid = generate(8, seed=1)[0]
+        >>> solver, found = Solver(grid), list()
+        >>> tasks = ParallelSolver(grid, 2).split(solver, solver.initial_state(), found)
+        >>> len(tasks), len(found)
+        (8, 0)
+        """
+        frontier = deque([initial])
+        while frontier and len(frontier) < self.jobs * SPLIT_FACTOR and (limit is None or len(found) < limit):
+            stack = [frontier.popleft()]
+            state = solver.step(stack)
+            if state is not None:
+                found.append(solver.to_blackened(state))
+            frontier.extend(stack)
+        return list(frontier)
+
+    def search(self, blackened: set = frozenset(), limit: int = None, timeout: float = None, keep: bool = True):
+        """
+        Cherche les solutions en répartissant les sous-problèmes entre les processus.
+        La fonction lève TimeoutError si la recherche dépasse le temps imparti.
+        :param blackened: Ensemble des cellules imposées noires.
+        :param limit: Nombre de solutions au-delà duquel la recherche s'arrête, ou None.
+        :param timeout: Temps maximal de recherche en secondes, ou None.
+        :param keep: Booléen indiquant si les solutions doivent être conservées, ou seulement comptées.
+        :return: Couple (liste des solutions conservées, nombre de solutions trouvées, au plus égal à la limite).
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        solver = Solver(self.grid)
+        initial = solver.initial_state(blackened)
+        found = list()
+        tasks = list() if initial is None else self.split(solver, initial, found, limit)
+        self.nodes = solver.nodes
+        found = found[:limit]
+        count = len(found)
+        if not tasks or (limit is not None and count >= limit):
+            return found, count
+
+        context = multiprocessing.get_context()
+        queue, results, stop = context.Queue(), context.Queue(), context.Event()
+        pending, idle = context.Value("i", len(tasks)), context.Value("i", 0)
+        shared = context.Value("i", count)
+        queue.cancel_join_thread()
+
+        # Les branches noires, explorées en premier par solve(), partent en premier.
+        for task in reversed(tasks):
+            queue.put(task)
+        workers = [context.Process(target=search, args=(self.grid, queue, results, stop, pending, idle, shared, limit,
+                                                        keep), daemon=True)
+                   for _ in range(min(self.jobs, len(tasks)))]
+        for worker in workers:
+            worker.start()
+
+        finished = 0
+        try:
+            while finished < len(workers):
+                if deadline is not None and monotonic() > deadline:
+                    raise TimeoutError("Temps de résolution dépassé")
+                try:
+                    kind, value = results.get(timeout=POLL_INTERVAL)
+                except Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        break
+                    continue
+                if kind == "nodes":
+                    finished += 1
+                    self.nodes += value
+                elif kind == "count":
+                    count += value
+                elif limit is None or count < limit:
+                    found.append(set(map(tuple, value)))
+                    count += 1
+                    if count == limit:
+                        stop.set()
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join(1)
+                if worker.is_alive():
+                    worker.terminate()
+        return found, count if limit is None else min(count, limit)
+
+    def solutions(self, blackened: set = frozenset(), limit: int = None, timeout: float = None):
+        """
+        Cherche les solutions en répartissant les sous-problèmes entre les processus.
+        La fonction lève TimeoutError si la recherche dépasse le temps imparti.
+        :param blackened: Ensemble des cellules imposées noires.
+        :param limit: Nombre de solutions au-delà duquel la recherche s'arrête, ou None.
+        :param timeout: Temps maximal de recherche en secondes, ou None.
+        :return: Liste des solutions trouvées, au plus égale à la limite, dans un ordre quelconque.
+        """
+        return self.search(blackened, limit, timeout)[0]
+
+    def solve(self, blackened: set = frozenset(), timeout: float = None):
+        """
+        Résout la grille et renvoie la première solution trouvée par l'un des processus.
+        La fonction lève TimeoutError si la recherche dépasse le temps imparti.
+        :param blackened: Ensemble des cellules imposées noires.
+        :param timeout: Temps maximal de recherche en secondes, ou None.
+        :return: Ensemble des cellules à noircir ou None si aucune solution n'existe.
+
+        >>> grid = [[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]]
+        >>> sorted(ParallelSolver(grid, 2).solve())
+        [(0, 0), (0, 2), (1, 4), (2, 0), (2, 2), (3, 1), (3, 3)]
+        >>> ParallelSolver([[1, 1], [1, 1]], 2).solve() is None
+        True
+        """
+        found = self.solutions(blackened, 1, timeout)
+        return found[0] if found else None
+
+    def count(self, blackened: set = frozenset(), limit: int = None, timeout: float = None):
+        """
+        Compte les solutions de la grille en arrêtant tous les processus dès que la limite est atteinte.
+        Les processus n'envoient que le nombre de solutions de chaque sous-problème, jamais leurs cellules.
+        :param blackened: Ensemble des cellules imposées noires.
+        :param limit: Nombre de solutions au-delà duquel la recherche s'arrête, ou None.
+        :param timeout: Temps maximal de recherche en secondes, ou None.
+        :return: Nombre de solutions trouvées, au plus égal à la limite.
+
+        >>> from generator import generate
+        >>> grid = generate(8, seed=1)[0]
+        >>> ParallelSolver(grid, 2).count() == Solver(grid).count()
+        True
+        >>> ParallelSolver(grid, 2).count(limit=2)
+        2
+        """
+        return self.search(blackened, limit, timeout, keep=False)[1]
@@ -0,0 +1,536 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from random import Random
+from time import perf_counter
+
+from cache import cache_for
+from core import GridError
+from hints import HintEngine
+from index import index_for
+from pack import read_level
+from solver import Solver
+from validator import RuleState
+from worker import SOLVE_BUDGET
+
+try:
+    import vectorized
+except ImportError:
+    vectorized = None
+
+BATCH_SIZE = 64
+VECTOR_BATCH = 16
+LATENCY_WINDOW = 10000
+REPORT_INTERVAL = 10.0
+
+
+# INFORMATIONS SUR LE SERVICE DE VALIDATION
+#
+# Le service répond à des requêtes JSON, une par ligne, sur TCP ou
+# sur une socket Unix :
+#
+#   python -m hitori serve DOSSIER --port 8765
+#   python -m hitori serve DOSSIER --socket /tmp/hitori.sock
+#
+# Chaque requête porte un identifiant, renvoyé avec la réponse, et
+# une opération :
+#
+#   {"id": 1, "op": "validate", "level": "niveau1.hti", "blackened": [[0, 1]]}
+#   {"id": 2, "op": "hint", "level": "niveaux.htp#3", "blackened": []}
+#   {"id": 3, "op": "solve", "level": "niveau1.hti"}
+#   {"id": 4, "op": "levels"}
+#   {"id": 5, "op": "stats"}
+#
+# Les réponses d'une connexion peuvent arriver dans un autre ordre
+# que les requêtes : une résolution ne retarde pas les validations.
+#
+# Les grilles sont lues une seule fois puis gardées en mémoire. Les
+# requêtes en attente sont traitées par lots d'au plus BATCH_SIZE,
+# regroupées par grille : les validations d'un même lot sont faites
+# ensemble, avec NumPy lorsqu'il est installé (voir vectorized.py).
+# Les résolutions sont confiées à des processus séparés et ne
+# bloquent jamais la boucle d'événements ; la solution d'une grille
+# n'est calculée qu'une fois et sert ensuite aux indices.
+#
+# Toute requête reçoit une réponse : une erreur inattendue (processus
+# de résolution tué, mémoire épuisée...) est renvoyée au client sous
+# la forme {"error": "Erreur interne : ..."} et écrite sur la sortie
+# d'erreur. Si le groupe de processus de résolution est cassé, il est
+# remplacé pour les requêtes suivantes.
+#
+# Le service s'arrête sur Ctrl+C ou sur le signal SIGTERM, après avoir
+# écrit dans le cache les solutions calculées depuis le dernier
+# rapport.
+#
+# L'opération 'stats' renvoie les centiles de latence des dernières
+# requêtes et le nombre de requêtes en attente, aussi écrits sur la
+# sortie d'erreur toutes les REPORT_INTERVAL secondes.
+#
+# Un générateur de charge permet de mesurer le service :
+#
+#   python -m hitori load --port 8765 --connections 8 --requests 1000
+#
+
+def percentiles(samples, ranks: tuple = (50, 90, 99)):
+    """
+    Calcule des centiles d'une série de mesures.
+    :param samples: Série de mesures.
+    :param ranks: Centiles demandés.
+    :return: Dictionnaire associant à chaque centile ('p50'...) la mesure correspondante, ou None si la série est vide.
+
+    >>> percentiles(range(1, 101))
+    {'p50': 50, 'p90': 90, 'p99': 99}
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p{}".format(rank): None for rank in ranks}
+    return {"p{}".format(rank): ordered[max(0, (len(ordered) * rank + 99) // 100 - 1)] for rank in ranks}
+
+
+def solve_level(grid: list, timeout: float = None):
+    """
+    Résout une grille ; exécutée dans un processus séparé.
+    :param grid: Liste de listes décrivant la grille.
+    :param timeout: Temps maximal de résolution en secondes, ou None.
+    :return: Dictionnaire décrivant le résultat.
+
+    >>> solve_level([[1, 1], [1, 1]])["status"]
+    'unsolvable'
+    """
+    solver = Solver(grid)
+    start = perf_counter()
+    try:
+        solution = solver.solve(timeout=timeout)
+    except TimeoutError:
+        return {"status": "timeout", "solution": None, "nodes": solver.nodes, "time": perf_counter() - start}
+    return {"status": "unsolvable" if solution is None else "solved",
+            "solution": None if solution is None else sorted([i, j] for i, j in solution),
+            "nodes": solver.nodes, "time": perf_counter() - start}
+
+
+def validate_boards(grid: list, boards: list):
+    """
+    Vérifie les règles pour plusieurs ensembles de cellules noircies d'une même grille.
+    :param grid: Liste de listes décrivant la grille.
+    :param boards: Liste d'ensembles de cellules noircies.
+    :return: Liste de dictionnaires des règles respectées.
+
+    >>> validate_boards([[1, 1], [2, 3]], [{(0, 0)}, set()])
+    [{'conflict': False, 'adjacent': False, 'related': True, 'won': True}, \
+{'conflict': True, 'adjacent': False, 'related': True, 'won': False}]
+    """
+    if vectorized is not None and len(boards) >= VECTOR_BATCH:
+        masks = vectorized.to_masks(grid, boards)
+        rules = zip(vectorized.without_conflict(grid, masks).tolist(), vectorized.without_adjacent(masks).tolist(),
+                    vectorized.related(masks).tolist())
+    else:
+        states = [RuleState(grid, set(board)) for board in boards]
+        rules = [(state.without_conflict(), state.without_adjacent(), state.related()) for state in states]
+    return [{"conflict": not conflict_free, "adjacent": not adjacent_free, "related": related,
+             "won": conflict_free and adjacent_free and related}
+            for conflict_free, adjacent_free, related in rules]
+
+
+def read_board(grid: list, cells):
+    """
+    Lit les cellules noircies d'une requête.
+    La fonction lève une exception ValueError si une cellule est hors de la grille.
+    :param grid: Liste de listes décrivant la grille.
+    :param cells: Liste de couples [ligne, colonne].
+    :return: Ensemble des cellules noircies.
+
+    >>> sorted(read_board([[1, 1], [2, 3]], [[0, 1], [1, 0]]))
+    [(0, 1), (1, 0)]
+    >>> read_board([[1, 1], [2, 3]], [[2, 0]])
+    Traceback (most recent call last):
+    ...
+    ValueError: Cellule hors de la grille
+    """
+    try:
+        board = {(int(i), int(j)) for i, j in cells}
+    except (TypeError, ValueError):
+        raise ValueError("Requête invalide")
+    if any(not (0 <= i < len(grid) and 0 <= j < len(grid[0])) for i, j in board):
+        raise ValueError("Cellule hors de la grille")
+    return board
+
+
+class Level:
+
+    def __init__(self, grid: list):
+        """Conserve une grille chargée par le service, avec sa solution et son moteur d'indices."""
+        self.grid = grid
+        self.solving = None
+        self.result = None
+        self.hints = None
+
+
+class ValidationServer:
+
+    def __init__(self, directory: str, jobs: int = None, timeout: float = SOLVE_BUDGET):
+        """Prépare le service pour les grilles d'un dossier."""
+        self.directory = directory
+        self.jobs = jobs
+        self.timeout = timeout
+        self.levels = dict()
+        self.queue = None
+        self.executor = None
+        self.stopping = None
+        self.solving = 0
+        self.requests = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def level(self, name: str):
+        """
+        Retourne une grille du dossier, lue lors de sa première demande.
+        La fonction lève une exception GridError si la grille est inconnue ou mal formée.
+        :param name: Nom de la grille ('niveau.hti' ou 'paquet.htp#N').
+        :return: Instance de Level.
+        """
+        if name not in self.levels:
+            index = index_for(self.directory)
+            index.refresh()
+            if name not in index.names:
+                raise GridError("Grille introuvable !")
+            self.levels[name] = Level(read_level(os.path.join(self.directory, name), set()))
+        return self.levels[name]
+
+    async def solution(self, level: Level):
+        """
+        Retourne le résultat de la résolution d'une grille, calculé une seule fois dans un processus séparé.
+        Un dépassement du temps imparti est aussi conservé : la grille n'est pas résolue une seconde fois.
+        :param level: Grille chargée.
+        :return: Dictionnaire décrivant le résultat.
+        """
+        if level.result is not None:
+            return level.result
+        cache = cache_for(self.directory)
+        found, solution = cache.get(level.grid)
+        if found:
+            level.result = {"status": "unsolvable" if solution is None else "solved", "cached": True,
+                            "solution": None if solution is None else sorted([i, j] for i, j in solution)}
+            return level.result
+
+        # Les demandes simultanées pour une même grille attendent la même résolution.
+        if level.solving is None:
+            self.solving += 1
+            loop = asyncio.get_running_loop()
+            executor = self.executor
+            try:
+                level.solving = loop.run_in_executor(executor, solve_level, level.grid, self.timeout)
+                result = await level.solving
+            except BrokenProcessPool:
+                # Un processus de résolution a été tué : les résolutions suivantes utilisent un nouveau groupe.
+                if self.executor is executor:
+                    self.executor = ProcessPoolExecutor(max_workers=self.jobs)
+                    executor.shutdown(wait=False)
+                raise
+            finally:
+                self.solving -= 1
+                level.solving = None
+            level.result = result
+            if result["status"] != "timeout":
+                cache.put(level.grid, None if result["solution"] is None else set(map(tuple, result["solution"])))
+            return result
+        return await asyncio.shield(level.solving)
+
+    async def hint(self, level: Level, blackened: set):
+        """
+        Retourne un indice, tiré des règles lorsqu'elles suffisent. Sinon, la solution est attendue d'un processus
+        séparé : le moteur d'indices ne résout jamais la grille dans la boucle d'événements.
+        :param level: Grille chargée.
+        :param blackened: Ensemble des cellules noircies.
+        :return: Dictionnaire décrivant l'indice.
+        """
+        if level.hints is None:
+            level.hints = HintEngine(level.grid)
+        found, needs_solution = level.hints.deduction(blackened)
+        if needs_solution:
+            if not level.hints.solved:
+                result = await self.solution(level)
+                if not level.hints.solved:
+                    level.hints.set_solution(None if result["solution"] is None
+                                             else set(map(tuple, result["solution"])))
+            found = level.hints.hint(blackened)
+        if found is None:
+            return {"hint": None}
+        cell, black, reason = found
+        return {"hint": {"cell": list(cell), "black": black, "reason": reason}}
+
+    def stats(self):
+        """
+        Retourne l'état du service.
+        :return: Dictionnaire (requêtes traitées, requêtes en attente, résolutions en cours, centiles en ms).
+        """
+        stats = {"requests": self.requests, "queue": self.queue.qsize() if self.queue else 0, "solving": self.solving,
+                 "levels": len(self.levels)}
+        stats.update({rank: None if value is None else round(value * 1e3, 3)
+                      for rank, value in percentiles(self.latencies).items()})
+        return stats
+
+    def respond(self, writer, request: dict, response: dict, start: float):
+        """Écrit la réponse à une requête et enregistre sa latence."""
+        response["id"] = request.get("id")
+        writer.write((json.dumps(response) + "\n").encode())
+        self.requests += 1
+        self.latencies.append(perf_counter() - start)
+
+    def failure(self, error: Exception):
+        """
+        Décrit une erreur inattendue pour le client, et l'écrit sur la sortie d'erreur.
+        :param error: Exception levée pendant le traitement d'une requête.
+        :return: Dictionnaire de la réponse.
+        """
+        print("Erreur interne :", repr(error), file=sys.stderr)
+        return {"error": "Erreur interne : {}".format(type(error).__name__)}
+
+    async def answer(self, writer, request: dict, start: float, coroutine):
+        """
+        Répond à une requête dont le résultat doit être attendu (résolution ou indice), même en cas d'erreur.
+
+        >>> class Writer(list):
+        ...     def write(self, data):
+        ...         self.append(json.loads(data))
+        >>> async def failing():
+        ...     raise MemoryError()
+        >>> from contextlib import redirect_stderr
+        >>> from io import StringIO
+        >>> writer = Writer()
+        >>> with redirect_stderr(StringIO()):
+        ...     asyncio.run(ValidationServer(".").answer(writer, {"id": 7}, perf_counter(), failing()))
+        >>> writer
+        [{'error': 'Erreur interne : MemoryError', 'id': 7}]
+        """
+        try:
+            response = await coroutine
+        except GridError as error:
+            response = {"error": str(error)}
+        except Exception as error:
+            response = self.failure(error)
+        self.respond(writer, request, response, start)
+
+    async def handle(self, reader, writer):
+        """Lit les requêtes d'une connexion et les place dans la file d'attente."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = perf_counter()
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError(line)
+                except ValueError:
+                    self.respond(writer, dict(), {"error": "Requête invalide"}, start)
+                    continue
+                await self.queue.put((writer, request, start))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def process(self):
+        """Traite les requêtes en attente par lots, regroupées par grille."""
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < BATCH_SIZE and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            validations = dict()
+            for writer, request, start in batch:
+                op = request.get("op")
+                try:
+                    if op == "levels":
+                        index = index_for(self.directory)
+                        index.refresh()
+                        self.respond(writer, request, {"levels": index.names}, start)
+                    elif op == "stats":
+                        self.respond(writer, request, self.stats(), start)
+                    elif op == "validate":
+                        level = self.level(request.get("level"))
+                        board = read_board(level.grid, request.get("blackened", ()))
+                        validations.setdefault(id(level), (level, list()))[1].append((writer, request, start, board))
+                    elif op == "hint":
+                        level = self.level(request.get("level"))
+                        board = read_board(level.grid, request.get("blackened", ()))
+                        asyncio.ensure_future(self.answer(writer, request, start, self.hint(level, board)))
+                    elif op == "solve":
+                        asyncio.ensure_future(self.answer(writer, request, start,
+                                                          self.solution(self.level(request.get("level")))))
+                    else:
+                        self.respond(writer, request, {"error": "Opération inconnue"}, start)
+                except (GridError, ValueError) as error:
+                    self.respond(writer, request, {"error": str(error)}, start)
+                except TypeError:
+                    self.respond(writer, request, {"error": "Requête invalide"}, start)
+                except Exception as error:
+                    self.respond(writer, request, self.failure(error), start)
+
+            for level, waiting in validations.values():
+                try:
+                    results = validate_boards(level.grid, [board for _, _, _, board in waiting])
+                except Exception as error:
+                    results = [self.failure(error)] * len(waiting)
+                for (writer, request, start, _), result in zip(waiting, results):
+                    self.respond(writer, request, dict(result), start)
+
+    async def report(self):
+        """Écrit régulièrement l'état du service sur la sortie d'erreur, et les solutions calculées dans le cache."""
+        reported = 0
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL)
+            if self.requests != reported:
+                reported = self.requests
+                print(json.dumps(self.stats()), file=sys.stderr)
+                cache_for(self.directory).flush()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, socket: str = None):
+        """
+        Lance le service jusqu'à son interruption (Ctrl+C ou signal SIGTERM), puis écrit le cache des solutions.
+        :param host: Adresse d'écoute TCP.
+        :param port: Port d'écoute TCP.
+        :param socket: Chemin d'une socket Unix, utilisée à la place de TCP si elle est donnée.
+
+        >>> from contextlib import redirect_stderr
+        >>> from io import StringIO
+        >>> from tempfile import TemporaryDirectory
+        >>> async def terminate(server):
+        ...     asyncio.get_running_loop().call_later(0.5, os.kill, os.getpid(), signal.SIGTERM)
+        ...     await server.serve(port=0)
+        >>> with TemporaryDirectory() as directory:
+        ...     cache_for(directory).put([[1, 2], [2, 1]], set())
+        ...     with redirect_stderr(StringIO()):
+        ...         asyncio.run(terminate(ValidationServer(directory)))
+        ...     os.path.exists(os.path.join(directory, ".hitori-cache.json"))
+        True
+        """
+        self.queue = asyncio.Queue()
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs)
+        self.stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGTERM, self.stopping.set)
+        except NotImplementedError:
+            # Pas de gestionnaire de signaux dans la boucle d'événements (Windows).
+            pass
+        if socket is not None:
+            server = await asyncio.start_unix_server(self.handle, socket)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        tasks = [asyncio.ensure_future(self.process()), asyncio.ensure_future(self.report())]
+        print("Service à l'écoute sur", socket or "{}:{}".format(host, port), file=sys.stderr)
+        try:
+            async with server:
+                await self.stopping.wait()
+        finally:
+            # Le cache est écrit avant d'attendre la fin des résolutions en cours.
+            cache_for(self.directory).flush()
+            for task in tasks:
+                task.cancel()
+            try:
+                loop.remove_signal_handler(signal.SIGTERM)
+            except NotImplementedError:
+                pass
+            self.executor.shutdown(cancel_futures=True)
+
+
+def random_board(grid: list, rng: Random):
+    """
+    Tire des cellules noircies au hasard, sans voisines, comme le ferait un joueur en cours de partie.
+    :param grid: Liste de listes décrivant la grille.
+    :param rng: Générateur aléatoire.
+    :return: Liste des cellules noircies.
+
+    >>> board = random_board([[1, 2], [3, 4]], Random(0))
+    >>> all(0 <= i < 2 and 0 <= j < 2 for i, j in board)
+    True
+    """
+    board = set()
+    for i in range(len(grid)):
+        for j in range(len(grid[0])):
+            if rng.random() < 0.2 and not {(i - 1, j), (i, j - 1)} & board:
+                board.add((i, j))
+    return sorted([i, j] for i, j in board)
+
+
+async def load(host: str = "127.0.0.1", port: int = 8765, socket: str = None, connections: int = 8,
+               requests: int = 1000, directory: str = None, seed: int = 0):
+    """
+    Génère une charge sur le service et mesure ses temps de réponse.
+    Les requêtes sont des validations, avec un indice toutes les 10 requêtes et une résolution toutes les 100.
+    :param host: Adresse TCP du service.
+    :param port: Port TCP du service.
+    :param socket: Chemin de la socket Unix du service, utilisée à la place de TCP si elle est donnée.
+    :param connections: Nombre de connexions simultanées.
+    :param requests: Nombre de requêtes par connexion.
+    :param directory: Dossier des grilles, lu localement pour construire les requêtes, ou None pour les demander.
+    :param seed: Graine des requêtes.
+    :return: Dictionnaire des mesures côté client et de l'état du service.
+    """
+    async def connect():
+        if socket is not None:
+            return await asyncio.open_unix_connection(socket, limit=2 ** 24)
+        return await asyncio.open_connection(host, port, limit=2 ** 24)
+
+    async def call(reader, writer, request):
+        writer.write((json.dumps(request) + "\n").encode())
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    reader, writer = await connect()
+    names = (await call(reader, writer, {"id": 0, "op": "levels"}))["levels"]
+    grids = dict()
+    if directory is not None:
+        for name in names:
+            try:
+                grids[name] = read_level(os.path.join(directory, name), set())
+            except GridError:
+                continue
+        names = list(grids)
+    if not names:
+        raise GridError("Aucune grille disponible")
+
+    latencies, errors = list(), 0
+
+    async def run(number: int):
+        nonlocal errors
+        rng = Random(seed * connections + number)
+        connection_reader, connection_writer = await connect()
+        sent = dict()
+
+        async def receive():
+            nonlocal errors
+            for _ in range(requests):
+                response = json.loads(await connection_reader.readline())
+                latencies.append(perf_counter() - sent.pop(response["id"]))
+                errors += "error" in response
+
+        receiver = asyncio.ensure_future(receive())
+        for identifier in range(requests):
+            name = rng.choice(names)
+            grid = grids.get(name, [[0]])
+            op = "solve" if identifier % 100 == 99 else "hint" if identifier % 10 == 9 else "validate"
+            request = {"id": identifier, "op": op, "level": name, "blackened": random_board(grid, rng)}
+            sent[identifier] = perf_counter()
+            connection_writer.write((json.dumps(request) + "\n").encode())
+            await connection_writer.drain()
+        await receiver
+        connection_writer.close()
+
+    start = perf_counter()
+    await asyncio.gather(*(run(number) for number in range(connections)))
+    elapsed = perf_counter() - start
+    stats = await call(reader, writer, {"id": 1, "op": "stats"})
+    writer.close()
+
+    result = {"requests": len(latencies), "errors": errors, "time": elapsed, "rate": len(latencies) / elapsed}
+    result.update({rank: round(value * 1e3, 3) for rank, value in percentiles(latencies).items()})
+    result["server"] = stats
+    return result
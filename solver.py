@@ -0,0 +1,258 @@
+from time import monotonic
+
+from connectivity import Connectivity
+
+UNKNOWN = 0
+WHITE = 1
+BLACK = 2
+
+
+# INFORMATIONS SUR LE MOTEUR DE RÉSOLUTION
+#
+# La grille est représentée à plat : la cellule (i, j) a pour
+# indice i * largeur + j. L'état de chaque cellule (inconnue,
+# blanche ou noire) est stocké dans un bytearray, ce qui rend
+# la copie d'un état peu coûteuse lors des embranchements.
+#
+# Les déductions appliquées sont les suivantes :
+# - une cellule sans doublon sur sa ligne et sa colonne est blanche ;
+# - les voisines d'une cellule noire sont blanches ;
+# - les doublons d'une cellule blanche sont noirs ;
+# - motif « sandwich » (a b a) : la cellule centrale est blanche ;
+# - motif « paire » (a a) : les autres a de la ligne sont noirs ;
+# - une cellule dont le noircissement couperait la zone blanche
+#   (point d'articulation) est blanche.
+#
+# Le moteur ne fait un choix que lorsque la propagation n'avance plus.
+#
+
+class Solver:
+
+    def __init__(self, grid: list):
+        """Prépare les structures de résolution associées à la grille."""
+        self.height = len(grid)
+        self.width = len(grid[0])
+        self.values = [value for line in grid for value in line]
+        self.nodes = 0
+        self.decided = 0
+        self.cancelled = False
+
+        self.connectivity = Connectivity(self.height, self.width)
+        self.neighbours = self.connectivity.neighbours
+        self.duplicates = [list() for _ in range(self.height * self.width)]
+
+        # Calcul des doublons de chaque cellule sur sa ligne et sa colonne.
+        for line in self.lines():
+            for a, first in enumerate(line):
+                for second in line[a + 1:]:
+                    if self.values[first] == self.values[second]:
+                        self.duplicates[first].append(second)
+                        self.duplicates[second].append(first)
+
+    def lines(self):
+        """
+        Retourne les indices des cellules de chaque ligne puis de chaque colonne.
+        :return: Liste de listes d'indices.
+
+        >>> Solver([[1, 2], [3, 4]]).lines()
+        [[0, 1], [2, 3], [0, 2], [1, 3]]
+        """
+        rows = [list(range(i * self.width, (i + 1) * self.width)) for i in range(self.height)]
+        columns = [list(range(j, self.height * self.width, self.width)) for j in range(self.width)]
+        return rows + columns
+
+    def initial_state(self, blackened: set = frozenset()):
+        """
+        Construit l'état initial en appliquant les motifs de départ.
+        :param blackened: Ensemble des cellules imposées noires.
+        :return: Couple (état, file des cellules à propager), ou None en cas de contradiction.
+        """
+        state = bytearray(self.height * self.width)
+        queue = list()
+
+        for i, j in blackened:
+            if not self.assign(state, i * self.width + j, BLACK, queue):
+                return None
+
+        for cell in range(len(state)):
+            # Une cellule sans doublon n'a pas besoin d'être noircie.
+            if not self.duplicates[cell] and not self.assign(state, cell, WHITE, queue):
+                return None
+
+        for line in self.lines():
+            for a in range(len(line) - 1):
+                first, second = line[a], line[a + 1]
+
+                # Motif « sandwich » : a b a.
+                if a + 2 < len(line) and self.values[first] == self.values[line[a + 2]]:
+                    if not self.assign(state, second, WHITE, queue):
+                        return None
+
+                # Motif « paire » : a a, les autres a de la ligne sont noirs.
+                if self.values[first] == self.values[second]:
+                    for other in line:
+                        if other not in (first, second) and self.values[other] == self.values[first]:
+                            if not self.assign(state, other, BLACK, queue):
+                                return None
+
+        return state, queue
+
+    @staticmethod
+    def assign(state: bytearray, cell: int, color: int, queue: list):
+        """
+        Affecte une couleur à une cellule et l'ajoute à la file de propagation.
+        :param state: État de la grille.
+        :param cell: Indice de la cellule.
+        :param color: Couleur à affecter.
+        :param queue: File des cellules à propager.
+        :return: Booléen indiquant l'absence de contradiction.
+        """
+        if state[cell] == color:
+            return True
+        if state[cell] != UNKNOWN:
+            return False
+        state[cell] = color
+        queue.append(cell)
+        return True
+
+    def propagate(self, state: bytearray, queue: list):
+        """
+        Applique les déductions jusqu'à ce que l'état n'évolue plus.
+        :param state: État de la grille, modifié en place.
+        :param queue: File des cellules à propager.
+        :return: Booléen indiquant l'absence de contradiction.
+        """
+        while True:
+            while queue:
+                cell = queue.pop()
+                if state[cell] == BLACK:
+                    for neighbour in self.neighbours[cell]:
+                        if not self.assign(state, neighbour, WHITE, queue):
+                            return False
+                else:
+                    for duplicate in self.duplicates[cell]:
+                        if not self.assign(state, duplicate, BLACK, queue):
+                            return False
+
+            # Les points d'articulation inconnus doivent rester blancs.
+            cuts = self.connectivity.articulations(state, BLACK)
+            if cuts is None:
+                return False
+            cuts = [cell for cell in cuts if state[cell] == UNKNOWN]
+            if not cuts:
+                return True
+            for cell in cuts:
+                self.assign(state, cell, WHITE, queue)
+
+    def choose(self, state: bytearray):
+        """
+        Choisit la cellule inconnue sur laquelle faire un embranchement.
+        :param state: État de la grille.
+        :return: Indice de la cellule la plus contrainte, ou None si l'état est complet.
+        """
+        best, best_score = None, -1
+        for cell, color in enumerate(state):
+            if color == UNKNOWN:
+                score = sum(state[duplicate] == UNKNOWN for duplicate in self.duplicates[cell])
+                if score > best_score:
+                    best, best_score = cell, score
+        return best
+
+    def to_blackened(self, state: bytearray):
+        """
+        Convertit un état en ensemble de cellules noircies.
+        :param state: État de la grille.
+        :return: Ensemble des cellules noircies.
+        """
+        return {divmod(cell, self.width) for cell, color in enumerate(state) if color == BLACK}
+
+    def solutions(self, blackened: set = frozenset(), timeout: float = None):
+        """
+        Énumère les solutions en ne faisant des choix que lorsque la propagation n'avance plus.
+        La fonction lève TimeoutError si la recherche dépasse le temps imparti,
+        et InterruptedError si elle est annulée par cancel() depuis un autre fil d'exécution.
+        :param blackened: Ensemble des cellules imposées noires.
+        :param timeout: Temps maximal de recherche en secondes, ou None.
+        :return: Générateur des ensembles de cellules à noircir.
+        """
+        self.nodes = 0
+        self.decided = 0
+        deadline = None if timeout is None else monotonic() + timeout
+        initial = self.initial_state(blackened)
+        if initial is None:
+            return
+
+        # Parcours en profondeur explicite pour ne pas dépendre de la pile d'appels.
+        stack = [initial]
+        while stack:
+            if deadline is not None and monotonic() > deadline:
+                raise TimeoutError("Temps de résolution dépassé")
+            if self.cancelled:
+                raise InterruptedError("Résolution annulée")
+            state = self.step(stack)
+            if state is not None:
+                yield self.to_blackened(state)
+
+    def step(self, stack: list):
+        """
+        Explore le nœud au sommet de la pile : propagation, puis embranchement sur la cellule choisie.
+        Les deux branches sont empilées, la branche noire au sommet.
+        :param stack: Pile des couples (état, file des cellules à propager), modifiée en place.
+        :return: État complet si le nœud est une solution, None sinon.
+        """
+        state, queue = stack.pop()
+        self.nodes += 1
+        if not self.propagate(state, queue):
+            return None
+        self.decided = len(state) - state.count(UNKNOWN)
+
+        cell = self.choose(state)
+        if cell is None:
+            return state
+
+        white = bytearray(state)
+        white[cell] = WHITE
+        stack.append((white, [cell]))
+        state[cell] = BLACK
+        stack.append((state, [cell]))
+        return None
+
+    def cancel(self):
+        """Demande l'arrêt de la recherche en cours."""
+        self.cancelled = True
+
+    def solve(self, blackened: set = frozenset(), timeout: float = None):
+        """
+        Résout la grille et renvoie la première solution trouvée.
+        La fonction lève TimeoutError si la recherche dépasse le temps imparti.
+        :param blackened: Ensemble des cellules imposées noires.
+        :param timeout: Temps maximal de recherche en secondes, ou None.
+        :return: Ensemble des cellules à noircir ou None si aucune solution n'existe.
+
+        >>> grid = [[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]]
+        >>> sorted(Solver(grid).solve())
+        [(0, 0), (0, 2), (1, 4), (2, 0), (2, 2), (3, 1), (3, 3)]
+        >>> Solver([[1, 1], [1, 1]]).solve() is None
+        True
+        """
+        return next(self.solutions(blackened, timeout), None)
+
+    def count(self, blackened: set = frozenset(), limit: int = None, timeout: float = None):
+        """
+        Compte les solutions de la grille en s'arrêtant dès que la limite est atteinte.
+        :param blackened: Ensemble des cellules imposées noires.
+        :param limit: Nombre de solutions au-delà duquel la recherche s'arrête, ou None.
+        :param timeout: Temps maximal de recherche en secondes, ou None.
+        :return: Nombre de solutions trouvées, au plus égal à la limite.
+
+        >>> Solver([[1, 1], [2, 3]]).count()
+        2
+        >>> Solver([[1, 1, 2], [2, 3, 1], [3, 2, 3]]).count(limit=1)
+        1
+        """
+        count = 0
+        for _ in self.solutions(blackened, timeout):
+            count += 1
+            if count == limit:
+                break
+        return count
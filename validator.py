@@ -0,0 +1,324 @@
+from connectivity import engine
+
+
+class RuleState:
+
+    def __init__(self, grid: list, blackened: set):
+        """
+        Construit l'état des règles à partir de la grille et des cellules noircies.
+        L'ensemble des cellules noircies est partagé et mis à jour par toggle().
+        """
+        self.grid = grid
+        self.blackened = blackened
+        self.height = len(grid)
+        self.width = len(grid[0])
+        self.black = bytearray(self.height * self.width)
+        self.connectivity = engine(self.height, self.width)
+        self.whites = self.height * self.width
+
+        # Nombre d'occurrences de chaque valeur non noircie par ligne et par colonne.
+        self.row_counts = [dict() for _ in range(self.height)]
+        self.column_counts = [dict() for _ in range(self.width)]
+        self.conflicts = 0
+        self.adjacent = 0
+
+        for i, line in enumerate(grid):
+            for j, value in enumerate(line):
+                self._add_white(i, j, value)
+
+        for i, j in blackened:
+            self._blacken(i, j)
+
+        # Connexité calculée paresseusement. Le diagnostic n'est construit qu'à la première demande,
+        # puis tenu à jour par toggle().
+        self._related = None
+        self.row_positions = None
+        self.column_positions = None
+        self.duplicates = None
+        self.pairs = None
+        self.isolated = None
+
+    def _add_white(self, i: int, j: int, value: int):
+        """Compte une occurrence blanche de la valeur sur sa ligne et sa colonne."""
+        for counts in (self.row_counts[i], self.column_counts[j]):
+            count = counts.get(value, 0)
+            if count:
+                self.conflicts += 1
+            counts[value] = count + 1
+
+    def _remove_white(self, i: int, j: int, value: int):
+        """Retire une occurrence blanche de la valeur sur sa ligne et sa colonne."""
+        for counts in (self.row_counts[i], self.column_counts[j]):
+            count = counts[value]
+            if count > 1:
+                self.conflicts -= 1
+            counts[value] = count - 1
+
+    def _black_neighbours(self, i: int, j: int):
+        """Compte les voisines noircies d'une cellule."""
+        cell = i * self.width + j
+        count = 0
+        if i > 0:
+            count += self.black[cell - self.width]
+        if i < self.height - 1:
+            count += self.black[cell + self.width]
+        if j > 0:
+            count += self.black[cell - 1]
+        if j < self.width - 1:
+            count += self.black[cell + 1]
+        return count
+
+    def _blacken(self, i: int, j: int):
+        """Noircit une cellule et met à jour les compteurs."""
+        self._remove_white(i, j, self.grid[i][j])
+        self.adjacent += self._black_neighbours(i, j)
+        self.black[i * self.width + j] = 1
+        self.whites -= 1
+
+    def _whiten(self, i: int, j: int):
+        """Blanchit une cellule et met à jour les compteurs."""
+        self.black[i * self.width + j] = 0
+        self.whites += 1
+        self.adjacent -= self._black_neighbours(i, j)
+        self._add_white(i, j, self.grid[i][j])
+
+    def toggle(self, cell: tuple):
+        """
+        Inverse l'état d'une cellule et met à jour les règles en temps quasi constant.
+        :param cell: Coordonnées de la cellule.
+
+        >>> rules = RuleState([[1, 1], [2, 3]], set())
+        >>> rules.without_conflict(), rules.is_won()
+        (False, False)
+        >>> rules.toggle((0, 0))
+        >>> rules.without_conflict(), rules.is_won()
+        (True, True)
+        >>> rules.toggle((1, 1))
+        >>> rules.without_adjacent(), rules.related()
+        (True, False)
+        """
+        i, j = cell
+        if self.black[i * self.width + j]:
+            white_neighbours = 4 - self._black_neighbours(i, j)
+            self._whiten(i, j)
+            self.blackened.discard(cell)
+
+            # Une cellule blanchie reliée à la zone blanche la laisse connexe.
+            if not self._related or white_neighbours - self._border(i, j) == 0:
+                self._related = True if self.whites == 1 else None
+        else:
+            white_neighbours = 4 - self._black_neighbours(i, j) - self._border(i, j)
+            self._blacken(i, j)
+            self.blackened.add(cell)
+
+            # Retirer une cellule feuille de la zone blanche la laisse connexe.
+            if not (self._related and white_neighbours <= 1 and self.whites):
+                self._related = None
+        if self.duplicates is not None:
+            self._update_diagnostics(i, j)
+
+    def _border(self, i: int, j: int):
+        """Compte les côtés de la cellule situés sur le bord de la grille."""
+        return (i == 0) + (i == self.height - 1) + (j == 0) + (j == self.width - 1)
+
+    def without_conflict(self):
+        """
+        Vérifie que chaque numéro n'apparaisse qu'une fois par ligne et par colonne. (Règle n°1)
+        :return: Booléen déterminant s'il y a conflit.
+        """
+        return not self.conflicts
+
+    def without_adjacent(self):
+        """
+        Vérifie qu'aucune cellule noircies ne soit adjacente à une autre. (Règle n°2)
+        :return: Booléen déterminant s'il y a des cellules noircies voisines.
+        """
+        return not self.adjacent
+
+    def related(self):
+        """
+        Vérifie que la zone formée par toutes les cellules non noircies soit connexe. (Règle n°3)
+        Le parcours complet n'est refait que si une modification a pu couper la zone, et jamais une fois
+        le diagnostic construit : la zone est alors connexe si aucune cellule blanche n'est isolée.
+        :return: Booléen déterminant si la zone non noircies est connexe.
+        """
+        if self.isolated is not None:
+            return self.whites > 0 and not self.isolated
+        if self._related is None:
+            self._related = self.connectivity.related(self.black)
+        return self._related
+
+    def is_won(self):
+        """
+        Vérifie que les trois règles soient respectées.
+        :return: Booléen déterminant si la grille est résolue.
+        """
+        return not self.conflicts and not self.adjacent and self.related()
+
+    def diagnostics(self):
+        """
+        Localise les cellules qui enfreignent les règles.
+        Le premier appel parcourt toute la grille ; les coups suivants ne mettent à jour que les cellules
+        proches de la cellule inversée (voir _update_diagnostics), les ensembles retournés étant modifiés en place.
+        :return: Triplet (cellules blanches en double sur leur ligne ou leur colonne, paires de cellules noircies
+                 voisines, cellules blanches hors de la plus grande zone blanche).
+
+        >>> rules = RuleState([[1, 1, 2], [2, 3, 1], [3, 2, 2]], {(0, 1), (1, 1), (2, 1)})
+        >>> duplicates, pairs, isolated = rules.diagnostics()
+        >>> sorted(duplicates), sorted(pairs), sorted(isolated)
+        ([(0, 2), (2, 2)], [((0, 1), (1, 1)), ((1, 1), (2, 1))], [(0, 2), (1, 2), (2, 2)])
+        >>> rules.toggle((1, 1))
+        >>> [sorted(found) for found in rules.diagnostics()]
+        [[(0, 2), (2, 2)], [], []]
+        >>> rules.toggle((1, 2))
+        >>> [sorted(found) for found in rules.diagnostics()], rules.related()
+        ([[(0, 2), (2, 2)], [], [(0, 2), (2, 2)]], False)
+        >>> rules.toggle((1, 2))
+        >>> rules.toggle((0, 0))
+        >>> [sorted(found) for found in rules.diagnostics()], rules.related()
+        ([[(0, 2), (2, 2)], [((0, 0), (0, 1))], []], True)
+        """
+        if self.duplicates is None:
+            self._diagnose()
+        return self.duplicates, self.pairs, self.isolated
+
+    def _diagnose(self):
+        """Construit le diagnostic complet en un seul parcours de la grille."""
+        width, black = self.width, self.black
+        if self.row_positions is None:
+            self.row_positions = [dict() for _ in range(self.height)]
+            self.column_positions = [dict() for _ in range(width)]
+            for i, line in enumerate(self.grid):
+                for j, value in enumerate(line):
+                    self.row_positions[i].setdefault(value, list()).append(j)
+                    self.column_positions[j].setdefault(value, list()).append(i)
+        rows = [dict() for _ in range(self.height)]
+        columns = [dict() for _ in range(width)]
+        pairs = set()
+
+        # Les zones blanches sont étiquetées au fil du parcours : chaque cellule blanche est rattachée
+        # à ses voisines de gauche et du dessus, les étiquettes équivalentes étant fusionnées.
+        parent = list(range(self.height * width))
+
+        def find(cell):
+            while parent[cell] != cell:
+                parent[cell] = parent[parent[cell]]
+                cell = parent[cell]
+            return cell
+
+        for i, line in enumerate(self.grid):
+            for j, value in enumerate(line):
+                cell = i * width + j
+                if black[cell]:
+                    if j and black[cell - 1]:
+                        pairs.add(((i, j - 1), (i, j)))
+                    if i and black[cell - width]:
+                        pairs.add(((i - 1, j), (i, j)))
+                    continue
+                rows[i].setdefault(value, list()).append((i, j))
+                columns[j].setdefault(value, list()).append((i, j))
+                if j and not black[cell - 1]:
+                    parent[find(cell)] = find(cell - 1)
+                if i and not black[cell - width]:
+                    parent[find(cell)] = find(cell - width)
+
+        duplicates = set()
+        for counts in rows + columns:
+            for cells in counts.values():
+                if len(cells) > 1:
+                    duplicates.update(cells)
+
+        # Seules les cellules blanches sont rattachées à une zone.
+        zones = dict()
+        for cell in range(len(black)):
+            if not black[cell]:
+                zones.setdefault(find(cell), list()).append(cell)
+        largest = max(zones.values(), key=len, default=())
+        isolated = {divmod(cell, width) for cells in zones.values() if cells is not largest for cell in cells}
+
+        self.duplicates, self.pairs, self.isolated = duplicates, pairs, isolated
+
+    def _update_diagnostics(self, i: int, j: int):
+        """
+        Met à jour le diagnostic après l'inversion d'une cellule, sans parcourir la grille : seules les cellules
+        de même valeur sur sa ligne et sa colonne, ses voisines, et les zones qu'elle coupe ou relie sont examinées.
+        """
+        value = self.grid[i][j]
+        for k in self.row_positions[i][value]:
+            self._check_duplicate(i, k, value)
+        for k in self.column_positions[j][value]:
+            self._check_duplicate(k, j, value)
+
+        cell = i * self.width + j
+        black = self.black[cell]
+        for neighbour in self.connectivity.neighbours[cell]:
+            if self.black[neighbour]:
+                pair = tuple(sorted(((i, j), divmod(neighbour, self.width))))
+                if black:
+                    self.pairs.add(pair)
+                else:
+                    self.pairs.discard(pair)
+
+        if black:
+            self._cut(i, j)
+        else:
+            self._join(i, j)
+
+    def _check_duplicate(self, i: int, j: int, value: int):
+        """Indique si une cellule est blanche et en double sur sa ligne ou sa colonne."""
+        if not self.black[i * self.width + j] and (self.row_counts[i][value] > 1 or self.column_counts[j][value] > 1):
+            self.duplicates.add((i, j))
+        else:
+            self.duplicates.discard((i, j))
+
+    def _cut(self, i: int, j: int):
+        """Met à jour les cellules isolées après le noircissement d'une cellule."""
+        if (i, j) in self.isolated:
+            # Une zone isolée qui se divise ne donne que des zones isolées.
+            self.isolated.discard((i, j))
+            return
+        cell = i * self.width + j
+        starts = [neighbour for neighbour in self.connectivity.neighbours[cell] if not self.black[neighbour]]
+        if not starts:
+            # La cellule formait à elle seule la plus grande zone : une zone isolée prend sa place.
+            if self.isolated:
+                self._diagnose()
+            return
+        for piece in self.connectivity.pieces(self.black, starts):
+            self.isolated.update(divmod(cell, self.width) for cell in piece)
+
+        # Les parties coupées ne dépassent pas la partie restante, mais une zone déjà isolée le peut.
+        if self.whites - len(self.isolated) < len(self.isolated):
+            self._diagnose()
+
+    def _join(self, i: int, j: int):
+        """Met à jour les cellules isolées après le blanchiment d'une cellule."""
+        cell = i * self.width + j
+        neighbours = [divmod(neighbour, self.width) for neighbour in self.connectivity.neighbours[cell]
+                      if not self.black[neighbour]]
+        if self.whites == 1:
+            return
+        if any(neighbour not in self.isolated for neighbour in neighbours):
+            # La cellule rejoint la plus grande zone, avec les zones isolées qu'elle touche.
+            for neighbour in neighbours:
+                if neighbour in self.isolated:
+                    self.isolated -= self._piece(neighbour)
+            return
+
+        # La cellule ne touche que des zones isolées, qu'elle réunit : la zone obtenue peut devenir la plus grande.
+        self.isolated.add((i, j))
+        if len(self._piece((i, j))) > self.whites - len(self.isolated):
+            self._diagnose()
+
+    def _piece(self, cell: tuple):
+        """Retourne la zone isolée contenant une cellule isolée."""
+        piece = {cell}
+        stack = [cell]
+        while stack:
+            i, j = stack.pop()
+            for neighbour in self.connectivity.neighbours[i * self.width + j]:
+                neighbour = divmod(neighbour, self.width)
+                if neighbour in self.isolated and neighbour not in piece:
+                    piece.add(neighbour)
+                    stack.append(neighbour)
+        return piece
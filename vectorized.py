@@ -0,0 +1,291 @@
+import numpy
+
+
+# INFORMATIONS SUR LA VÉRIFICATION PAR LOTS
+#
+# Ce module vérifie d'un coup un grand nombre de propositions de
+# cellules noircies pour une même grille. Il nécessite NumPy, qui
+# n'est pas indispensable au jeu : les autres modules ne l'importent
+# qu'à la demande.
+#
+# Les K propositions forment un tableau booléen de forme (K, H, L),
+# une cellule valant True lorsqu'elle est noircie. Comme dans
+# bitboard.py, chaque ligne d'une proposition est ensuite réduite à
+# un entier dont le bit j vaut 1 lorsque la cellule est noircie, le
+# plus petit type entier suffisant étant choisi : les règles
+# s'appliquent alors à toutes les propositions à la fois.
+# - noires voisines : ET entre les lignes et leurs copies décalées ;
+# - doublons : pour chaque valeur présente plusieurs fois sur une
+#   ligne ou une colonne, au plus un bit doit rester blanc ;
+# - connexité : la zone de la première cellule blanche est étendue
+#   aux voisines à chaque passe, et jusqu'au bout de chaque segment
+#   blanc par une addition (la retenue parcourt le segment). Les
+#   propositions dont la zone n'évolue plus sont mises de côté.
+#
+# Un entier de 64 bits devant garder un bit libre pour les
+# retenues, cette réduction se limite aux grilles d'au plus 63
+# lignes et 63 colonnes. Au-delà, les mêmes règles sont vérifiées
+# directement sur le tableau booléen : décalages du tableau pour
+# les noires voisines, somme des cellules blanches de chaque doublon,
+# et zone étendue d'une cellule par passe pour la connexité, ce qui
+# est plus lent mais sans limite de taille.
+#
+# Les résultats sont identiques à ceux des fonctions de core.py.
+#
+
+WIDTH = 63
+
+
+def to_masks(grid: list, candidates: list):
+    """
+    Construit le tableau des propositions à partir d'ensembles de cellules noircies.
+    :param grid: Liste de listes décrivant la grille.
+    :param candidates: Liste d'ensembles de cellules noircies.
+    :return: Tableau booléen de forme (K, H, L).
+
+    >>> to_masks([[1, 2], [2, 1]], [{(0, 1)}, set()]).astype(int).tolist()
+    [[[0, 1], [0, 0]], [[0, 0], [0, 0]]]
+    """
+    masks = numpy.zeros((len(candidates), len(grid), len(grid[0])), dtype=bool)
+    for k, blackened in enumerate(candidates):
+        if blackened:
+            i, j = zip(*blackened)
+            masks[k, list(i), list(j)] = True
+    return masks
+
+
+def pack(masks):
+    """
+    Réduit chaque ligne des propositions à un entier dont le bit j indique si la cellule j est noircie.
+    Le type retenu garde un bit libre au-dessus de la dernière colonne, pour les retenues.
+    La fonction lève ValueError si la ligne ne tient pas dans un entier de 64 bits.
+    :param masks: Tableau booléen des propositions, de forme (K, H, L), avec L <= WIDTH.
+    :return: Tableau d'entiers non signés de forme (K, H).
+
+    >>> rows = pack(to_masks([[1, 2, 3]], [{(0, 0), (0, 2)}]))
+    >>> rows.tolist(), rows.dtype.name
+    ([[5]], 'uint8')
+    """
+    width = masks.shape[2]
+    dtype = next((kind for kind in (numpy.uint8, numpy.uint16, numpy.uint32, numpy.uint64)
+                  if numpy.iinfo(kind).bits > width), None)
+    if dtype is None:
+        raise ValueError("Les lignes de plus de {} colonnes ne tiennent pas dans un entier".format(WIDTH))
+    return (masks.view(numpy.uint8) @ (1 << numpy.arange(width, dtype=numpy.int64))).astype(dtype)
+
+
+def packable(masks):
+    """
+    Indique si les lignes et les colonnes des propositions peuvent être réduites en entiers.
+    :param masks: Tableau booléen des propositions, de forme (K, H, L).
+    :return: Booléen.
+
+    >>> packable(numpy.zeros((1, 63, 63), dtype=bool)), packable(numpy.zeros((1, 10, 64), dtype=bool))
+    (True, False)
+    """
+    return max(masks.shape[1:]) <= WIDTH
+
+
+def duplicate_masks(grid: list):
+    """
+    Calcule les masques des valeurs présentes plusieurs fois sur une ligne ou une colonne.
+    :param grid: Liste de listes décrivant la grille.
+    :return: Couple (indices des lignes, puis des colonnes décalés de H ; masques des positions de la valeur).
+
+    >>> duplicate_masks([[1, 1], [2, 1]])
+    ([0, 3], [3, 3])
+    """
+    height, width = len(grid), len(grid[0])
+    lines, masks = list(), list()
+    columns = [[grid[i][j] for i in range(height)] for j in range(width)]
+    for index, line in enumerate(grid + columns):
+        positions = dict()
+        for position, value in enumerate(line):
+            positions[value] = positions.get(value, 0) | 1 << position
+        for mask in positions.values():
+            if mask & (mask - 1):
+                lines.append(index)
+                masks.append(mask)
+    return lines, masks
+
+
+def _without_conflict(grid: list, rows, columns):
+    """Vérifie la règle n°1 à partir des lignes et des colonnes réduites en entiers."""
+    lines, masks = duplicate_masks(grid)
+    kind = numpy.promote_types(rows.dtype, columns.dtype)
+    black = numpy.concatenate((rows.astype(kind), columns.astype(kind)), axis=1)[:, lines]
+
+    # Au plus un bit de chaque valeur doit rester parmi les cellules blanches.
+    white = numpy.array(masks, dtype=kind) & ~black
+    return ~(white & (white - kind.type(1))).any(axis=1)
+
+
+def _without_adjacent(rows):
+    """Vérifie la règle n°2 à partir des lignes réduites en entiers."""
+    return ~((rows & (rows >> rows.dtype.type(1))).any(axis=1) | (rows[:, 1:] & rows[:, :-1]).any(axis=1))
+
+
+def _related(rows, width: int):
+    """Vérifie la règle n°3 à partir des lignes réduites en entiers."""
+    count = len(rows)
+    one = rows.dtype.type(1)
+    white = ~rows & rows.dtype.type((1 << width) - 1)
+    occupied = white.any(axis=1)
+
+    # La zone part du bit le plus faible de la première ligne contenant une cellule blanche.
+    candidates = numpy.arange(count)
+    first = (white != 0).argmax(axis=1)
+    start = white[candidates, first]
+    reached = numpy.zeros_like(white)
+    reached[candidates, first] = start & (~start + one)
+
+    related = numpy.zeros(count, dtype=bool)
+    passes = 0
+    while candidates.size:
+        grown = reached | (reached << one)
+        grown |= reached >> one
+        grown[:, 1:] |= reached[:, :-1]
+        grown[:, :-1] |= reached[:, 1:]
+        grown &= white
+        # La retenue de l'addition parcourt chaque segment blanc atteint jusqu'à son bit le plus fort.
+        grown |= white & ~(white + grown)
+
+        # Les propositions dont la zone n'évolue plus sont mises de côté toutes les quatre passes.
+        passes += 1
+        if passes % 4 == 0:
+            changed = (grown != reached).any(axis=1)
+            if not changed.all():
+                done = ~changed
+                related[candidates[done]] = (grown[done] == white[done]).all(axis=1)
+                candidates, white, grown = candidates[changed], white[changed], grown[changed]
+        reached = grown
+    return occupied & related
+
+
+def _wide_without_conflict(grid: list, masks):
+    """Vérifie la règle n°1 sur le tableau booléen, pour les grilles trop grandes pour être réduites."""
+    height, width = masks.shape[1:]
+    lines, groups = duplicate_masks(grid)
+    if not lines:
+        return numpy.ones(len(masks), dtype=bool)
+    black = numpy.zeros((len(masks), height + width, max(height, width)), dtype=bool)
+    black[:, :height, :width] = masks
+    black[:, height:, :height] = masks.transpose(0, 2, 1)
+
+    # Chaque doublon devient une suite de cellules ; au plus une cellule de chaque suite doit rester blanche.
+    indices, positions, starts = list(), list(), list()
+    for line, mask in zip(lines, groups):
+        starts.append(len(positions))
+        for position, bit in enumerate(bin(mask)[:1:-1]):
+            if bit == "1":
+                indices.append(line)
+                positions.append(position)
+    white = ~black[:, indices, positions]
+    return (numpy.add.reduceat(white.astype(numpy.intp), starts, axis=1) <= 1).all(axis=1)
+
+
+def _wide_without_adjacent(masks):
+    """Vérifie la règle n°2 sur le tableau booléen, pour les grilles trop grandes pour être réduites."""
+    return ~((masks[:, :, 1:] & masks[:, :, :-1]).any(axis=(1, 2)) | (masks[:, 1:] & masks[:, :-1]).any(axis=(1, 2)))
+
+
+def _wide_related(masks):
+    """Vérifie la règle n°3 sur le tableau booléen, pour les grilles trop grandes pour être réduites."""
+    count = len(masks)
+    white = ~masks
+    occupied = white.reshape(count, -1).any(axis=1)
+
+    # La zone part de la première cellule blanche et s'étend aux voisines à chaque passe.
+    candidates = numpy.arange(count)
+    reached = numpy.zeros_like(white)
+    reached.reshape(count, -1)[candidates, white.reshape(count, -1).argmax(axis=1)] = occupied
+
+    related = numpy.zeros(count, dtype=bool)
+    while candidates.size:
+        grown = reached.copy()
+        grown[:, 1:] |= reached[:, :-1]
+        grown[:, :-1] |= reached[:, 1:]
+        grown[:, :, 1:] |= reached[:, :, :-1]
+        grown[:, :, :-1] |= reached[:, :, 1:]
+        grown &= white
+
+        changed = (grown != reached).any(axis=(1, 2))
+        done = ~changed
+        related[candidates[done]] = (grown[done] == white[done]).all(axis=(1, 2))
+        candidates, white, reached = candidates[changed], white[changed], grown[changed]
+    return occupied & related
+
+
+def without_conflict(grid: list, masks):
+    """
+    Vérifie pour chaque proposition que chaque numéro n'apparaisse qu'une fois par ligne et par colonne. (Règle n°1)
+    :param grid: Liste de listes décrivant la grille.
+    :param masks: Tableau booléen des propositions, de forme (K, H, L).
+    :return: Tableau booléen des K verdicts.
+
+    >>> without_conflict([[1, 1], [2, 1]], to_masks([[1, 1], [2, 1]], [set(), {(0, 1)}, {(0, 0)}])).tolist()
+    [False, True, False]
+    """
+    if not packable(masks):
+        return _wide_without_conflict(grid, masks)
+    return _without_conflict(grid, pack(masks), pack(masks.transpose(0, 2, 1)))
+
+
+def without_adjacent(masks):
+    """
+    Vérifie pour chaque proposition qu'aucune cellule noircie ne soit adjacente à une autre. (Règle n°2)
+    :param masks: Tableau booléen des propositions, de forme (K, H, L).
+    :return: Tableau booléen des K verdicts.
+
+    >>> without_adjacent(to_masks([[1, 1], [2, 1]], [{(0, 0), (1, 1)}, {(0, 0), (0, 1)}])).tolist()
+    [True, False]
+    """
+    if masks.shape[2] > WIDTH:
+        return _wide_without_adjacent(masks)
+    return _without_adjacent(pack(masks))
+
+
+def related(masks):
+    """
+    Vérifie pour chaque proposition que la zone formée par les cellules non noircies soit connexe. (Règle n°3)
+    :param masks: Tableau booléen des propositions, de forme (K, H, L).
+    :return: Tableau booléen des K verdicts.
+
+    >>> related(to_masks([[1, 2], [2, 1]], [{(0, 1), (1, 0)}, {(0, 0)}, {(0, 0), (0, 1), (1, 0), (1, 1)}])).tolist()
+    [False, True, False]
+    """
+    if masks.shape[2] > WIDTH:
+        return _wide_related(masks)
+    return _related(pack(masks), masks.shape[2])
+
+
+def is_solution(grid: list, masks):
+    """
+    Vérifie pour chaque proposition que les trois règles soient respectées.
+    La connexité n'est vérifiée que pour les propositions qui respectent les deux premières règles.
+    :param grid: Liste de listes décrivant la grille.
+    :param masks: Tableau booléen des propositions, de forme (K, H, L).
+    :return: Tableau booléen des K verdicts.
+
+    >>> grid = [[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]]
+    >>> solution = {(2, 0), (0, 0), (3, 3), (2, 2), (3, 1), (0, 2), (1, 4)}
+    >>> is_solution(grid, to_masks(grid, [solution, solution - {(1, 4)}, set()])).tolist()
+    [True, False, False]
+
+    Les grilles de plus de 63 lignes ou colonnes sont vérifiées sur le tableau booléen :
+
+    >>> from generator import generate
+    >>> grid, solution = generate(4, 70, seed=1)
+    >>> is_solution(grid, to_masks(grid, [solution, solution | {(0, 0), (0, 1)}, set()])).tolist()
+    [True, False, False]
+    """
+    if not packable(masks):
+        verdicts = _wide_without_conflict(grid, masks) & _wide_without_adjacent(masks)
+        if verdicts.any():
+            verdicts[verdicts] = _wide_related(masks[verdicts])
+        return verdicts
+    rows = pack(masks)
+    verdicts = _without_conflict(grid, rows, pack(masks.transpose(0, 2, 1))) & _without_adjacent(rows)
+    if verdicts.any():
+        verdicts[verdicts] = _related(rows[verdicts], masks.shape[2])
+    return verdicts
@@ -0,0 +1,80 @@
+from threading import Thread
+from time import perf_counter
+
+from solver import Solver
+
+SOLVE_BUDGET = 30.0
+
+
+# INFORMATIONS SUR LA RÉSOLUTION EN ARRIÈRE-PLAN
+#
+# La résolution demandée depuis une partie est confiée à un fil
+# d'exécution séparé : la fenêtre continue de se redessiner et de
+# répondre aux clics pendant la recherche. L'interface consulte
+# régulièrement l'avancement (nœuds explorés, cellules décidées)
+# et peut annuler la recherche à tout moment.
+#
+# Le statut de la tâche passe de 'running' à 'solved', 'unsolvable',
+# 'timeout' ou 'cancelled'.
+#
+
+class SolveTask:
+
+    def __init__(self, grid: list, timeout: float = SOLVE_BUDGET):
+        """Prépare la résolution d'une grille en arrière-plan."""
+        self.solver = Solver(grid)
+        self.cells = len(grid) * len(grid[0])
+        self.timeout = timeout
+        self.status = "running"
+        self.solution = None
+        self.elapsed = 0.0
+        self.thread = Thread(target=self.run, daemon=True)
+
+    def start(self):
+        """
+        Lance la résolution.
+        :return: La tâche elle-même.
+
+        >>> task = SolveTask([[2, 2, 1, 5, 3], [2, 3, 1, 4, 5], [1, 1, 1, 3, 5], [1, 3, 5, 4, 2], [5, 4, 3, 2, 1]])
+        >>> task.start().wait().status, sorted(task.solution)
+        ('solved', [(0, 0), (0, 2), (1, 4), (2, 0), (2, 2), (3, 1), (3, 3)])
+        """
+        self.thread.start()
+        return self
+
+    def run(self):
+        """Résout la grille ; exécutée dans le fil d'exécution de la tâche."""
+        start = perf_counter()
+        try:
+            self.solution = self.solver.solve(timeout=self.timeout)
+        except TimeoutError:
+            self.status = "timeout"
+        except InterruptedError:
+            self.status = "cancelled"
+        else:
+            self.status = "unsolvable" if self.solution is None else "solved"
+        self.elapsed = perf_counter() - start
+
+    def cancel(self):
+        """Demande l'arrêt de la résolution."""
+        self.solver.cancel()
+
+    def done(self):
+        """Indique si la résolution est terminée."""
+        return not self.thread.is_alive()
+
+    def wait(self, timeout: float = None):
+        """
+        Attend la fin de la résolution.
+        :param timeout: Temps d'attente maximal en secondes, ou None.
+        :return: La tâche elle-même.
+        """
+        self.thread.join(timeout)
+        return self
+
+    def progress(self):
+        """
+        Retourne l'avancement de la résolution.
+        :return: Couple (nœuds explorés, cellules décidées dans le dernier état examiné).
+        """
+        return self.solver.nodes, self.solver.decided